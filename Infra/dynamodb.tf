@@ -30,3 +30,31 @@ resource "aws_dynamodb_table" "orders" {
     Project     = var.project_name
   }
 }
+
+// Status of the asynchronous invoice jobs (InvoiceGenerator/jobs.py), so any
+// API worker process can answer a poll; items expire a day after their last update
+resource "aws_dynamodb_table" "invoice_jobs" {
+  name         = "invoice-jobs-${lower(var.project_name)}-${var.environment}-${random_id.bucket_suffix.hex}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "job_id"
+
+  attribute {
+    name = "job_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled     = true
+    kms_key_arn = aws_kms_key.data_encryption.arn
+  }
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
@@ -12,6 +12,10 @@ output "dynamodb_table_name" {
   value = aws_dynamodb_table.orders.name
 }
 
+output "invoice_jobs_table_name" {
+  value = aws_dynamodb_table.invoice_jobs.name
+}
+
 
 output "default_tags" {
   value = {
@@ -30,6 +30,24 @@ locals {
       ]
     }
 
+    invoice_jobs_table_access = {
+      description = "Policy to allow reading and writing invoice job statuses in DynamoDB"
+      policy_suffix = "AllowInvoiceJobsTableOperations"
+      statements = [
+        {
+          Sid    = "InvoiceJobsTableAccess"
+          Effect = "Allow"
+          Action = [
+            "dynamodb:GetItem",
+            "dynamodb:PutItem"
+          ]
+          Resource = [
+            aws_dynamodb_table.invoice_jobs.arn
+          ]
+        }
+      ]
+    }
+
     invoice_s3_upload = {
       description = "Policy to allow uploading invoices to S3"
       policy_suffix = "AllowS3InvoiceUpload"
@@ -1,17 +1,51 @@
-import boto3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import uuid
-from fpdf import FPDF
-import io
+from botocore.exceptions import ClientError
 import json
+from InvoiceGenerator.line_items import iter_invoice_pdf, spool_invoice_pdf
+from InvoiceGenerator.template import compile_template
+from utils.aws import AWS
 from utils.parser import parse_event_body
 from utils.response import response
-from boto3.dynamodb.conditions import Key
 import os
+import shutil
 
 # This script generates an invoice in PDF format and stores it in an S3 bucket
 # This function is used to place an invoice in the S3 bucket and update the DynamoDB table
 
+# When set, every rendered invoice is also written to this local directory
+DEBUG_DIR = os.environ.get("INVOICE_DEBUG_DIR")
+
+# The invoice, line by line: str.format patterns of render_invoice's arguments
+# (and the total) and their alignment
+INVOICE_LINES = (
+    ("Invoice from: {business_name}", 'C'),
+    # A unique invoice number
+    ("Invoice Number: {invoice_number}", ''),
+    ("Order ID: {order_id}", ''),
+    ("Ordered At: {ordered_at}", ''),
+    ("Thank you for your order!", ''),
+    # Name and address of the client
+    ("Customer Name: {customer_name}", ''),
+    ("Customer Address: {customer_address}", ''),
+    # Invoice items, amount and their prices
+    ("Item Purchased: {item_bought}", ''),
+    ("Item Price: ${item_price:.2f}", ''),
+    ("Item Quantity: {item_quantity}", ''),
+    ("Total Amount: ${total:.2f}", ''),
+    (" ", ''),  # Blank line
+)
+
+# Compiled once per process (batch render processes compile their own)
+INVOICE_TEMPLATE = compile_template(INVOICE_LINES)
+
+# Invoice numbers of orders with the caller's key are derived from it in this namespace
+INVOICE_NUMBERS = uuid.UUID("9b1f6c52-3d7e-4f0a-8c2b-5e4d7a6f1c30")
+
+# Order writes run here while the invoice renders on the request thread
+ORDER_WRITERS = ThreadPoolExecutor(max_workers=int(os.environ.get("ORDER_WRITER_THREADS") or 4), thread_name_prefix="order-writer")
+
 
 def lambda_handler(event, context):
     
@@ -21,6 +55,97 @@ def lambda_handler(event, context):
         return response(400, {'error': 'Invalid input'})
 # ... other parsing logic
 
+    return response(*generate_invoice(body))
+
+
+def generate_invoice(body, items=None):
+    """
+    Saves the order, renders its invoice and uploads it to S3.
+
+    Args:
+        body (dict): The parsed request body.
+        items (iterable): Line items streamed apart from the body (see
+            line_items); by default the body's "items", if it has any.
+
+    Returns:
+        tuple: The HTTP status code and the response body.
+    """
+    # AWS resources are created once per container (and thread) and reused
+    s3 = AWS.resource('s3')
+    bucket_name = os.environ["INVOICE_BUCKET_NAME"]  # Use env var for modularity
+    table_name = os.environ["DYNAMODB_TABLE_NAME"]   # Use env var for modularity
+
+    try:
+        item, fields = prepare_invoice(body)
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    if items is None:
+        items = fields.pop('items', None)
+
+    invoice_file_name_str = invoice_file_name(item)
+    invoice_file_path = f"{bucket_name}/{invoice_file_name_str}"  # Path in S3 bucket
+    if items is None:
+        # The item is already known here, so it isn't read back: it is written
+        # while the invoice renders
+        order_written = ORDER_WRITERS.submit(save_order, table_name, item)
+        pdf = render_invoice(**fields)
+    else:
+        # Line items can turn out invalid halfway through a stream, so the
+        # order is written once they've rendered. Large invoices spill from
+        # memory to a temporary file.
+        try:
+            pdf = spool_invoice_pdf(fields, items)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        order_written = ORDER_WRITERS.submit(save_order, table_name, item)
+
+    try:
+        # Local copies are a debugging aid only, off the request path by default
+        if DEBUG_DIR:
+            save_debug_copy(pdf, invoice_file_name_str)
+
+        try:
+            order_written.result()
+        except Exception as e:
+            print(f"Error: Unable to save the order to DynamoDB. {e}")
+            return 500, {'error': 'Failed to save the order'}
+
+        # Upload the PDF to S3
+        try:
+            s3.Bucket(bucket_name).put_object(
+                Key=invoice_file_path,
+                Body=pdf,
+                ContentType='application/pdf'
+            )
+            print(f"Invoice uploaded to S3: {bucket_name}/{invoice_file_path}")
+        except Exception as e:
+            print(f"Error: Unable to upload the invoice to S3. {e}")
+            return 500, {'error': 'Failed to upload invoice to S3'}
+    finally:
+        if items is not None:
+            pdf.close()
+
+    return 200, {'message': 'Invoice generated and uploaded successfully', 'invoice_path': invoice_file_path}
+
+
+def prepare_invoice(body):
+    """
+    Builds the order item and the invoice contents of an invoice request.
+
+    Args:
+        body (dict): The parsed request body.
+
+    The order's key is the body's order_id and ordered_at when it has them,
+    so a retried request is the same order (and invoice) again; otherwise
+    it's a new order.
+
+    Returns:
+        tuple: The DynamoDB order item and the keyword arguments of
+        render_invoice.
+
+    Raises:
+        ValueError: If the body has only one of order_id and ordered_at.
+    """
     customer_name = body.get('customer_name', 'Unknown')  # Default to 'Unknown' if not provided
     customer_address = body.get('customer_address', 'Unknown')
     business_name = body.get('business_name', 'Unknown')
@@ -28,17 +153,19 @@ def lambda_handler(event, context):
     item_price = body.get('item_price', 0) # Default to 0 if not provided
     item_quantity = body.get('item_quantity', 1)
     status = body.get('status', 'pending')  # Default to 'pending' if not provided
-    
-    # Initialize AWS resources
-    s3 = boto3.resource('s3')
-    dynamodb = boto3.resource('dynamodb')
-    bucket_name = os.environ["INVOICE_BUCKET_NAME"]  # Use env var for modularity
-    table_name = os.environ["DYNAMODB_TABLE_NAME"]   # Use env var for modularity
-    table = dynamodb.Table(table_name)
-    # It generates a unique order ID, invoice number, and timestamp, and stores them in the DynamoDB table
-    invnum = str(uuid.uuid4())
-    OrderID = str(uuid.uuid4())
-    orderedAt = str(datetime.now().isoformat() + "Z")
+
+    if body.get('order_id') is not None or body.get('ordered_at') is not None:
+        # The caller's own key: both halves of it, or a retry would be a new item
+        if body.get('order_id') is None or body.get('ordered_at') is None:
+            raise ValueError("order_id and ordered_at go together")
+        OrderID = str(body['order_id'])
+        orderedAt = str(body['ordered_at'])
+        invnum = str(uuid.uuid5(INVOICE_NUMBERS, f"{OrderID}/{orderedAt}"))
+    else:
+        # It generates a unique order ID, invoice number, and timestamp, and stores them in the DynamoDB table
+        invnum = str(uuid.uuid4())
+        OrderID = str(uuid.uuid4())
+        orderedAt = str(datetime.now().isoformat() + "Z")
 
     item = {
         'customer_name': customer_name, # The name of the customer
@@ -46,80 +173,94 @@ def lambda_handler(event, context):
         'OrderedAt': orderedAt,   # The timestamp when the order was created
         # 'Arrived': status,      # (Optional) Status of the order, currently commented out
     }
-
-    table.put_item(Item=item)    # It retrieves the latest item from the table and constructs the invoice file name
-    # gets the latest item from the DynamoDB table
-    try:
-        dbresponse = table.query(
-        KeyConditionExpression=Key("order_id").eq(OrderID),
-        ScanIndexForward=False,
-        Limit=1,
-        ConsistentRead=True
-        )
-        items = dbresponse.get("Items", [])
-        latest_item = items[0] if items else item  # fallback to inserted item
-    except Exception as e:
-        print(f"Error: Fallback to inserted item. {e}")
-        latest_item = item
+    fields = {
+        'business_name': business_name,
+        'invoice_number': invnum,
+        'order_id': OrderID,
+        'ordered_at': orderedAt,
+        'customer_name': customer_name,
+        'customer_address': customer_address,
+        'item_bought': item_bought,
+        'item_price': item_price,
+        'item_quantity': item_quantity,
+    }
+    if body.get('items') is not None:
+        # Line items, in place of the single item above
+        fields['items'] = body['items']
+    return item, fields
 
 
+def invoice_file_name(item):
+    return f"invoice_{item['order_id']}_{item['OrderedAt']}.pdf"
 
-    invoice_file_name_str = f"invoice_{latest_item['order_id']}_{latest_item['OrderedAt']}.pdf"
-    invoice_file_path = f"{bucket_name}/{invoice_file_name_str}"  # Path in S3 bucket
-    # Creates a PDF file for the invoice
-    pdf = FPDF( orientation="portrait",
-        unit="mm",
-        format="A4")  
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    # Adds content to the PDF
-    pdf.cell(200, 10, txt=f"Invoice from: {business_name}", ln=True, align='C')
-    # A unique invoice number
-    pdf.cell(200, 10, txt=f"Invoice Number: {invnum}", ln=True)
-    pdf.cell(200, 10, txt=f"Order ID: {latest_item['order_id']}", ln=True)
-    pdf.cell(200, 10, txt=f"Ordered At: {latest_item['OrderedAt']}", ln=True)
-    pdf.cell(200, 10, txt="Thank you for your order!", ln=True)
-    # Your business name and contact information
-    # Name and address of the client
-    pdf.cell(200, 10, txt=f"Customer Name: {customer_name}", ln=True)
-    pdf.cell(200, 10, txt=f"Customer Address: {customer_address}", ln=True)
-    # Invoice items , amoount and their prices
-    pdf.cell(200, 10, txt=f"Item Purchased: {item_bought}", ln=True)
-    pdf.cell(200, 10, txt=f"Item Price: ${item_price:.2f}", ln=True)
-    pdf.cell(200, 10, txt=f"Item Quantity: {item_quantity}", ln=True)
-    pdf.cell(200, 10, txt=f"Total Amount: ${item_price * item_quantity:.2f}", ln=True)
-    pdf.cell(200, 10, txt=" ", ln=True)  # Blank line
-    
-    # Adding a folder to test the create of tghe inovice pdf
-    # Create the folder if it doesn’t exist
-    output_dir = "invoices"
-    os.makedirs(output_dir, exist_ok=True)
-    # Save the PDF to that folder
-    file_path = os.path.join(output_dir, f"invoice.pdf")
-    pdf.output(file_path)
-    print(f"Invoice saved to: {file_path}")
-    
 
-    # ✅ Generate PDF as a string and wrap in BytesIO
-    pdf_bytes = pdf.output(dest='S').encode('latin1')  # 'latin1' ensures compatibility
-    pdf_buffer = io.BytesIO(pdf_bytes)
+def save_order(table_name, item, aws=None):
+    """
+    Writes an order item, only if its key isn't taken yet.
 
+    The key (the caller's order ID and timestamp, or fresh ones) can only
+    exist already if this same order was written before, by a retry of the
+    request, so a failed condition counts as written.
 
-    # Upload the PDF to S3
+    Args:
+        aws (AWSRegistry): Where the table comes from (default: the shared registry).
+    """
+    aws = aws if aws is not None else AWS
     try:
-        s3.Bucket(bucket_name).put_object(
-            Key=invoice_file_path,
-            Body=pdf_buffer.getvalue(),
-            ContentType='application/pdf'
+        aws.table(table_name).put_item(
+            Item=item,
+            ConditionExpression="attribute_not_exists(order_id)",
         )
-        print(f"Invoice uploaded to S3: {bucket_name}/{invoice_file_path}")
-    except Exception as e:
-        print(f"Error: Unable to upload the invoice to S3. {e}")
-        return response(500, {'error': 'Failed to upload invoice to S3'})
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        print(f"Order {item['order_id']} was already saved")
+
 
-    return response(200, {'message': 'Invoice generated and uploaded successfully', 'invoice_path': invoice_file_path})
+def render_invoice(business_name, invoice_number, order_id, ordered_at, customer_name, customer_address, item_bought, item_price, item_quantity, items=None):
+    """
+    Renders an invoice PDF in memory.
 
+    Only the order's lines are filled into INVOICE_TEMPLATE, which laid out
+    everything else when it compiled; nothing touches the disk. Invoices
+    with line items (items, in place of the single item) are laid out over
+    as many pages as they take instead.
 
+    Returns:
+        bytes: The PDF.
+    """
+    values = {
+        'business_name': business_name,
+        'invoice_number': invoice_number,
+        'order_id': order_id,
+        'ordered_at': ordered_at,
+        'customer_name': customer_name,
+        'customer_address': customer_address,
+        'item_bought': item_bought,
+        'item_price': item_price,
+        'item_quantity': item_quantity,
+    }
+    if items is not None:
+        return b"".join(iter_invoice_pdf(values, items))
 
+    values['total'] = item_price * item_quantity
+    return INVOICE_TEMPLATE.render(values)
 
 
+def save_debug_copy(pdf, file_name):
+    """
+    Writes a rendered invoice (bytes, or a file at its start) to DEBUG_DIR.
+
+    Returns:
+        str: The file's path.
+    """
+    os.makedirs(DEBUG_DIR, exist_ok=True)
+    file_path = os.path.join(DEBUG_DIR, file_name)
+    with open(file_path, "wb") as f:
+        if isinstance(pdf, bytes):
+            f.write(pdf)
+        else:
+            shutil.copyfileobj(pdf, f)
+            pdf.seek(0)
+    print(f"Invoice saved to: {file_path}")
+    return file_path
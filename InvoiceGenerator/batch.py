@@ -0,0 +1,331 @@
+"""
+Batch invoice generation, for month-end and settlement runs.
+
+Orders (invoice request bodies, one per line) stream in and are handled a
+chunk at a time: the chunk's PDFs render across a process pool, then the order
+rows of the invoices that rendered are written through a DynamoDB batch_writer
+while the next chunk renders, and once written their PDFs are uploaded to S3
+by a bounded pool of threads. An order whose invoice fails to render is never
+written, as in the single-invoice path. There is one result per order, in
+input order, and a summary with the throughput at the end.
+
+Usage:
+    python -m InvoiceGenerator.batch [orders.ndjson] [--bucket NAME]
+        [--table NAME] [--processes N] [--upload-workers N] [--chunk-size N]
+
+Results go to stdout as NDJSON and the summary to stderr. To run against local
+AWS stand-ins (e.g. LocalStack or moto's server), set AWS_ENDPOINT_URL.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from InvoiceGenerator.InvoiceGenerator import invoice_file_name, prepare_invoice, render_invoice, save_order
+from utils.aws import AWS
+from utils.ndjson import dump_ndjson, iter_ndjson
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_UPLOAD_WORKERS = 16
+
+# Rendered invoices waiting for or being uploaded; past this, rendering waits
+DEFAULT_MAX_PENDING = 2000
+
+# Orders sent to a render process at a time
+RENDER_TASK_SIZE = 25
+
+# Render pools by process count, started once per process and kept for the next batch
+_RENDER_POOLS = {}
+_RENDER_POOLS_LOCK = threading.Lock()
+
+
+class BatchStats:
+    """Counts a batch's invoices and failures as their results are yielded."""
+
+    def __init__(self):
+        self.invoices = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def summary(self):
+        seconds = time.monotonic() - self.started
+        return {
+            "invoices": self.invoices,
+            "failed": self.failed,
+            "seconds": round(seconds, 3),
+            "invoices_per_second": round(self.invoices / seconds, 1) if seconds > 0 else None,
+        }
+
+
+def generate_invoices(
+    orders,
+    bucket_name,
+    table_name,
+    processes=None,
+    upload_workers=DEFAULT_UPLOAD_WORKERS,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_pending=DEFAULT_MAX_PENDING,
+    aws=None,
+    stats=None,
+):
+    """
+    Generates, records and uploads an invoice for every order.
+
+    Args:
+        orders (iterable): (line number, body) pairs, as from iter_ndjson; a
+            body of None is a line that couldn't be parsed.
+        bucket_name (str): The S3 bucket of the invoices.
+        table_name (str): The DynamoDB table of the orders.
+        processes (int): Render processes, by default one per CPU; 0 renders
+            in this process.
+        upload_workers (int): Concurrent S3 uploads.
+        chunk_size (int): Orders written and rendered together.
+        max_pending (int): Rendered invoices held for upload at most.
+        aws (AWSRegistry): Where the DynamoDB and S3 clients come from
+            (default: the shared registry).
+        stats (BatchStats): Counts the results, if given.
+
+    Yields:
+        dict: The line number with the order ID and invoice path, or with an
+        error.
+    """
+    aws = aws if aws is not None else AWS
+    stats = stats if stats is not None else BatchStats()
+    renderer = render_pool(processes) if processes != 0 else None
+    uploader = ThreadPoolExecutor(upload_workers, thread_name_prefix="invoice-upload")
+    writer = ThreadPoolExecutor(1, thread_name_prefix="invoice-rows")
+    s3 = aws.client("s3")
+    # (result, upload future or None), in input order
+    pending = deque()
+
+    def queue(entries, accepted, rendered, rows_written):
+        # Only the rendered invoices' rows were written, in order
+        written = [index for index, (_, render_error) in enumerate(rendered) if render_error is None]
+        row_errors = dict(zip(written, rows_written.result()))
+
+        for line, index in entries:
+            if index is None:
+                pending.append(({"line": line, "error": "Invalid input"}, None))
+            else:
+                item, _ = accepted[index]
+                pdf_bytes, render_error = rendered[index]
+                error = render_error or row_errors[index]
+                invoice_file_path = f"{bucket_name}/{invoice_file_name(item)}"
+                if error:
+                    pending.append(({"line": line, "order_id": item['order_id'], "error": error}, None))
+                else:
+                    upload = uploader.submit(upload_invoice, s3, bucket_name, invoice_file_path, pdf_bytes)
+                    pending.append(({"line": line, "order_id": item['order_id'], "invoice_path": invoice_file_path}, upload))
+
+            while len(pending) > max_pending:
+                yield _finish(pending.popleft(), stats)
+
+    try:
+        # The chunk rendered last, whose rows are being written
+        previous = None
+        for chunk in _chunks(orders, chunk_size):
+            entries = []
+            accepted = []
+            for line, body in chunk:
+                if not body or not isinstance(body, dict):
+                    entries.append((line, None))
+                    continue
+                try:
+                    item, fields = prepare_invoice(body)
+                except ValueError:
+                    entries.append((line, None))
+                    continue
+                entries.append((line, len(accepted)))
+                accepted.append((item, fields))
+
+            rendered = _render(renderer, [fields for _, fields in accepted])
+            # Rows are written once their invoice has rendered, while the next chunk renders
+            rows_written = writer.submit(
+                write_orders,
+                aws,
+                table_name,
+                [item for (item, _), (_, render_error) in zip(accepted, rendered) if render_error is None],
+            )
+
+            if previous is not None:
+                yield from queue(*previous)
+            previous = (entries, accepted, rendered, rows_written)
+
+            # Whatever is ready already goes out before the next chunk renders
+            while pending and (pending[0][1] is None or pending[0][1].done()):
+                yield _finish(pending.popleft(), stats)
+
+        if previous is not None:
+            yield from queue(*previous)
+        while pending:
+            yield _finish(pending.popleft(), stats)
+    finally:
+        writer.shutdown()
+        uploader.shutdown(cancel_futures=True)
+
+
+def with_summary(results, stats):
+    """The results, then a {"summary": ...} line with the batch's counts and throughput."""
+    yield from results
+    yield {"summary": stats.summary()}
+
+
+def render_pool(processes=None):
+    """
+    The process pool that renders invoices, started on first use.
+
+    Its processes come from a forkserver (spawn where there's none), never
+    forked from this process: a web worker has threads, and a fork could
+    inherit one of their locks held. A pool that broke is replaced.
+
+    Args:
+        processes (int): Render processes, by default one per CPU.
+
+    Returns:
+        ProcessPoolExecutor: The same pool for every call with processes.
+    """
+    with _RENDER_POOLS_LOCK:
+        pool = _RENDER_POOLS.get(processes)
+        if pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            pool = _RENDER_POOLS[processes] = ProcessPoolExecutor(processes, mp_context=context)
+        return pool
+
+
+def write_orders(aws, table_name, items):
+    """
+    Writes order rows through batch_writer (25 per request, unprocessed ones retried).
+
+    If the batch fails part of the way, some rows are written already, so each
+    row is written again on its own, conditionally (see save_order): a row
+    that's already there counts as written.
+
+    Returns:
+        list: Per row, None once it's written, or an error.
+    """
+    if not items:
+        return []
+
+    try:
+        with aws.table(table_name).batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+        return [None] * len(items)
+    except Exception as e:
+        print(f"Error: Unable to batch-write {len(items)} orders to DynamoDB, writing them one at a time. {e}")
+
+    errors = []
+    for item in items:
+        try:
+            save_order(table_name, item, aws=aws)
+            errors.append(None)
+        except Exception as e:
+            print(f"Error: Unable to save order {item['order_id']} to DynamoDB. {e}")
+            errors.append("Failed to save the order")
+    return errors
+
+
+def upload_invoice(s3, bucket_name, key, pdf_bytes):
+    s3.put_object(Bucket=bucket_name, Key=key, Body=pdf_bytes, ContentType='application/pdf')
+
+
+def render_fields(fields):
+    """
+    Renders one invoice, in a render process.
+
+    Returns:
+        tuple: The PDF bytes, or None and an error.
+    """
+    try:
+        return render_invoice(**fields), None
+    except Exception as e:
+        print(f"Error: Unable to render invoice {fields.get('invoice_number')}. {e}")
+        return None, "Failed to render the invoice"
+
+
+def _render(renderer, fields_list):
+    if renderer is None:
+        return [render_fields(fields) for fields in fields_list]
+
+    try:
+        return list(renderer.map(render_fields, fields_list, chunksize=RENDER_TASK_SIZE))
+    except BrokenProcessPool:
+        # A render process died; the next batch starts a new pool
+        with _RENDER_POOLS_LOCK:
+            for processes, pool in list(_RENDER_POOLS.items()):
+                if pool is renderer:
+                    del _RENDER_POOLS[processes]
+        raise
+
+
+def _finish(entry, stats):
+    result, upload = entry
+    if upload is not None:
+        try:
+            upload.result()
+        except Exception as e:
+            print(f"Error: Unable to upload the invoice to S3. {e}")
+            result = {"line": result["line"], "order_id": result["order_id"], "error": "Failed to upload invoice to S3"}
+
+    if "error" in result:
+        stats.failed += 1
+    else:
+        stats.invoices += 1
+    return result
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("orders", nargs="?", help="NDJSON file of invoice requests (default: stdin)")
+    parser.add_argument("--bucket", default=os.environ.get("INVOICE_BUCKET_NAME"))
+    parser.add_argument("--table", default=os.environ.get("DYNAMODB_TABLE_NAME"))
+    parser.add_argument("--processes", type=int, default=None, help="render processes (default: one per CPU, 0: none)")
+    parser.add_argument("--upload-workers", type=int, default=DEFAULT_UPLOAD_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    if not args.bucket or not args.table:
+        parser.error("--bucket and --table (or INVOICE_BUCKET_NAME and DYNAMODB_TABLE_NAME) are required")
+
+    stats = BatchStats()
+    stream = open(args.orders, "rb") if args.orders else sys.stdin.buffer
+    try:
+        results = generate_invoices(
+            iter_ndjson(stream),
+            args.bucket,
+            args.table,
+            processes=args.processes,
+            upload_workers=args.upload_workers,
+            chunk_size=args.chunk_size,
+            stats=stats,
+        )
+        for chunk in dump_ndjson(results):
+            sys.stdout.write(chunk)
+    finally:
+        if args.orders:
+            stream.close()
+
+    print(json.dumps(stats.summary()), file=sys.stderr)
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Asynchronous invoice jobs, so checkout doesn't wait for PDF generation.
+
+A job is queued and answered with its ID straight away (202 from
+POST /invoiceGenerator/jobs). A fixed pool of worker threads then saves the
+order, renders the invoice and uploads it, exactly as the synchronous handler
+does, and GET /invoiceGenerator/jobs/<job_id> reports the job's status and,
+once it's done, the invoice path.
+
+The queue is bounded: when it's full, jobs are refused (503) instead of
+piling up, and the caller retries later. GET /invoiceGenerator/jobs shows the
+queue depth and how long jobs wait and take.
+
+A job runs in the process that accepted it. Its status is also written to
+the DynamoDB table named by INVOICE_JOBS_TABLE_NAME, so that a poll landing on
+any other gunicorn worker (or a restarted one) still finds it. Without the
+table, statuses only live in the memory of the accepting process, which then
+has to be the only one (a single gunicorn worker). Either way, the last
+max_finished finished jobs can be polled from memory, and the stats are those
+of the process answering.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from InvoiceGenerator.InvoiceGenerator import generate_invoice
+from utils.aws import AWS
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUED = 1000
+DEFAULT_MAX_FINISHED = 10000
+
+# Recent jobs the wait and latency percentiles are taken over
+LATENCY_WINDOW = 1000
+
+# Seconds a job's status is kept in the table after its last update
+DEFAULT_STATUS_TTL = 24 * 60 * 60
+
+
+class JobStatusTable:
+    """
+    Job statuses kept in a DynamoDB table keyed by job_id, shared by every
+    process. The result is stored as JSON, and items expire through the
+    table's TTL on expires_at.
+
+    Args:
+        table_name (str): The DynamoDB table of the statuses.
+        ttl (int): Seconds a status is kept after its last update.
+        aws (AWSRegistry): Where the table comes from (default: the shared registry).
+    """
+
+    def __init__(self, table_name, ttl=DEFAULT_STATUS_TTL, aws=None):
+        self.table_name = table_name
+        self.ttl = ttl
+        self.aws = aws if aws is not None else AWS
+
+    def put(self, status):
+        """Writes a job's status_dict (see _Job)."""
+        status = dict(status)
+        item = {
+            "job_id": status.pop("job_id"),
+            "status": status.pop("status"),
+            "expires_at": int(time.time()) + self.ttl,
+        }
+        if status:
+            item["result"] = json.dumps(status)
+        self.aws.table(self.table_name).put_item(Item=item)
+
+    def get(self, job_id):
+        """The job's status_dict, or None if there is no such job (or it expired)."""
+        item = self.aws.table(self.table_name).get_item(Key={"job_id": job_id}).get("Item")
+        if item is None:
+            return None
+
+        status = {"job_id": item["job_id"], "status": item["status"]}
+        if item.get("result"):
+            status.update(json.loads(item["result"]))
+        return status
+
+
+class InvoiceJobs:
+    """
+    A bounded queue of invoice requests and the worker threads draining it.
+
+    Workers start with the first job.
+
+    Args:
+        workers (int): Jobs generated at a time.
+        max_queued (int): Jobs waiting for a worker at most; past this,
+            submit raises queue.Full.
+        max_finished (int): Finished jobs whose status is kept.
+        generate (callable): Generates the invoice of a request body,
+            returning the HTTP status code and the response body.
+        statuses (JobStatusTable): Where statuses are shared with the other
+            processes, if anywhere.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED, max_finished=DEFAULT_MAX_FINISHED, generate=generate_invoice, statuses=None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.generate = generate
+        self.statuses = statuses
+        self._queue = queue.Queue(max_queued)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._jobs = {}
+        # Job IDs in the order they finished, to forget the oldest
+        self._finished = deque()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=LATENCY_WINDOW)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    @classmethod
+    def from_env(cls):
+        """
+        INVOICE_JOB_WORKERS workers (default 4), INVOICE_JOB_QUEUE jobs queued
+        at most (default 1000), and statuses shared through the
+        INVOICE_JOBS_TABLE_NAME table if it's set.
+        """
+        table_name = os.environ.get("INVOICE_JOBS_TABLE_NAME")
+        return cls(
+            workers=int(os.environ.get("INVOICE_JOB_WORKERS") or DEFAULT_WORKERS),
+            max_queued=int(os.environ.get("INVOICE_JOB_QUEUE") or DEFAULT_MAX_QUEUED),
+            statuses=JobStatusTable(table_name) if table_name else None,
+        )
+
+    def submit(self, body):
+        """
+        Queues an invoice request.
+
+        Returns:
+            dict: The job's status.
+
+        Raises:
+            queue.Full: max_queued jobs are waiting already.
+        """
+        self._start()
+        job = _Job(str(uuid.uuid4()), body)
+        if self.statuses is not None:
+            # Before it's queued, so a worker's update can't be overwritten
+            # with "queued"; a job whose status can't be written is refused
+            self.statuses.put(job.status_dict())
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._rejected += 1
+                raise
+            self._jobs[job.id] = job
+            return job.status_dict()
+
+    def status(self, job_id):
+        """The job's status, or None if there is no such job (or it was forgotten)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.status_dict()
+
+        # Accepted by another process, or before a restart
+        return self.statuses.get(job_id) if self.statuses is not None else None
+
+    def stats(self):
+        """The queue depth, job counts and recent wait and latency percentiles, in milliseconds."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "max_queued": self.max_queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "wait_ms": _percentiles(self._waits),
+                "latency_ms": _percentiles(self._latencies),
+            }
+
+    def join(self):
+        """Waits until every queued job has finished."""
+        self._queue.join()
+
+    def _start(self):
+        if len(self._threads) == self.workers:
+            return
+
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"invoice-job-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            started = time.monotonic()
+            with self._lock:
+                job.status = RUNNING
+                self._running += 1
+                status = job.status_dict()
+            self._share(job, status)
+
+            try:
+                status_code, result = self.generate(job.body)
+            except Exception as e:
+                print(f"Error: Invoice job {job.id} failed. {e}")
+                status_code, result = 500, {'error': 'Failed to generate the invoice'}
+
+            finished = time.monotonic()
+            with self._lock:
+                self._running -= 1
+                job.finish(DONE if status_code == 200 else FAILED, result)
+                if job.status == DONE:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                self._waits.append(started - job.queued_at)
+                self._latencies.append(finished - job.queued_at)
+                self._finished.append(job.id)
+                while len(self._finished) > self.max_finished:
+                    self._jobs.pop(self._finished.popleft(), None)
+                status = job.status_dict()
+
+            self._share(job, status)
+            self._queue.task_done()
+
+    def _share(self, job, status):
+        if self.statuses is None:
+            return
+
+        try:
+            self.statuses.put(status)
+        except Exception as e:
+            # Polls answered by this process still see it
+            print(f"Error: Unable to save the status of invoice job {job.id} to DynamoDB. {e}")
+
+
+class _Job:
+    __slots__ = ("id", "body", "status", "result", "queued_at")
+
+    def __init__(self, job_id, body):
+        self.id = job_id
+        self.body = body
+        self.status = QUEUED
+        self.result = None
+        self.queued_at = time.monotonic()
+
+    def finish(self, status, result):
+        self.status = status
+        self.result = result
+        # Finished jobs are kept for polling; their requests needn't be
+        self.body = None
+
+    def status_dict(self):
+        status = {"job_id": self.id, "status": self.status}
+        if self.result:
+            status.update(self.result)
+        return status
+
+
+def _percentiles(seconds):
+    if not seconds:
+        return None
+
+    ordered = sorted(seconds)
+    last = len(ordered) - 1
+    return {name: round(ordered[int(fraction * last)] * 1e3, 1) for name, fraction in (("p50", 0.5), ("p95", 0.95), ("max", 1.0))}
+
+
+# The process-wide job queue
+INVOICE_JOBS = InvoiceJobs.from_env()
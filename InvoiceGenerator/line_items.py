@@ -0,0 +1,298 @@
+"""
+Invoices with many line items, laid out page by page and written as a stream.
+
+Every page starts with a header (the business, the invoice number and the page
+number) and the column headings; the first page also has the order and the
+customer, and later pages the subtotal carried forward. Item rows follow until
+the page is full, and the page then ends with the running subtotal. The last
+page ends with the total instead.
+
+Items are read from any iterable (a JSON array, or NDJSON lines as they
+arrive) and each page is written out as soon as it's full, so only the current
+page is held in memory, whatever the number of items; what grows is one offset
+per PDF object, two per page. The text is written as fpdf writes cells, in
+fpdf's built-in Helvetica.
+"""
+import math
+import tempfile
+import zlib
+from datetime import datetime
+
+from fpdf.fonts import fpdf_charwidths
+
+from InvoiceGenerator.template import escape
+
+# Points per millimetre
+K = 72 / 25.4
+
+# A4, in millimetres
+PAGE_WIDTH = 210.0
+PAGE_HEIGHT = 297.0
+MARGIN = 10.0
+CELL_MARGIN = 1.0
+
+TITLE_SIZE = 12
+ROW_SIZE = 10
+TITLE_HEIGHT = 10.0
+FIELD_HEIGHT = 8.0
+ROW_HEIGHT = 6.0
+FOOTER_HEIGHT = 2 * FIELD_HEIGHT
+
+# The right edges of the numeric columns; descriptions get the rest
+QUANTITY_RIGHT = 140.0
+PRICE_RIGHT = 170.0
+AMOUNT_RIGHT = PAGE_WIDTH - MARGIN
+DESCRIPTION_WIDTH = 110.0
+
+FIRST_PAGE_FIELDS = (
+    ("Order ID", 'order_id'),
+    ("Ordered At", 'ordered_at'),
+    ("Customer Name", 'customer_name'),
+    ("Customer Address", 'customer_address'),
+)
+
+# Rendered invoices past this size spill from memory to a temporary file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# PDF objects: the page tree, resources, fonts, info and catalog come first,
+# then every page and its content stream
+PAGES_ID, RESOURCES_ID, REGULAR_ID, BOLD_ID, INFO_ID, CATALOG_ID = range(1, 7)
+FIRST_PAGE_ID = 7
+
+_FONT = b"<</Type /Font\n/BaseFont /%s\n/Subtype /Type1\n/Encoding /WinAnsiEncoding\n>>"
+_WIDTHS = (fpdf_charwidths['helvetica'], fpdf_charwidths['helveticaB'])
+
+
+def parse_line_item(value, number):
+    """
+    Args:
+        value (dict): {"item_purchased": ..., "item_price": ..., "item_quantity": ...},
+            with the defaults of a single-item invoice.
+        number (int): The item's 1-based position, for errors.
+
+    Returns:
+        tuple: The description, unit price and quantity.
+
+    Raises:
+        ValueError: The item isn't an object, or its price or quantity isn't
+            a number.
+    """
+    if not isinstance(value, dict):
+        raise ValueError(f"Invalid line item {number}")
+
+    price = value.get('item_price', 0)
+    quantity = value.get('item_quantity', 1)
+    if not _is_number(price) or not _is_number(quantity):
+        raise ValueError(f"Invalid line item {number}")
+    return str(value.get('item_purchased', 'Unknown')), price, quantity
+
+
+def iter_invoice_pdf(fields, items, created=None):
+    """
+    Lays an invoice with line items out, a page at a time.
+
+    Args:
+        fields (dict): render_invoice's business_name, invoice_number,
+            order_id, ordered_at, customer_name and customer_address; other
+            keys are ignored.
+        items (iterable): The line items, as parse_line_item takes them; read
+            once, as the pages fill.
+        created (datetime): The creation date (default: now).
+
+    Yields:
+        bytes: The PDF, page by page.
+
+    Raises:
+        ValueError: An item isn't a valid line item.
+    """
+    writer = _Writer()
+    yield writer.start()
+
+    page = _start_page(fields, 1, 0.0)
+    subtotal = 0.0
+    for number, value in enumerate(items, 1):
+        description, price, quantity = parse_line_item(value, number)
+        if not page.fits(ROW_HEIGHT):
+            _end_page(page, "Subtotal carried forward", subtotal)
+            yield writer.page(page)
+            page = _start_page(fields, page.number + 1, subtotal)
+
+        amount = price * quantity
+        subtotal += amount
+        page.text(_fit(description, DESCRIPTION_WIDTH - 2 * CELL_MARGIN), MARGIN, ROW_HEIGHT)
+        page.text(f"{quantity}", QUANTITY_RIGHT, ROW_HEIGHT, align='R')
+        page.text(f"${price:.2f}", PRICE_RIGHT, ROW_HEIGHT, align='R')
+        page.text(f"${amount:.2f}", AMOUNT_RIGHT, ROW_HEIGHT, align='R')
+        page.advance(ROW_HEIGHT)
+
+    _end_page(page, "Total Amount", subtotal, last=True)
+    yield writer.page(page)
+    yield writer.finish(created or datetime.now())
+
+
+def spool_invoice_pdf(fields, items, max_size=SPOOL_MAX_BYTES):
+    """
+    Renders an invoice with line items into a temporary file, kept in memory
+    up to max_size bytes.
+
+    Returns:
+        tempfile.SpooledTemporaryFile: The PDF, rewound; the caller closes it.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size)
+    try:
+        for chunk in iter_invoice_pdf(fields, items):
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return spool
+
+
+class _Page:
+    """One page's content stream, filled top to bottom"""
+
+    __slots__ = ("number", "ops", "top", "font")
+
+    def __init__(self, number):
+        self.number = number
+        self.ops = ["0.57 w\n"]
+        self.top = MARGIN
+        self.font = None
+
+    def fits(self, height):
+        return self.top + height <= PAGE_HEIGHT - MARGIN - FOOTER_HEIGHT
+
+    def advance(self, height):
+        self.top += height
+
+    def text(self, text, x, height, size=ROW_SIZE, bold=False, align='L'):
+        """
+        Writes text in a row of the given height at the top of what's left;
+        x is the left edge (align 'L'), right edge ('R') or centre ('C').
+        """
+        font = (bold, size)
+        if font != self.font:
+            self.ops.append("BT /F%d %.2f Tf ET\n" % (2 if bold else 1, size))
+            self.font = font
+
+        if align == 'L':
+            x += CELL_MARGIN
+        elif align == 'R':
+            x -= CELL_MARGIN + _width(text, size, bold)
+        else:
+            x -= _width(text, size, bold) / 2.0
+        baseline = self.top + 0.5 * height + 0.3 * size / K
+        self.ops.append("BT %.2f %.2f Td (%s) Tj ET\n" % (x * K, (PAGE_HEIGHT - baseline) * K, escape(text)))
+
+    def rule(self):
+        y = (PAGE_HEIGHT - self.top) * K
+        self.ops.append("%.2f %.2f m %.2f %.2f l S\n" % (MARGIN * K, y, (PAGE_WIDTH - MARGIN) * K, y))
+
+
+def _start_page(fields, number, carried):
+    page = _Page(number)
+    page.text(f"Invoice from: {fields['business_name']}", PAGE_WIDTH / 2, TITLE_HEIGHT, TITLE_SIZE, align='C')
+    page.advance(TITLE_HEIGHT)
+    page.text(f"Invoice Number: {fields['invoice_number']}", MARGIN, FIELD_HEIGHT, TITLE_SIZE)
+    page.text(f"Page {number}", PAGE_WIDTH - MARGIN, FIELD_HEIGHT, TITLE_SIZE, align='R')
+    page.advance(FIELD_HEIGHT)
+    if number == 1:
+        for label, key in FIRST_PAGE_FIELDS:
+            page.text(f"{label}: {fields[key]}", MARGIN, FIELD_HEIGHT, TITLE_SIZE)
+            page.advance(FIELD_HEIGHT)
+
+    page.advance(ROW_HEIGHT / 2)
+    page.text("Item", MARGIN, ROW_HEIGHT, bold=True)
+    page.text("Quantity", QUANTITY_RIGHT, ROW_HEIGHT, bold=True, align='R')
+    page.text("Unit Price", PRICE_RIGHT, ROW_HEIGHT, bold=True, align='R')
+    page.text("Amount", AMOUNT_RIGHT, ROW_HEIGHT, bold=True, align='R')
+    page.advance(ROW_HEIGHT)
+    page.rule()
+    if number > 1:
+        page.text("Carried forward", MARGIN, ROW_HEIGHT)
+        page.text(f"${carried:.2f}", AMOUNT_RIGHT, ROW_HEIGHT, align='R')
+        page.advance(ROW_HEIGHT)
+    return page
+
+
+def _end_page(page, label, subtotal, last=False):
+    page.top = PAGE_HEIGHT - MARGIN - FOOTER_HEIGHT
+    page.rule()
+    page.text(f"{label}: ${subtotal:.2f}", AMOUNT_RIGHT, FIELD_HEIGHT, TITLE_SIZE, bold=last, align='R')
+    page.advance(FIELD_HEIGHT)
+    if last:
+        page.text("Thank you for your order!", MARGIN, FIELD_HEIGHT, TITLE_SIZE)
+
+
+class _Writer:
+    """Writes PDF objects in order, remembering only their offsets"""
+
+    def __init__(self):
+        self.position = 0
+        # By object number; the first objects are written last
+        self.offsets = [0] * FIRST_PAGE_ID
+        self.pages = 0
+
+    def start(self):
+        header = b"%PDF-1.3\n"
+        self.position = len(header)
+        return header + self._object(REGULAR_ID, _FONT % b"Helvetica") + self._object(BOLD_ID, _FONT % b"Helvetica-Bold")
+
+    def page(self, page):
+        # Text that isn't latin1 comes out as "?" instead of failing the invoice
+        stream = zlib.compress("".join(page.ops).encode('latin1', 'replace'))
+        page_id = len(self.offsets)
+        self.pages += 1
+        return self._object(
+            page_id, b"<</Type /Page\n/Parent %d 0 R\n/Resources %d 0 R\n/Contents %d 0 R>>" % (PAGES_ID, RESOURCES_ID, page_id + 1)
+        ) + self._object(page_id + 1, b"<</Filter /FlateDecode /Length %d>>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    def finish(self, created):
+        kids = b" ".join(b"%d 0 R" % (FIRST_PAGE_ID + 2 * page) for page in range(self.pages))
+        chunks = [
+            self._object(PAGES_ID, b"<</Type /Pages\n/Kids [%s]\n/Count %d\n/MediaBox [0 0 %.2f %.2f]\n>>" % (kids, self.pages, PAGE_WIDTH * K, PAGE_HEIGHT * K)),
+            self._object(RESOURCES_ID, b"<<\n/ProcSet [/PDF /Text]\n/Font <<\n/F1 %d 0 R\n/F2 %d 0 R\n>>\n>>" % (REGULAR_ID, BOLD_ID)),
+            self._object(INFO_ID, b"<<\n/Producer (InvoiceGenerator)\n/CreationDate (D:%s)\n>>" % created.strftime('%Y%m%d%H%M%S').encode()),
+            self._object(CATALOG_ID, b"<<\n/Type /Catalog\n/Pages %d 0 R\n/OpenAction [%d 0 R /FitH null]\n/PageLayout /OneColumn\n>>" % (PAGES_ID, FIRST_PAGE_ID)),
+        ]
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % len(self.offsets)]
+        xref.extend(b"%010d 00000 n \n" % offset for offset in self.offsets[1:])
+        chunks.append(b"".join(xref))
+        chunks.append(b"trailer\n<<\n/Size %d\n/Root %d 0 R\n/Info %d 0 R\n>>\nstartxref\n%d\n%%%%EOF\n" % (len(self.offsets), CATALOG_ID, INFO_ID, self.position))
+        return b"".join(chunks)
+
+    def _object(self, number, body):
+        if number == len(self.offsets):
+            self.offsets.append(self.position)
+        else:
+            self.offsets[number] = self.position
+        chunk = b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        self.position += len(chunk)
+        return chunk
+
+
+def _width(text, size, bold=False):
+    """text's width in millimetres"""
+    widths = _WIDTHS[bold]
+    return sum(widths.get(char, 0) for char in text) * size / 1000.0 / K
+
+
+def _fit(text, width, size=ROW_SIZE):
+    """text, cut short with "..." if it's wider than width millimetres"""
+    if _width(text, size) <= width:
+        return text
+
+    widths = _WIDTHS[False]
+    room = width * K * 1000.0 / size - 3 * widths['.']
+    used = 0
+    for end, char in enumerate(text):
+        used += widths.get(char, 0)
+        if used > room:
+            return text[:end] + "..."
+    return text
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
@@ -0,0 +1,203 @@
+"""
+Compiled invoice templates.
+
+An invoice is one page of text lines, each a str.format pattern in a cell of
+its own. fpdf does all of the page's work again for every invoice: page and
+font setup, the layout of every cell, every object of the document and their
+offsets. compile_template does it once per process, with placeholders for the
+lines that have fields, and keeps everything around them. Rendering then only
+formats and escapes those lines into the page's content stream, compresses it
+and shifts the offsets that move with its length. Lines without fields are
+laid out once, when the template compiles.
+
+A compiled template renders the same bytes fpdf writes for the same values.
+"""
+import re
+import string
+import zlib
+from datetime import datetime
+
+from fpdf import FPDF
+
+PAGE_FORMAT = "A4"
+FONT_FAMILY = "Arial"
+FONT_SIZE = 12
+CELL_WIDTH = 200
+CELL_HEIGHT = 10
+
+# Stands in for the text of line N while a template compiles
+_PLACEHOLDER = "\x00%d\x00"
+_PLACEHOLDER_OP = re.compile(r"BT (\S+) (\S+) Td \(\x00(\d+)\x00\) Tj ET\n")
+_STREAM = b"<</Filter /FlateDecode /Length %d>>\nstream\n%s\nendstream"
+# The parts of the document after the page stream that change per render
+_TAIL_SLOTS = re.compile(rb"(?<=/CreationDate \(D:)(?P<date>\d{14})(?=\))|(?P<offset>\d{10})(?= 00000 n )|(?<=startxref\n)(?P<startxref>\d+)")
+
+
+def new_document():
+    """An fpdf document with the invoice's page and font set up."""
+    pdf = FPDF(orientation="portrait", unit="mm", format=PAGE_FORMAT)
+    pdf.add_page()
+    pdf.set_font(FONT_FAMILY, size=FONT_SIZE)
+    return pdf
+
+
+def draw(lines, values):
+    """
+    Renders lines with fpdf, cell by cell.
+
+    Args:
+        lines: (str.format pattern, fpdf cell align) pairs, top to bottom.
+        values (dict): The patterns' fields.
+
+    Returns:
+        bytes: The PDF.
+    """
+    pdf = new_document()
+    for pattern, align in lines:
+        pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=pattern.format(**values), ln=True, align=align)
+
+    # fpdf keeps the document as a str of latin1 code points
+    return pdf.output(dest='S').encode('latin1')
+
+
+def compile_template(lines):
+    """
+    Lays lines out once, for CompiledTemplate.render to fill in.
+
+    Args:
+        lines: (str.format pattern, fpdf cell align) pairs, top to bottom;
+            they must fit on one page.
+
+    Returns:
+        CompiledTemplate: Renders what draw(lines, values) does.
+    """
+    lines = list(lines)
+    pdf = new_document()
+    for index, (pattern, align) in enumerate(lines):
+        text = _PLACEHOLDER % index if _has_fields(pattern) else pattern.format()
+        pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=text, ln=True, align=align)
+    if pdf.page != 1:
+        raise ValueError(f"Templates are one page, but {len(lines)} lines take {pdf.page}")
+
+    document = pdf.output(dest='S').encode('latin1')
+    content = pdf.pages[1]
+    stream = zlib.compress(content.encode('latin1'))
+    stream_object = _STREAM % (len(stream), stream)
+    start = document.find(stream_object)
+    if start < 0:
+        raise ValueError("The page's content stream isn't where fpdf 1.7 writes it")
+    end = start + len(stream_object)
+
+    # Content between the lines with fields, and those lines
+    parts = _PLACEHOLDER_OP.split(content)
+    statics = parts[::4]
+    fields = []
+    for x, y, index in zip(parts[1::4], parts[2::4], parts[3::4]):
+        pattern, align = lines[int(index)]
+        fields.append(_Field(pattern, align, x, y, pdf))
+
+    # The creation date, and the offsets of the objects after the page stream
+    tail = document[end:].replace(b"%", b"%%")
+    tail_bases = []
+
+    def slot(match):
+        if match.lastgroup == "date":
+            tail_bases.append(None)
+            return b"%s"
+        offset = int(match.group())
+        if offset < start:
+            return match.group()
+        tail_bases.append(offset)
+        return b"%010d" if match.lastgroup == "offset" else b"%d"
+
+    tail = _TAIL_SLOTS.sub(slot, tail)
+    return CompiledTemplate(document[:start], statics, fields, tail, tail_bases, len(stream_object))
+
+
+class CompiledTemplate:
+    """
+    An invoice layout with everything but its fields already written out.
+
+    Args:
+        head (bytes): The document up to the page's content stream.
+        statics (list): The content stream around the lines with fields.
+        fields (list): The lines with fields, as _Field.
+        tail (bytes): The rest of the document, a %-format of tail_bases.
+        tail_bases (list): The offsets in the tail as compiled (None for the
+            creation date).
+        stream_length (int): The length of the content stream object as
+            compiled.
+    """
+
+    __slots__ = ("head", "statics", "fields", "tail", "tail_bases", "stream_length")
+
+    def __init__(self, head, statics, fields, tail, tail_bases, stream_length):
+        self.head = head
+        self.statics = statics
+        self.fields = fields
+        self.tail = tail
+        self.tail_bases = tail_bases
+        self.stream_length = stream_length
+
+    def render(self, values):
+        """
+        Args:
+            values (dict): The lines' fields.
+
+        Returns:
+            bytes: The PDF.
+        """
+        statics = self.statics
+        content = [statics[0]]
+        for field, static in zip(self.fields, statics[1:]):
+            content.append(field.stamp(values))
+            content.append(static)
+
+        stream = zlib.compress("".join(content).encode('latin1'))
+        stream_object = _STREAM % (len(stream), stream)
+        shift = len(stream_object) - self.stream_length
+        created = datetime.now().strftime('%Y%m%d%H%M%S').encode()
+        tail = self.tail % tuple(created if base is None else base + shift for base in self.tail_bases)
+        return b"".join((self.head, stream_object, tail))
+
+
+class _Field:
+    """A line with fields, laid out as fpdf's cell would"""
+
+    __slots__ = ("pattern", "align", "op", "y", "x", "k", "char_widths", "font_size", "margin")
+
+    def __init__(self, pattern, align, x, y, pdf):
+        self.pattern = pattern
+        self.align = align
+        self.op = "BT " + x + " " + y + " Td (%s) Tj ET\n"
+        self.y = y
+        # The cell's left edge, where fpdf's ln=True puts every line
+        self.x = pdf.l_margin
+        self.k = pdf.k
+        self.char_widths = pdf.current_font['cw']
+        self.font_size = pdf.font_size
+        self.margin = pdf.c_margin
+
+    def stamp(self, values):
+        text = self.pattern.format(**values)
+        # fpdf writes nothing for an empty cell
+        if text == '':
+            return ''
+
+        escaped = escape(text)
+        if self.align not in ('C', 'R'):
+            return self.op % escaped
+
+        char_widths = self.char_widths
+        width = sum(char_widths.get(char, 0) for char in text) * self.font_size / 1000.0
+        dx = (CELL_WIDTH - width) / 2.0 if self.align == 'C' else CELL_WIDTH - self.margin - width
+        return 'BT %.2f %s Td (%s) Tj ET\n' % ((self.x + dx) * self.k, self.y, escaped)
+
+
+def escape(text):
+    """Escapes text for a PDF string literal, as fpdf does."""
+    return text.replace('\\', '\\\\').replace(')', '\\)').replace('(', '\\(').replace('\r', '\\r')
+
+
+def _has_fields(pattern):
+    return any(field is not None for _, field, _, _ in string.Formatter().parse(pattern))
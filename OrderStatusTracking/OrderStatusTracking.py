@@ -1,8 +1,14 @@
 import json
+from tracking_numbers import enable_cache_from_env
+from tracking_numbers import get_definitions_for_courier
 from tracking_numbers import get_tracking_number
 from utils.parser import parse_event_body
 from utils.response import response
 
+# Repeat lookups of the same number (e.g. tracking page refreshes) are served
+# from an LRU cache when TRACKING_NUMBER_CACHE_SIZE is set
+enable_cache_from_env()
+
 
 def lambda_handler(event, context):
     """
@@ -19,9 +25,15 @@ def lambda_handler(event, context):
         return response(400, {'error': 'Missing tracking number'})
 
 
+    # Optional carrier (code or name) already known from the order, so only
+    # that carrier's tracking number formats are tested
+    courier = body.get("carrier")
+    if courier is not None and (not isinstance(courier, str) or not get_definitions_for_courier(courier)):
+        return response(400, {'error': 'Invalid carrier'})
+
     # Get carrier details using tracking-numbers library
     try:
-        tracking_info = get_tracking_number(tracking_number)
+        tracking_info = get_tracking_number(tracking_number, courier=courier)
     except Exception as e:
         return response(500, {'error': 'Failed to process tracking number', 'details': str(e)})
 
@@ -1,67 +1,315 @@
-import json
+import datetime
+import os
+
+from tracking_numbers import enable_cache_from_env
+from tracking_numbers import get_definitions_for_courier
 from tracking_numbers import get_tracking_number
+from ShippingSuggestion.live_rates import LiveRates
+from ShippingSuggestion.quoting import quote_pieces
+from ShippingSuggestion.rate_cards import RateCardStore
+from ShippingSuggestion.transit_times import TransitTimes
+from ShippingSuggestion.zones import ZoneResolver
 from utils.parser import parse_event_body
 from utils.response import response
 
+# Repeat lookups of the same number (e.g. tracking page refreshes) are served
+# from an LRU cache when TRACKING_NUMBER_CACHE_SIZE is set
+enable_cache_from_env()
+
+# Carrier rate cards, reloaded when RATE_CARDS_PATH changes on disk
+RATE_CARDS = RateCardStore.from_env()
+
+# Destination -> shipping zone, from the local zones dataset (ZONES_PATH)
+ZONES = ZoneResolver.from_env()
+
+# Live EasyPost rates for the carriers in EASYPOST_CARRIER_ACCOUNTS, or None
+# when EASYPOST_API_KEY isn't set
+LIVE_RATES = LiveRates.from_env(RATE_CARDS)
+
+# Multi-piece requests are quoted in one pass, up to this many pieces
+MAX_PIECES = 1000
+
+# Business days in transit by origin zone, destination zone and service, for
+# delivery ETAs; parcels ship from the zone of SHIP_FROM_ZIP
+TRANSIT_TIMES = TransitTimes.from_env()
+ORIGIN_ZONE = ZONES.resolve(os.environ.get("SHIP_FROM_ZIP") or "")
+
+
 def lambda_handler(event, context):
 
     """
     AWS Lambda function that generates a shipping suggestion based on the provided tracking number.
     """
     body = parse_event_body(event)
-    if not body:
-        return response(400, {'error': 'Invalid input'})
+    status_code, result = suggest_shipping(body)
+    return response(status_code, result)
+
+
+def suggest_shipping_batch(bodies):
+    """
+    Suggests shipping for many parsed request bodies, one result per body.
+
+    Args:
+        bodies (iterable): (line number, body) pairs; a body of None is a line
+            that couldn't be parsed.
+
+    Yields:
+        dict: The line number with the response body of suggest_shipping.
+    """
+    for line, body in bodies:
+        _, result = suggest_shipping(body)
+        yield {"line": line, **result}
+
+
+def suggest_shipping(body):
+    """
+    Validates one request body and suggests a shipping method for it.
+
+    Args:
+        body (dict): The parsed request body.
+
+    Returns:
+        tuple: The HTTP status code and the response body.
+    """
+    if not body or not isinstance(body, dict):
+        return 400, {'error': 'Invalid input'}
     
     if "tracking_number" not in body:
-        return response(400, {'error': 'Missing tracking number'})
+        return 400, {'error': 'Missing tracking number'}
   
     tracking_number = body["tracking_number"]
     if not tracking_number or not isinstance(tracking_number, str):
-        return response(400, {'error': 'Invalid or missing tracking number'})
-        
-    weight = body.get("weight")
-    if not weight or not isinstance(weight, (int, float)):
-        return response(400, {'error': 'Invalid or missing weight'})
+        return 400, {'error': 'Invalid or missing tracking number'}
         
+    # Either a list of pieces, each with a weight and optional dimensions, or
+    # one weight with optional dimensions
+    pieces = None
+    if "pieces" in body:
+        pieces = parse_pieces(body["pieces"])
+        if pieces is None:
+            return 400, {'error': 'Invalid pieces'}
+        weight = sum(piece_weight for piece_weight, _ in pieces)
+    else:
+        weight = body.get("weight")
+        if not weight or not isinstance(weight, (int, float)):
+            return 400, {'error': 'Invalid or missing weight'}
+        if "dimensions" in body:
+            volume = parse_volume(body["dimensions"])
+            if volume is None:
+                return 400, {'error': 'Invalid dimensions'}
+            pieces = [(weight, volume)]
+
     destination = body.get("destination")
     if not destination or not isinstance(destination, str):
-        return response(400, {'error': 'Invalid or missing destination'})
+        return 400, {'error': 'Invalid or missing destination'}
+    # Optional ISO dates: when the parcel ships (default today) and the
+    # latest acceptable delivery
+    ship_date = datetime.datetime.now(datetime.timezone.utc).date()
+    if body.get("ship_date") is not None:
+        ship_date = parse_date(body["ship_date"])
+        if ship_date is None:
+            return 400, {'error': 'Invalid ship_date'}
+
+    deliver_by = None
+    if body.get("deliver_by") is not None:
+        deliver_by = parse_date(body["deliver_by"])
+        if deliver_by is None:
+            return 400, {'error': 'Invalid deliver_by'}
+    # Optional carrier (code or name) already known from the order, so only
+    # that carrier's tracking number formats are tested
+    courier = body.get("carrier")
+    if courier is not None and (not isinstance(courier, str) or not get_definitions_for_courier(courier)):
+        return 400, {'error': 'Invalid carrier'}
     # Validate tracking number
-    tracking_info = get_tracking_number(tracking_number)
+    tracking_info = get_tracking_number(tracking_number, courier=courier)
+
     carrier = tracking_info.courier.name if tracking_info and tracking_info.courier else "Unknown"
 
             # Get shipping suggestion
-    shipping_suggestion = suggest_shipping_method(weight, destination, carrier)
+    shipping_suggestion = suggest_shipping_method(weight, destination, carrier, pieces)
+    if shipping_suggestion is None:
+        return 400, {'error': 'No rate available for this shipment'}
 
-    return {
-            'statusCode': 200,
-            'body': json.dumps({
-                "tracking_number": tracking_number,
-                "carrier": carrier,
-                "tracking_url": getattr(tracking_info, 'tracking_url', "N/A"),
-                "weight": weight,
-                "destination": destination,
-                "suggestion": shipping_suggestion
-        })
+    add_delivery_estimates(shipping_suggestion, ZONES.resolve(destination), ship_date)
+    if deliver_by is not None:
+        if "rates" in shipping_suggestion:
+            rates = [rate for rate in shipping_suggestion["rates"] if _arrives_by(rate, deliver_by)]
+            shipping_suggestion["rates"] = rates
+            # When the carrier's own option is too slow, the cheapest one in time is suggested
+            if rates and not _arrives_by(shipping_suggestion, deliver_by):
+                shipping_suggestion.update(rates[0])
+        if not _arrives_by(shipping_suggestion, deliver_by):
+            return 400, {'error': 'No shipping option arrives by deliver_by'}
+
+    return 200, {
+        "tracking_number": tracking_number,
+        "carrier": carrier,
+        "tracking_url": getattr(tracking_info, 'tracking_url', "N/A"),
+        "weight": weight,
+        "destination": destination,
+        "suggestion": shipping_suggestion
     }
+
     
-def suggest_shipping_method(weight, destination, carrier):
+def parse_date(value):
+    """A datetime.date from an ISO date string, or None if it isn't one."""
+    if not isinstance(value, str):
+        return None
+
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def add_delivery_estimates(suggestion, zone, ship_date):
     """
-    Determines the best shipping method based on weight, destination, and carrier.
+    Adds "transit_days" and "estimated_delivery" (an ISO date, or None where
+    neither a live quote nor the transit times cover the method) to a
+    suggestion, its pieces and its rates. A multi-piece suggestion arrives with its slowest piece.
     """
-    if carrier in ["UPS", "FedEx"]:
-        method = "Express Shipping"
-        cost = 30
-    elif carrier == "USPS":
-        method = "Standard Postal Delivery"
-        cost = 15
+    for option in suggestion.get("pieces", ()):
+        _add_delivery_estimate(option, zone, ship_date)
+    for option in suggestion.get("rates", ()):
+        _add_delivery_estimate(option, zone, ship_date)
+
+    if "pieces" in suggestion:
+        estimates = [(piece["estimated_delivery"], piece["transit_days"]) for piece in suggestion["pieces"]]
+        unknown = any(delivery is None for delivery, _ in estimates)
+        delivery, days = (None, None) if unknown else max(estimates)
+        suggestion.update(transit_days=days, estimated_delivery=delivery)
     else:
-        method = "Generic Carrier Shipping"
-        cost = 20
+        _add_delivery_estimate(suggestion, zone, ship_date)
+
+    return suggestion
 
-    if weight > 10:
-        method = "Freight"
-        cost += 20  # Adjust cost for heavy shipments
 
-    return {"method": method, "estimated_cost": cost}
+def _add_delivery_estimate(option, zone, ship_date):
+    # Live quotes come with the carrier's transit days; rate card methods are looked up
+    days = option.get("transit_days")
+    if days is None:
+        days = TRANSIT_TIMES.transit_days(ORIGIN_ZONE, zone, option["method"])
+    delivery = TRANSIT_TIMES.eta_after(days, ship_date) if days is not None else None
+    option.update(transit_days=days, estimated_delivery=delivery.isoformat() if delivery else None)
 
+
+def _arrives_by(option, deliver_by):
+    # ISO dates compare in date order; unknown deliveries never qualify
+    return option["estimated_delivery"] is not None and option["estimated_delivery"] <= deliver_by.isoformat()
+
+
+def parse_volume(dimensions):
+
+    """
+    The volume of {"length": ..., "width": ..., "height": ...}, or None if
+    any of them isn't a positive number.
+    """
+    if not isinstance(dimensions, dict):
+        return None
+
+    volume = 1
+    for side in ("length", "width", "height"):
+        value = dimensions.get(side)
+        if not isinstance(value, (int, float)) or value <= 0:
+            return None
+        volume *= value
+
+    return volume
+
+
+def parse_pieces(pieces):
+    """
+    Parses [{"weight": ..., "dimensions": {...}}, ...] into (weight, volume)
+    pairs, with a volume of 0 for pieces without dimensions.
+
+    Returns None if the list is empty, too long or has an invalid piece.
+    """
+    if not isinstance(pieces, list) or not 0 < len(pieces) <= MAX_PIECES:
+        return None
+
+    parsed = []
+    for piece in pieces:
+        if not isinstance(piece, dict):
+            return None
+        weight = piece.get("weight")
+        if not weight or not isinstance(weight, (int, float)) or weight < 0:
+            return None
+        volume = 0
+        if "dimensions" in piece:
+            volume = parse_volume(piece["dimensions"])
+            if volume is None:
+                return None
+        parsed.append((weight, volume))
+
+    return parsed
+
+
+def suggest_shipping_method(weight, destination, carrier, pieces=None):
+    """
+    Determines the best shipping method based on weight, destination, and carrier,
+    from the carrier's rate card (or the generic one for unlisted carriers) for
+    the destination's zone.
+
+    With pieces ((weight, volume) pairs), every piece is priced at its
+    billable weight for the carrier (the greater of its actual and
+    dimensional weight), and the suggestion totals them. Pieces are always
+    priced from the rate cards, as live rates quote one parcel by weight;
+    with live rates configured, the suggestion's "source" says so.
+
+    With live rates configured, every configured carrier is also quoted live
+    (in parallel, falling back to the rate cards past the time budget), all of
+    them are listed under "rates", and the carrier's own live quote is used
+    when it has one.
+
+    Returns None if no weight break covers the weight.
+    """
+    location = ZONES.locate(destination)
+    zone = location.zone
+    if pieces is not None:
+        suggestion = _suggest_pieces(pieces, zone, carrier)
+        if suggestion is not None and LIVE_RATES is not None:
+            suggestion["source"] = "rate_card"
+        return suggestion
+
+    options = None
+
+    if LIVE_RATES is not None:
+        rates = LIVE_RATES.shop(destination, weight, zone, location.country)
+        options = [
+            {"carrier": rate.carrier, "method": rate.method, "estimated_cost": rate.cost, "source": rate.source, "transit_days": rate.transit_days}
+            for rate in rates
+        ]
+        for rate in rates:
+            if rate.carrier == carrier:
+                return {"method": rate.method, "estimated_cost": rate.cost, "source": rate.source, "transit_days": rate.transit_days, "rates": options}
+
+    quote = RATE_CARDS.current().quote(carrier, zone, weight)
+
+    if quote is None:
+        return None
+
+    suggestion = {"method": quote.method, "estimated_cost": quote.cost}
+    if options is not None:
+        suggestion.update(source="rate_card", rates=options)
+    return suggestion
+
+
+def _suggest_pieces(pieces, zone, carrier):
+    weights, volumes = zip(*pieces)
+    quotes = quote_pieces(weights, volumes, zone, RATE_CARDS.current(), [carrier])
+    billable = quotes.billable_weights[:, 0].tolist()
+    methods = quotes.methods[:, 0].tolist()
+    costs = quotes.costs[:, 0].tolist()
+    if None in methods:
+        return None
+
+    return {
+        # Each distinct method once, in piece order
+        "method": ", ".join(dict.fromkeys(methods)),
+        "estimated_cost": sum(costs),
+        "billable_weight": sum(billable),
+        "pieces": [
+            {"weight": weight, "billable_weight": billable_weight, "method": method, "estimated_cost": cost}
+            for weight, billable_weight, method, cost in zip(weights, billable, methods, costs)
+        ],
+    }
@@ -0,0 +1,112 @@
+"""
+A thread-safe, size-bounded LRU cache with an optional TTL, for the shipping
+modules' lookups (resolved zones, live carrier quotes).
+
+Values are computed outside the lock, so two threads missing on the same key
+may both compute it; callers that mustn't do that (live rates) track their
+in-flight keys themselves and fill the cache with put.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, NamedTuple, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class CacheStats(NamedTuple):
+    capacity: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache(Generic[T]):
+    """
+    Args:
+        capacity (int): Entries kept at most; the least recently used go first.
+        ttl (float): Seconds an entry is kept for, or None for no limit.
+        max_key_length (int): Longer keys are never cached (they count as
+            misses), so garbage input can't pin large strings; None for no
+            limit.
+    """
+
+    def __init__(self, capacity: int, ttl: Optional[float] = None, max_key_length: Optional[int] = None):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}")
+
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_key_length = max_key_length
+        self._entries: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[str], T]) -> T:
+        now = time.monotonic()
+        value = self._get(key, now)
+        if value is _MISSING:
+            value = compute(key)
+            self._put(key, value, now)
+
+        return value
+
+    def get(self, key: str, default: Optional[T] = None) -> Optional[T]:
+        value = self._get(key, time.monotonic())
+        return default if value is _MISSING else value
+
+    def put(self, key: str, value: T) -> None:
+        self._put(key, value, time.monotonic())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.capacity, len(self._entries), self._hits, self._misses, self._evictions, self._expirations)
+
+    def _cacheable(self, key):
+        return self.max_key_length is None or len(key) <= self.max_key_length
+
+    def _get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key) if self._cacheable(key) else None
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+
+                del self._entries[key]
+                self._expirations += 1
+
+            self._misses += 1
+            return _MISSING
+
+    def _put(self, key, value, now):
+        if not self._cacheable(key):
+            return
+
+        expires_at = now + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
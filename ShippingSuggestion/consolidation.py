@@ -0,0 +1,324 @@
+"""
+Consolidation: merges pending parcels to the same destination and time window
+into fewer shipments.
+
+Parcels are grouped by normalized destination and ready-time window. Each group
+is packed into every carrier's weight and volume limits with best-fit
+decreasing: heaviest parcel first, each into the open shipment whose spare
+weight fits it most tightly. The merged shipments are quoted with
+cheapest_quotes at each carrier's billable weight (see billable_weights), as
+are the parcels on their own, and a group is only merged when that beats
+shipping its parcels separately. Sorting dominates, so a pass is O(n log n).
+"""
+import math
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ShippingSuggestion.quoting import any_zone, billable_weights, cheapest_quotes
+from ShippingSuggestion.rate_cards import ANY, CarrierLimits, RateCards
+from ShippingSuggestion.zones import normalize
+
+# Parcels ready within the same window (in seconds) may ship together
+DEFAULT_WINDOW = 4 * 60 * 60
+
+# Open shipments tried for a parcel's volume before a new one is opened
+MAX_CANDIDATES = 8
+
+CONSOLIDATED = "consolidated"
+SINGLE_PARCEL = "single parcel"
+NOT_CHEAPER = "not cheaper than shipping separately"
+NO_CARRIER = "no carrier can take the merged shipments"
+
+
+class Parcel(NamedTuple):
+    id: str
+    destination: str
+    weight: float
+    # Seconds since the epoch
+    ready_at: float
+    volume: float = 0.0
+
+
+class Shipment(NamedTuple):
+    """
+    One or more parcels shipped together. Shipments no carrier can take have
+    a carrier and method of None and a cost of NaN.
+    """
+
+    parcel_ids: Tuple[str, ...]
+    destination: str
+    weight: float
+    volume: float
+    carrier: Optional[str]
+    method: Optional[str]
+    cost: float
+
+
+class Decision(NamedTuple):
+    """How the parcels of one destination and window were shipped."""
+
+    destination: str
+    window_start: float
+    parcel_ids: Tuple[str, ...]
+    shipments: int
+    # The carrier of the merged shipments, None when shipped separately
+    carrier: Optional[str]
+    cost: float
+    separate_cost: float
+    reason: str
+
+
+class Consolidation(NamedTuple):
+    shipments: List[Shipment]
+    decisions: List[Decision]
+
+    @property
+    def savings(self) -> float:
+        """What consolidating saved over shipping every parcel separately."""
+        return sum(
+            decision.separate_cost - decision.cost
+            for decision in self.decisions
+            if math.isfinite(decision.separate_cost) and math.isfinite(decision.cost)
+        )
+
+
+class _Packing(NamedTuple):
+    """Parcels (in group order) packed into numbered shipments, group by group."""
+
+    bins: np.ndarray
+    # The first shipment of each group, and one past the last
+    group_bins: np.ndarray
+    bin_groups: np.ndarray
+    weights: np.ndarray
+    volumes: np.ndarray
+
+
+def consolidate(
+    parcels: Sequence[Parcel],
+    rate_cards: RateCards,
+    window: float = DEFAULT_WINDOW,
+    carriers: Optional[Sequence[str]] = None,
+    resolve_zone: Callable[[str], str] = any_zone,
+) -> Consolidation:
+    """
+    Merges parcels to the same destination and window into shipments.
+
+    Args:
+        parcels: The pending parcels.
+        rate_cards (RateCards): The cards to quote from, with the carriers'
+            limits.
+        window (float): Seconds of ready time that are shipped together.
+        carriers: The carriers to consider. Defaults to every carrier with a
+            card of its own.
+        resolve_zone: Maps a destination to its zone.
+
+    Returns:
+        Consolidation: The shipments, and one decision per destination and
+        window explaining them.
+    """
+    if window <= 0:
+        raise ValueError(f"window must be positive, got {window}")
+    if carriers is None:
+        carriers = [carrier for carrier in rate_cards.carriers if carrier != ANY]
+
+    count = len(parcels)
+    weights = np.fromiter((parcel.weight for parcel in parcels), np.float64, count)
+    volumes = np.fromiter((parcel.volume for parcel in parcels), np.float64, count)
+    windows = np.floor(np.fromiter((parcel.ready_at for parcel in parcels), np.float64, count) / window)
+
+    # Destinations that only differ in case and punctuation are the same
+    destination_ids: Dict[str, int] = {}
+    normalized_ids: Dict[str, int] = {}
+    zones: List[str] = []
+    for parcel in parcels:
+        if parcel.destination not in destination_ids:
+            key = normalize(parcel.destination)
+            if key not in normalized_ids:
+                normalized_ids[key] = len(zones)
+                zones.append(resolve_zone(parcel.destination))
+            destination_ids[parcel.destination] = normalized_ids[key]
+    destinations = np.fromiter((destination_ids[parcel.destination] for parcel in parcels), np.intp, count)
+
+    # Grouped by destination and window, heaviest first within a group
+    order = np.lexsort((-weights, windows, destinations))
+    weights, volumes, windows, destinations = weights[order], volumes[order], windows[order], destinations[order]
+    if count:
+        starts = np.flatnonzero(np.r_[True, (np.diff(destinations) != 0) | (np.diff(windows) != 0)])
+    else:
+        starts = np.zeros(0, dtype=np.intp)
+    group_count = len(starts)
+    groups = np.repeat(np.arange(group_count), np.diff(np.r_[starts, count]))
+    row_zones = [zones[destination] for destination in destinations.tolist()]
+
+    # Every carrier's cost for every group merged, and for every parcel alone;
+    # carriers with the same limits share a packing
+    packings: Dict[CarrierLimits, _Packing] = {}
+    merged_quotes = []
+    merged_costs = np.full((group_count, len(carriers)), np.inf)
+    separate_methods = []
+    separate_costs = np.full((count, len(carriers)), np.inf)
+    for column, carrier in enumerate(carriers):
+        limits = rate_cards.limits(carrier)
+        packing = packings.get(limits)
+        if packing is None:
+            packing = packings[limits] = _pack(weights, volumes, starts, limits)
+
+        bin_zones = [row_zones[start] for start in starts[packing.bin_groups].tolist()]
+        quotes = _quote(packing.weights, packing.volumes, bin_zones, rate_cards, carrier, limits)
+        merged_quotes.append((packing, quotes.methods, quotes.costs))
+        merged_costs[:, column] = np.bincount(packing.bin_groups, weights=quotes.costs, minlength=group_count)
+
+        quotes = _quote(weights, volumes, row_zones, rate_cards, carrier, limits)
+        separate_methods.append(quotes.methods)
+        separate_costs[:, column] = quotes.costs
+
+    if carriers:
+        best_merged = merged_costs.argmin(axis=1)
+        merged_totals = merged_costs[np.arange(group_count), best_merged]
+        best_separate = separate_costs.argmin(axis=1)
+        parcel_costs = separate_costs[np.arange(count), best_separate]
+    else:
+        best_merged = np.zeros(group_count, dtype=np.intp)
+        merged_totals = np.full(group_count, np.inf)
+        best_separate = np.zeros(count, dtype=np.intp)
+        parcel_costs = np.full(count, np.inf)
+    separate_totals = np.bincount(groups, weights=parcel_costs, minlength=group_count)
+
+    ids = [parcels[row].id for row in order.tolist()]
+    labels = [parcels[order[start]].destination for start in starts.tolist()]
+    weights_list, volumes_list = weights.tolist(), volumes.tolist()
+    ends = np.r_[starts[1:], count].tolist()
+
+    shipments: List[Shipment] = []
+    decisions: List[Decision] = []
+    for group, (start, end) in enumerate(zip(starts.tolist(), ends)):
+        merged_total = float(merged_totals[group])
+        separate_total = float(separate_totals[group]) if math.isfinite(separate_totals[group]) else math.nan
+        if end - start == 1:
+            reason = SINGLE_PARCEL
+        elif not math.isfinite(merged_total):
+            reason = NO_CARRIER
+        elif math.isnan(separate_total) or merged_total < separate_total:
+            reason = CONSOLIDATED
+        else:
+            reason = NOT_CHEAPER
+
+        if reason == CONSOLIDATED:
+            column = int(best_merged[group])
+            packing, methods, costs = merged_quotes[column]
+            first_bin, last_bin = packing.group_bins[group], packing.group_bins[group + 1]
+            members: Dict[int, List[str]] = {}
+            for row in range(start, end):
+                members.setdefault(int(packing.bins[row]), []).append(ids[row])
+            for shipment in range(first_bin, last_bin):
+                shipments.append(
+                    Shipment(
+                        tuple(members[shipment]),
+                        labels[group],
+                        float(packing.weights[shipment]),
+                        float(packing.volumes[shipment]),
+                        carriers[column],
+                        methods[shipment],
+                        float(costs[shipment]),
+                    )
+                )
+            decision_carrier, cost, shipment_count = carriers[column], merged_total, last_bin - first_bin
+        else:
+            for row in range(start, end):
+                column = int(best_separate[row])
+                cost = float(parcel_costs[row])
+                shipped = math.isfinite(cost)
+                shipments.append(
+                    Shipment(
+                        (ids[row],),
+                        labels[group],
+                        weights_list[row],
+                        volumes_list[row],
+                        carriers[column] if shipped else None,
+                        separate_methods[column][row] if shipped else None,
+                        cost if shipped else math.nan,
+                    )
+                )
+            decision_carrier, cost, shipment_count = None, separate_total, end - start
+
+        decisions.append(
+            Decision(
+                labels[group],
+                float(windows[start]) * window,
+                tuple(ids[start:end]),
+                shipment_count,
+                decision_carrier,
+                cost,
+                separate_total,
+                reason,
+            )
+        )
+
+    return Consolidation(shipments, decisions)
+
+
+def _quote(weights, volumes, zones, rate_cards, carrier, limits):
+    """
+    One carrier's quotes at its billable weights, with its limits (on actual
+    weight and volume) applied; uncovered rows cost infinity
+    """
+    divisor = rate_cards.dim_divisor(carrier) or np.nan
+    billable = billable_weights(weights, volumes, [divisor])[:, 0]
+    # The rows are already zones, so they resolve to themselves
+    quotes = cheapest_quotes(billable, zones, rate_cards, [carrier], resolve_zone=str)
+    costs = np.where(np.isnan(quotes.costs), np.inf, quotes.costs)
+    if limits.max_weight is not None:
+        costs[weights > limits.max_weight] = np.inf
+    if limits.max_volume is not None:
+        costs[volumes > limits.max_volume] = np.inf
+
+    return quotes._replace(costs=costs)
+
+
+def _pack(weights, volumes, starts, limits: CarrierLimits) -> _Packing:
+    """
+    Best-fit decreasing over each group (rows heaviest first). A parcel over
+    the limits on its own gets a shipment of its own, which no quote covers.
+    """
+    max_weight = math.inf if limits.max_weight is None else limits.max_weight
+    max_volume = math.inf if limits.max_volume is None else limits.max_volume
+    weights_list, volumes_list = weights.tolist(), volumes.tolist()
+    bins = [0] * len(weights_list)
+    group_bins = [0]
+    bin_count = 0
+    ends = starts.tolist()[1:] + [len(weights_list)]
+    for start, end in zip(starts.tolist(), ends):
+        # (spare weight, shipment) of the group's open shipments, tightest first
+        spare: List[Tuple[float, int]] = []
+        spare_volumes: Dict[int, float] = {}
+        for row in range(start, end):
+            weight, volume = weights_list[row], volumes_list[row]
+            index = bisect_left(spare, (weight, -1))
+            for candidate in range(index, min(index + MAX_CANDIDATES, len(spare))):
+                if spare_volumes[spare[candidate][1]] >= volume:
+                    spare_weight, shipment = spare.pop(candidate)
+                    spare_weight -= weight
+                    spare_volumes[shipment] -= volume
+                    break
+            else:
+                shipment = bin_count
+                bin_count += 1
+                spare_weight = max_weight - weight
+                spare_volumes[shipment] = max_volume - volume
+
+            insort(spare, (spare_weight, shipment))
+            bins[row] = shipment
+
+        group_bins.append(bin_count)
+
+    bins = np.array(bins, dtype=np.intp)
+    group_bins = np.array(group_bins, dtype=np.intp)
+    return _Packing(
+        bins=bins,
+        group_bins=group_bins,
+        bin_groups=np.repeat(np.arange(len(starts)), np.diff(group_bins)),
+        weights=np.bincount(bins, weights=weights, minlength=bin_count),
+        volumes=np.bincount(bins, weights=volumes, minlength=bin_count),
+    )
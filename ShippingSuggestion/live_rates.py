@@ -0,0 +1,228 @@
+"""
+Live carrier rates from EasyPost, fetched for several carriers concurrently.
+
+Live rates are optional: they are only used when EASYPOST_API_KEY and
+EASYPOST_CARRIER_ACCOUNTS are set. Each request gets a time budget; carriers
+that haven't answered within it (or failed) are quoted from the local rate
+cards instead, and their late answers still fill the cache for next time.
+"""
+import math
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional
+
+from ShippingSuggestion.cache import LRUCache
+
+DEFAULT_TIMEOUT = 2.0
+# Late answers still fill the cache, but a hung call mustn't hold a worker for long
+DEFAULT_HTTP_TIMEOUT = 10
+DEFAULT_CACHE_TTL = 15 * 60
+DEFAULT_CACHE_SIZE = 10_000
+MAX_CACHE_KEY_LENGTH = 256
+MAX_WORKERS = 8
+
+# Live quotes are requested for the top of the weight's bucket, so a cached
+# quote is never cheaper than the parcels it is reused for
+DEFAULT_WEIGHT_BUCKET = 0.5
+
+# EasyPost parcel weights are in ounces; rate card weights are in pounds
+DEFAULT_OUNCES_PER_UNIT = 16
+
+LIVE = "live"
+RATE_CARD = "rate_card"
+
+_POSTAL_CODE = re.compile(r"\b\d{5}(?:-\d{4})?\b")
+
+
+class CarrierQuote(NamedTuple):
+    carrier: str
+    method: str
+    cost: float
+    source: str
+    # Business days in transit, as the carrier quoted them; None for rate
+    # card quotes, whose methods the transit times cover
+    transit_days: Optional[int] = None
+
+
+def weight_bucket(weight, bucket=DEFAULT_WEIGHT_BUCKET):
+    """The weight rounded up to a multiple of bucket."""
+    return math.ceil(weight / bucket) * bucket
+
+
+def parse_carrier_accounts(value):
+    """
+    Parses "UPS=ca_123,FedEx=ca_456" into {"UPS": "ca_123", "FedEx": "ca_456"}.
+    """
+    accounts = {}
+    for item in filter(None, (item.strip() for item in value.split(","))):
+        carrier, _, account = item.partition("=")
+        if not account:
+            raise ValueError(f"Expected CARRIER=ACCOUNT_ID, got {item!r}")
+        accounts[carrier.strip()] = account.strip()
+
+    return accounts
+
+
+def to_address(destination, country=None):
+    """
+    An EasyPost address for a free-form destination: its ZIP code if it has
+    one (and is in the US, or its country is unknown), else the destination.
+    The country is left out when it's unknown.
+    """
+    match = _POSTAL_CODE.search(destination) if country in (None, "US") else None
+    address = {"zip": match.group()} if match else {"city": destination}
+    if country:
+        address["country"] = country
+    return address
+
+
+class LiveRates:
+    """
+    Shops rates across carriers through an EasyPost client.
+
+    Args:
+        client: An easypost.EasyPostClient (its api_base may point anywhere
+            that speaks the EasyPost API, e.g. a local stand-in).
+        carrier_accounts (dict): Carrier name, as on the rate cards -> EasyPost
+            carrier account id.
+        origin (dict): The EasyPost from_address.
+        rate_cards: Anything with current() returning RateCards, for fallbacks.
+        timeout (float): Seconds a request waits for live rates in total.
+        cache_ttl (float): Seconds a live quote is reused for.
+    """
+
+    def __init__(
+        self,
+        client,
+        carrier_accounts: Dict[str, str],
+        origin: Dict[str, str],
+        rate_cards,
+        timeout=DEFAULT_TIMEOUT,
+        cache_ttl=DEFAULT_CACHE_TTL,
+        cache_size=DEFAULT_CACHE_SIZE,
+        weight_bucket=DEFAULT_WEIGHT_BUCKET,
+        ounces_per_unit=DEFAULT_OUNCES_PER_UNIT,
+    ):
+        self.client = client
+        self.carrier_accounts = carrier_accounts
+        self.origin = origin
+        self.rate_cards = rate_cards
+        self.timeout = timeout
+        self.weight_bucket = weight_bucket
+        self.ounces_per_unit = ounces_per_unit
+        self._cache: LRUCache[CarrierQuote] = LRUCache(cache_size, ttl=cache_ttl, max_key_length=MAX_CACHE_KEY_LENGTH)
+        self._pool = ThreadPoolExecutor(
+            max_workers=min(MAX_WORKERS, max(1, len(carrier_accounts))),
+            thread_name_prefix="live-rates",
+        )
+        # Keys being fetched, so concurrent requests don't fetch them twice
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, rate_cards):
+        """
+        Live rates configured from the environment, or None if they're off:
+        EASYPOST_API_KEY, EASYPOST_CARRIER_ACCOUNTS ("UPS=ca_...,FedEx=ca_..."),
+        EASYPOST_API_BASE, SHIP_FROM_ZIP, SHIP_FROM_COUNTRY, LIVE_RATES_TIMEOUT
+        and LIVE_RATES_CACHE_TTL.
+        """
+        api_key = os.environ.get("EASYPOST_API_KEY")
+        accounts = parse_carrier_accounts(os.environ.get("EASYPOST_CARRIER_ACCOUNTS", ""))
+        if not api_key or not accounts:
+            return None
+
+        from easypost import EasyPostClient
+
+        api_base = os.environ.get("EASYPOST_API_BASE")
+        options = {"api_base": api_base} if api_base else {}
+        client = EasyPostClient(api_key, timeout=DEFAULT_HTTP_TIMEOUT, **options)
+        origin = {"zip": os.environ.get("SHIP_FROM_ZIP", ""), "country": os.environ.get("SHIP_FROM_COUNTRY", "US")}
+        return cls(
+            client,
+            accounts,
+            origin,
+            rate_cards,
+            timeout=float(os.environ.get("LIVE_RATES_TIMEOUT") or DEFAULT_TIMEOUT),
+            cache_ttl=float(os.environ.get("LIVE_RATES_CACHE_TTL") or DEFAULT_CACHE_TTL),
+        )
+
+    def shop(self, destination, weight, zone, country=None) -> List[CarrierQuote]:
+        """
+        Quotes every configured carrier, cheapest first, to the destination in
+        country (a code, resolved with the zone; None if unknown).
+
+        Cached live quotes are used as they are, the rest are fetched in
+        parallel; carriers without a live quote within the time budget are
+        quoted from the rate cards (or left out if those can't either).
+        """
+        bucket = weight_bucket(weight, self.weight_bucket)
+        quotes: Dict[str, CarrierQuote] = {}
+        pending = {}
+        for carrier in self.carrier_accounts:
+            key = self._key(carrier, destination, bucket)
+            cached = self._cache.get(key)
+            if cached is not None:
+                quotes[carrier] = cached
+            else:
+                pending[carrier] = self._fetch(key, carrier, destination, country, bucket)
+
+        if pending:
+            wait(pending.values(), timeout=self.timeout)
+
+        cards = self.rate_cards.current()
+        for carrier, future in pending.items():
+            quote = future.result() if future.done() and not future.exception() else None
+            if quote is None:
+                fallback = cards.quote(carrier, zone, weight)
+                if fallback is None:
+                    continue
+                quote = CarrierQuote(carrier, fallback.method, fallback.cost, RATE_CARD)
+            quotes[carrier] = quote
+
+        return sorted(quotes.values(), key=lambda quote: quote.cost)
+
+    def _key(self, carrier, destination, bucket):
+        origin = self.origin.get("zip", "")
+        return f"{carrier}|{origin}|{bucket:g}|{destination}"
+
+    def _fetch(self, key, carrier, destination, country, bucket):
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+
+            future = self._pool.submit(self._live_quote, carrier, destination, country, bucket)
+            self._in_flight[key] = future
+
+        # Outside the lock: the callback runs right away if it's already done
+        future.add_done_callback(lambda done: self._store(key, carrier, done))
+        return future
+
+    def _store(self, key, carrier, future):
+        with self._in_flight_lock:
+            self._in_flight.pop(key, None)
+
+        if future.exception():
+            print(f"Live rates for {carrier} failed: {future.exception()}")
+        elif future.result() is not None:
+            self._cache.put(key, future.result())
+
+    def _live_quote(self, carrier, destination, country, weight) -> Optional[CarrierQuote]:
+        shipment = self.client.shipment.create(
+            from_address=self.origin,
+            to_address=to_address(destination, country),
+            parcel={"weight": weight * self.ounces_per_unit},
+            carrier_accounts=[self.carrier_accounts[carrier]],
+        )
+        rates = [rate for rate in shipment.rates if rate.carrier and rate.rate]
+        if not rates:
+            return None
+
+        cheapest = min(rates, key=lambda rate: float(rate.rate))
+        # Carrier services ("Ground", "Priority") aren't rate card methods, so
+        # the quote brings its own transit time when EasyPost has one
+        days = getattr(cheapest, "delivery_days", None) or getattr(cheapest, "est_delivery_days", None)
+        return CarrierQuote(carrier, cheapest.service, float(cheapest.rate), LIVE, int(days) if days else None)
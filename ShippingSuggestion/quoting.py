@@ -0,0 +1,182 @@
+"""
+Vectorized quoting: the cheapest carrier and method for many parcels at once,
+and every piece of a multi-piece shipment at once.
+
+Every carrier's rate card is evaluated for all parcels in a destination zone
+with one NumPy searchsorted per (carrier, zone), instead of one bisect per
+(parcel, carrier).
+"""
+from typing import Callable, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from ShippingSuggestion.rate_cards import ANY, RateCards
+
+
+class CheapestQuotes(NamedTuple):
+    """
+    One row per parcel. Parcels no carrier can take have a carrier and
+    method of None and a cost of NaN.
+    """
+
+    carriers: np.ndarray
+    methods: np.ndarray
+    costs: np.ndarray
+
+
+class PieceQuotes(NamedTuple):
+    """
+    One row per piece and one column per carrier. Pieces a carrier's card
+    doesn't cover have a method of None and a cost of NaN.
+    """
+
+    billable_weights: np.ndarray
+    methods: np.ndarray
+    costs: np.ndarray
+
+    def totals(self) -> np.ndarray:
+        """Each carrier's cost for all the pieces (NaN if any isn't covered)."""
+        return self.costs.sum(axis=0)
+
+
+def any_zone(destination):
+    return ANY
+
+
+def cheapest_quotes(
+    weights,
+    destinations: Sequence[str],
+    rate_cards: RateCards,
+    carriers: Optional[Sequence[str]] = None,
+    resolve_zone: Callable[[str], str] = any_zone,
+) -> CheapestQuotes:
+    """
+    Prices every parcel with every carrier and keeps the cheapest quote.
+
+    Args:
+        weights: Parcel weights (anything np.asarray accepts).
+        destinations: One destination per parcel.
+        rate_cards (RateCards): The cards to quote from.
+        carriers: The carriers to consider, in order of preference for equal
+            costs. Defaults to every carrier with a card of its own.
+        resolve_zone: Maps a destination to its zone; each distinct
+            destination is only resolved once.
+
+    Returns:
+        CheapestQuotes: The chosen carrier, method and cost of each parcel.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(destinations) != len(weights):
+        raise ValueError(f"Got {len(weights)} weights but {len(destinations)} destinations")
+
+    if carriers is None:
+        carriers = [carrier for carrier in rate_cards.carriers if carrier != ANY]
+
+    # Rows of the parcels in each zone
+    zone_ids = {}
+    destination_zones = {}
+    for destination in set(destinations):
+        zone = resolve_zone(destination)
+        destination_zones[destination] = zone_ids.setdefault(zone, len(zone_ids))
+
+    parcel_zones = np.array([destination_zones[destination] for destination in destinations], dtype=np.intp)
+
+    zone_rows = []
+    for zone_id in range(len(zone_ids)):
+        rows = np.flatnonzero(parcel_zones == zone_id)
+        # Ordered by weight: searchsorted is much faster on sorted keys, and
+        # the sort is shared by every carrier
+        zone_rows.append(rows[np.argsort(weights[rows])])
+
+    # parcels x carriers; a missing rate costs infinity so argmin skips it
+    costs = np.full((len(weights), len(carriers)), np.inf)
+    breaks = np.zeros((len(weights), len(carriers)), dtype=np.intp)
+    for column, carrier in enumerate(carriers):
+        for zone, rows in zip(zone_ids, zone_rows):
+            rates = rate_cards.zone_rates(carrier, zone)
+            if rates is None or not len(rows):
+                continue
+
+            zone_breaks, zone_costs, _ = rates.arrays()
+            index = np.searchsorted(zone_breaks, weights[rows], side="left")
+            covered = index < len(zone_breaks)
+            rows, index = rows[covered], index[covered]
+            costs[rows, column] = zone_costs[index]
+            breaks[rows, column] = index
+
+    best_carriers = np.full(len(weights), None, dtype=object)
+    best_methods = np.full(len(weights), None, dtype=object)
+    if not len(carriers):
+        return CheapestQuotes(best_carriers, best_methods, np.full(len(weights), np.nan))
+
+    best = costs.argmin(axis=1)
+    best_costs = costs[np.arange(len(weights)), best]
+    found = np.isfinite(best_costs)
+    best_carriers[found] = np.array(list(carriers), dtype=object)[best[found]]
+    for column, carrier in enumerate(carriers):
+        for zone, rows in zip(zone_ids, zone_rows):
+            rows = rows[found[rows] & (best[rows] == column)]
+            if not len(rows):
+                continue
+
+            _, _, zone_methods = rate_cards.zone_rates(carrier, zone).arrays()
+            best_methods[rows] = zone_methods[breaks[rows, column]]
+
+    best_costs[~found] = np.nan
+    return CheapestQuotes(carriers=best_carriers, methods=best_methods, costs=best_costs)
+
+
+def billable_weights(weights, volumes, divisors) -> np.ndarray:
+    """
+    The billable weight of every piece with every carrier: the greater of its
+    actual weight and its dimensional weight (volume / divisor, rounded up to
+    a whole unit as carriers bill it).
+
+    Args:
+        weights: Piece weights.
+        volumes: Piece volumes, 0 for pieces without dimensions.
+        divisors: One per carrier; NaN for carriers that bill actual weight.
+
+    Returns:
+        np.ndarray: pieces x carriers.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    divisors = np.asarray(divisors, dtype=np.float64)
+    # fmax ignores the NaN dimensional weights of carriers without a divisor
+    return np.fmax(weights[:, None], np.ceil(volumes[:, None] / divisors[None, :]))
+
+
+def quote_pieces(weights, volumes, zone, rate_cards: RateCards, carriers: Sequence[str]) -> PieceQuotes:
+    """
+    Prices every piece of a multi-piece shipment with every carrier, from
+    each carrier's billable weights.
+
+    Args:
+        weights: Piece weights.
+        volumes: Piece volumes (length x width x height), 0 for pieces
+            without dimensions.
+        zone (str): The destination zone.
+        rate_cards (RateCards): The cards to quote from.
+        carriers: The carriers to quote.
+
+    Returns:
+        PieceQuotes: The billable weight, method and cost of every piece with
+        every carrier.
+    """
+    divisors = [rate_cards.dim_divisor(carrier) or np.nan for carrier in carriers]
+    billable = billable_weights(weights, volumes, divisors)
+    costs = np.full(billable.shape, np.nan)
+    methods = np.full(billable.shape, None, dtype=object)
+    for column, carrier in enumerate(carriers):
+        rates = rate_cards.zone_rates(carrier, zone)
+        if rates is None:
+            continue
+
+        zone_breaks, zone_costs, zone_methods = rates.arrays()
+        index = np.searchsorted(zone_breaks, billable[:, column], side="left")
+        covered = index < len(zone_breaks)
+        costs[covered, column] = zone_costs[index[covered]]
+        methods[covered, column] = zone_methods[index[covered]]
+
+    return PieceQuotes(billable_weights=billable, methods=methods, costs=costs)
@@ -0,0 +1,245 @@
+"""
+Carrier rate cards: prices by carrier, destination zone and weight break.
+
+Cards are loaded from a JSON file (rate_cards.json next to this module, or the
+file named by RATE_CARDS_PATH) and precompiled into sorted arrays of weight
+breaks, so a (carrier, zone, weight) lookup is a dict lookup plus a bisect.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+DEFAULT_RATE_CARDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_cards.json")
+
+# Matches any carrier or zone without a card of its own
+ANY = "*"
+
+# Seconds between checks of the rate card file for changes
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+Number = Union[int, float]
+
+
+class Quote(NamedTuple):
+    method: str
+    cost: Number
+
+
+class CarrierLimits(NamedTuple):
+    """The heaviest and largest single shipment a carrier takes; None is no limit."""
+
+    max_weight: Optional[float] = None
+    max_volume: Optional[float] = None
+
+    def admits(self, weight, volume=0) -> bool:
+        return (self.max_weight is None or weight <= self.max_weight) and (
+            self.max_volume is None or volume <= self.max_volume
+        )
+
+
+NO_LIMITS = CarrierLimits()
+
+
+class ZoneRates:
+    """
+    The weight breaks of one carrier and zone.
+
+    Each break covers weights up to and including its ``max_weight``, and
+    a break without one covers any heavier weight.
+    """
+
+    __slots__ = ("breaks", "costs", "methods", "_arrays")
+
+    def __init__(self, breaks, costs, methods):
+        self.breaks = array("d", breaks)
+        self.costs: Tuple[Number, ...] = tuple(costs)
+        self.methods: Tuple[str, ...] = tuple(methods)
+        self._arrays = None
+
+    @classmethod
+    def from_spec(cls, spec):
+        breaks, costs, methods = [], [], []
+        for rate in spec:
+            max_weight = rate.get("max_weight")
+            max_weight = float("inf") if max_weight is None else float(max_weight)
+            if breaks and max_weight <= breaks[-1]:
+                raise ValueError(f"Weight breaks must be in increasing order, got {max_weight} after {breaks[-1]}")
+            if rate["cost"] < 0:
+                raise ValueError(f"Rates can't be negative, got {rate['cost']}")
+
+            breaks.append(max_weight)
+            costs.append(rate["cost"])
+            methods.append(rate["method"])
+
+        if not breaks:
+            raise ValueError("A zone needs at least one weight break")
+
+        return cls(breaks, costs, methods)
+
+    def quote(self, weight) -> Optional[Quote]:
+        index = bisect_left(self.breaks, weight)
+        if index == len(self.breaks):
+            # Heavier than the last break
+            return None
+
+        return Quote(self.methods[index], self.costs[index])
+
+    def arrays(self):
+        """
+        The breaks, costs and methods as NumPy arrays, for vectorized quoting.
+        Built on first use, so NumPy is only imported when it is needed.
+        """
+        if self._arrays is None:
+            import numpy as np
+
+            self._arrays = (
+                np.frombuffer(self.breaks, dtype=np.float64),
+                np.array(self.costs, dtype=np.float64),
+                np.array(self.methods, dtype=object),
+            )
+
+        return self._arrays
+
+
+class RateCards:
+    """
+    Precompiled rate cards of every carrier.
+
+    Args:
+        carriers (dict): Carrier name -> zone -> ZoneRates. The ``ANY``
+            carrier and zone are the fallbacks for unlisted ones.
+        limits (dict): Carrier name -> CarrierLimits, for the carriers that
+            have any (the ``ANY`` carrier's apply to unlisted ones).
+        dim_divisors (dict): Carrier name -> the volume per unit of
+            dimensional weight, for the carriers that bill by it.
+    """
+
+    def __init__(
+        self,
+        carriers: Dict[str, Dict[str, ZoneRates]],
+        limits: Optional[Dict[str, CarrierLimits]] = None,
+        dim_divisors: Optional[Dict[str, float]] = None,
+    ):
+        self.carriers = carriers
+        self.carrier_limits = limits or {}
+        self.dim_divisors = dim_divisors or {}
+
+    @classmethod
+    def from_spec(cls, spec):
+        carriers = {}
+        limits = {}
+        dim_divisors = {}
+        for carrier, carrier_spec in spec["carriers"].items():
+            carriers[carrier] = {
+                zone: ZoneRates.from_spec(rates) for zone, rates in carrier_spec["zones"].items()
+            }
+            if "limits" in carrier_spec:
+                limits[carrier] = CarrierLimits(**carrier_spec["limits"])
+            if carrier_spec.get("dim_divisor") is not None:
+                if carrier_spec["dim_divisor"] <= 0:
+                    raise ValueError(f"dim_divisor must be positive, got {carrier_spec['dim_divisor']}")
+                dim_divisors[carrier] = float(carrier_spec["dim_divisor"])
+
+        return cls(carriers, limits, dim_divisors)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_spec(json.load(f))
+
+    def zone_rates(self, carrier, zone) -> Optional[ZoneRates]:
+        zones = self.carriers.get(carrier) or self.carriers.get(ANY)
+        if zones is None:
+            return None
+
+        return zones.get(zone) or zones.get(ANY)
+
+    def limits(self, carrier) -> CarrierLimits:
+        if carrier in self.carriers:
+            return self.carrier_limits.get(carrier, NO_LIMITS)
+
+        return self.carrier_limits.get(ANY, NO_LIMITS)
+
+    def dim_divisor(self, carrier) -> Optional[float]:
+        """The carrier's dimensional weight divisor, or None if it bills by actual weight only."""
+        return self.dim_divisors.get(carrier if carrier in self.carriers else ANY)
+
+    def quote(self, carrier, zone, weight) -> Optional[Quote]:
+        """
+        Prices a parcel.
+
+        Returns:
+            Quote: The method and cost, or None if no card covers the carrier,
+            the zone or the weight.
+        """
+        rates = self.zone_rates(carrier, zone)
+        return rates.quote(weight) if rates is not None else None
+
+
+class RateCardStore:
+    """
+    Holds the current rate cards and reloads them when their file changes.
+
+    The file's modification time is checked at most every ``reload_interval``
+    seconds. Readers never wait on a reload: they keep using the previous
+    cards until the new ones are compiled, and a file that fails to load
+    leaves the previous cards in place.
+    """
+
+    def __init__(self, path=DEFAULT_RATE_CARDS_PATH, reload_interval=DEFAULT_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._cards = RateCards.load(path)
+        self._next_check = time.monotonic() + reload_interval
+
+    @classmethod
+    def from_env(cls):
+        """
+        A store for RATE_CARDS_PATH (default: the bundled rate_cards.json),
+        checked for changes every RATE_CARDS_RELOAD_INTERVAL seconds.
+        """
+        path = os.environ.get("RATE_CARDS_PATH") or DEFAULT_RATE_CARDS_PATH
+        interval = os.environ.get("RATE_CARDS_RELOAD_INTERVAL")
+        return cls(path, float(interval) if interval else DEFAULT_RELOAD_INTERVAL)
+
+    def current(self) -> RateCards:
+        if time.monotonic() >= self._next_check:
+            self.reload()
+
+        return self._cards
+
+    def reload(self, force=False) -> bool:
+        """
+        Reloads the cards if the file changed since the last load (or always,
+        with force).
+
+        Returns:
+            bool: Whether new cards were loaded.
+        """
+        if not self._lock.acquire(blocking=False):
+            # Another thread is already reloading
+            return False
+
+        try:
+            self._next_check = time.monotonic() + self.reload_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime == self._mtime and not force:
+                    return False
+
+                cards = RateCards.load(self.path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Keeping the current rate cards, couldn't reload {self.path}: {e}")
+                return False
+
+            self._cards = cards
+            self._mtime = mtime
+            return True
+        finally:
+            self._lock.release()
@@ -1,21 +1,84 @@
 import os
+from typing import TYPE_CHECKING
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
 from tracking_numbers.definition import TrackingNumberDefinition
+from tracking_numbers.precompiled import load_definitions
+from tracking_numbers.registry import DefinitionRegistry
 from tracking_numbers.types import TrackingNumber
 
+if TYPE_CHECKING:
+    # Imported where they're used instead, so that a cold start that only
+    # looks up single numbers doesn't pay for the bulk, scanning and caching
+    # modules
+    from tracking_numbers.bulk import BatchClassifier
+    from tracking_numbers.bulk import TrackingNumberBatch
+    from tracking_numbers.cache import CacheStats
+    from tracking_numbers.cache import LookupCache
+    from tracking_numbers.extract import Buffer
+    from tracking_numbers.extract import TrackingNumberMatch
+
 if not os.environ.get("CODE_GENERATING"):
-    from tracking_numbers._generated import DEFINITIONS
+    # Lazily materialized from the precompiled cache when it's up to date
+    DEFINITIONS, _SIGNATURES = load_definitions()
 else:
     # When running codegen, it's very possible that the items in
     # DEFINITIONS are out of date / can't be successfully constructed
     # so we use an empty list so that codegen can still import utils
     DEFINITIONS = []
+    _SIGNATURES = []
+
+_REGISTRY = DefinitionRegistry(DEFINITIONS, signatures=_SIGNATURES)
+
+# Narrows each lookup down to the definitions that could match by length and
+# leading character, instead of running every regex
+_DISPATCH_INDEX = _REGISTRY.index
+
+# Built by the first bulk lookup
+_BATCH_CLASSIFIER: Optional["BatchClassifier"] = None
+
+# Opt-in, see enable_cache(...)
+_CACHE: Optional["LookupCache[Optional[TrackingNumber]]"] = None
+
+
+def get_tracking_number(
+    number: str,
+    courier: Optional[str] = None,
+) -> Optional[TrackingNumber]:
+    """The first valid match for number, only among the definitions of
+    courier (a code or name, e.g. "ups" or "FedEx") when one is given.
+    """
+    if courier is not None:
+        return _find_tracking_number(number, courier)
+
+    cache = _CACHE
+    if cache is not None:
+        return cache.get_or_compute(number, _find_tracking_number)
+
+    return _find_tracking_number(number)
+
+
+def _candidates(
+    number: str,
+    courier: Optional[str],
+) -> Sequence[TrackingNumberDefinition]:
+    if courier is None:
+        return _DISPATCH_INDEX.candidates(number)
+
+    index = _REGISTRY.courier_index(courier)
+    return index.candidates(number) if index else ()
 
 
-def get_tracking_number(number: str) -> Optional[TrackingNumber]:
-    for tn_definition in DEFINITIONS:
+def _find_tracking_number(
+    number: str,
+    courier: Optional[str] = None,
+) -> Optional[TrackingNumber]:
+    for tn_definition in _candidates(number, courier):
         tracking_number = tn_definition.test(number)
         if tracking_number and tracking_number.valid:
             return tracking_number
@@ -23,9 +86,134 @@ def get_tracking_number(number: str) -> Optional[TrackingNumber]:
     return None
 
 
-def get_definition(product_name: str) -> Optional[TrackingNumberDefinition]:
-    for tn_definition in DEFINITIONS:
-        if tn_definition.product.name.lower() == product_name.lower():
-            return tn_definition
+def is_valid_tracking_number(number: str, courier: Optional[str] = None) -> bool:
+    """Same as get_tracking_number(number, courier) is not None, but stops at
+    the first failing check of each candidate and builds no TrackingNumber.
+    """
+    for tn_definition in _candidates(number, courier):
+        if tn_definition.check(number):
+            return True
+
+    return False
+
+
+def identify_tracking_number(
+    number: str,
+    courier: Optional[str] = None,
+) -> Optional[Tuple[str, str]]:
+    """The (courier code, product name) get_tracking_number(number, courier)
+    would return, without building the TrackingNumber.
+    """
+    for tn_definition in _candidates(number, courier):
+        if tn_definition.check(number):
+            return tn_definition.courier.code, tn_definition.product.name
 
     return None
+
+
+def find_tracking_numbers(text: "Buffer") -> Iterator["TrackingNumberMatch"]:
+    """Yields every valid tracking number in a str, bytes or mmap, in order,
+    with its offsets. Memory use doesn't grow with the size of the input.
+    """
+    from tracking_numbers.extract import TrackingNumberScanner
+
+    scanner = TrackingNumberScanner(
+        _DISPATCH_INDEX,
+        is_valid=is_valid_tracking_number,
+        lookup=get_tracking_number,
+    )
+    return scanner.scan(text)
+
+
+def find_tracking_numbers_in_file(path: str) -> Iterator["TrackingNumberMatch"]:
+    """Memory-maps the file at path and scans it, offsets being in bytes"""
+    import mmap
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield from find_tracking_numbers(buffer)
+
+
+def enable_cache(capacity: int = 10_000, ttl: Optional[float] = None) -> None:
+    """Puts a thread-safe LRU cache in front of get_tracking_number(...),
+    holding at most `capacity` numbers, each for at most `ttl` seconds.
+
+    Cached results are shared between callers, so they must not be mutated.
+    Calling this again replaces the cache (and its stats).
+    """
+    from tracking_numbers.cache import LookupCache
+
+    global _CACHE
+    _CACHE = LookupCache(capacity, ttl=ttl)
+
+
+def enable_cache_from_env() -> None:
+    """Enables the cache when TRACKING_NUMBER_CACHE_SIZE is set (and uses
+    TRACKING_NUMBER_CACHE_TTL, in seconds, if present). A no-op if a cache is
+    already enabled, so every handler sharing a process can call it.
+    """
+    capacity = os.environ.get("TRACKING_NUMBER_CACHE_SIZE")
+    if not capacity or _CACHE is not None:
+        return
+
+    ttl = os.environ.get("TRACKING_NUMBER_CACHE_TTL")
+    enable_cache(int(capacity), ttl=float(ttl) if ttl else None)
+
+
+def disable_cache() -> None:
+    global _CACHE
+    _CACHE = None
+
+
+def cache_stats() -> Optional["CacheStats"]:
+    cache = _CACHE
+    return cache.stats() if cache is not None else None
+
+
+def _batch_classifier() -> "BatchClassifier":
+    global _BATCH_CLASSIFIER
+    if _BATCH_CLASSIFIER is None:
+        from tracking_numbers.bulk import BatchClassifier
+
+        # Built twice at worst, by threads racing on the first bulk lookup
+        _BATCH_CLASSIFIER = BatchClassifier(_DISPATCH_INDEX)
+
+    return _BATCH_CLASSIFIER
+
+
+def get_tracking_numbers(
+    numbers: Iterable[str],
+    with_urls: bool = False,
+) -> "TrackingNumberBatch":
+    """Classifies every number into a single columnar batch"""
+    return _batch_classifier().classify(numbers, with_urls=with_urls)
+
+
+def iter_tracking_numbers(
+    numbers: Iterable[str],
+    chunk_size: Optional[int] = None,
+    with_urls: bool = False,
+) -> Iterator["TrackingNumberBatch"]:
+    """Streams columnar batches of at most chunk_size rows (by default
+    bulk.DEFAULT_CHUNK_SIZE), so the input can be far larger than memory
+    (e.g. a file object of one number per line, stripped by the caller).
+    """
+    from tracking_numbers.bulk import DEFAULT_CHUNK_SIZE
+
+    return _batch_classifier().iter_chunks(
+        numbers, chunk_size or DEFAULT_CHUNK_SIZE, with_urls=with_urls
+    )
+
+
+def get_definition(product_name: str) -> Optional[TrackingNumberDefinition]:
+    return _REGISTRY.get_definition(product_name)
+
+
+def get_definitions_for_courier(courier: str) -> List[TrackingNumberDefinition]:
+    """All definitions of a courier, by code or name (case-insensitive), or
+    an empty list for an unknown courier.
+    """
+    return list(_REGISTRY.courier_definitions(courier))
@@ -0,0 +1,127 @@
+from array import array
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from tracking_numbers.definition import TrackingNumberDefinition
+from tracking_numbers.dispatch import DispatchIndex
+from tracking_numbers.types import Product
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Marks rows with no matching definition in courier_index / product_index
+NO_MATCH = -1
+
+
+@dataclass
+class TrackingNumberBatch:
+    """Columnar classification results, one row per input number.
+
+    ``product_index`` points into ``definitions`` and ``courier_index`` into
+    ``courier_codes``. A row that no definition matches has ``NO_MATCH`` in
+    both; a row whose best match failed validation keeps that definition
+    with ``valid`` set to 0.
+    """
+
+    definitions: Tuple[TrackingNumberDefinition, ...]
+    courier_codes: Tuple[str, ...]
+    courier_index: array
+    product_index: array
+    valid: array
+    tracking_urls: Optional[List[Optional[str]]]
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def courier_code(self, row: int) -> Optional[str]:
+        index = self.courier_index[row]
+        return self.courier_codes[index] if index != NO_MATCH else None
+
+    def product(self, row: int) -> Optional[Product]:
+        index = self.product_index[row]
+        return self.definitions[index].product if index != NO_MATCH else None
+
+
+class BatchClassifier:
+    """Classifies many numbers at once, sharing the dispatch index and the
+    definition / courier lookup tables across every row of every chunk.
+    """
+
+    def __init__(self, index: DispatchIndex):
+        self.index = index
+        self.definitions = tuple(index.definitions)
+
+        courier_codes: List[str] = []
+        self._columns: Dict[TrackingNumberDefinition, Tuple[int, int]] = {}
+        for product_index, definition in enumerate(self.definitions):
+            code = definition.courier.code
+            if code not in courier_codes:
+                courier_codes.append(code)
+
+            self._columns[definition] = (courier_codes.index(code), product_index)
+
+        self.courier_codes = tuple(courier_codes)
+
+    def classify(
+        self,
+        numbers: Iterable[str],
+        with_urls: bool = False,
+    ) -> TrackingNumberBatch:
+        courier_index = array("b")
+        product_index = array("h")
+        valid = array("B")
+        tracking_urls: Optional[List[Optional[str]]] = [] if with_urls else None
+
+        candidates = self.index.candidates
+        columns = self._columns
+        no_match = (NO_MATCH, NO_MATCH)
+        for number in numbers:
+            found = None
+            is_valid = False
+            for tn_definition in candidates(number):
+                result = tn_definition.check(number)
+                if result:
+                    found = tn_definition
+                    is_valid = True
+                    break
+
+                if result is not None and found is None:
+                    found = tn_definition
+
+            courier, product = columns[found] if found else no_match
+            courier_index.append(courier)
+            product_index.append(product)
+            valid.append(is_valid)
+            if tracking_urls is not None:
+                tracking_urls.append(found.tracking_url(number) if is_valid else None)
+
+        return TrackingNumberBatch(
+            definitions=self.definitions,
+            courier_codes=self.courier_codes,
+            courier_index=courier_index,
+            product_index=product_index,
+            valid=valid,
+            tracking_urls=tracking_urls,
+        )
+
+    def iter_chunks(
+        self,
+        numbers: Iterable[str],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        with_urls: bool = False,
+    ) -> Iterator[TrackingNumberBatch]:
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+        iterator = iter(numbers)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+
+            yield self.classify(chunk, with_urls=with_urls)
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+from typing import Generic
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# Longer inputs can't be a tracking number of any known definition, so they
+# are never cached; this keeps garbage input from pinning large strings
+MAX_CACHED_KEY_LENGTH = 64
+
+
+@dataclass
+class CacheStats:
+    capacity: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LookupCache(Generic[T]):
+    """A thread-safe, size-bounded LRU cache with an optional TTL.
+
+    The lock only guards the bookkeeping; values are computed outside of it,
+    so two threads missing on the same key may both compute it.
+    """
+
+    def __init__(self, capacity: int, ttl: Optional[float] = None):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}")
+
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[str], T]) -> T:
+        if len(key) > MAX_CACHED_KEY_LENGTH:
+            with self._lock:
+                self._misses += 1
+            return compute(key)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+
+                del self._entries[key]
+                self._expirations += 1
+
+            self._misses += 1
+
+        value = compute(key)
+        expires_at = now + self.ttl if self.ttl is not None else float("inf")
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                capacity=self.capacity,
+                size=len(self._entries),
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+            )
@@ -1,13 +1,22 @@
 from abc import ABCMeta
 from abc import abstractmethod
+from operator import mul
+from typing import TYPE_CHECKING
 from typing import List
 from typing import Optional
+from typing import Sequence
 
 from tracking_numbers.helpers.repr import repr_with_args
 from tracking_numbers.types import SerialNumber
 from tracking_numbers.types import Spec
 from tracking_numbers.types import to_int
 
+if TYPE_CHECKING:
+    import numpy
+
+# Maps serial number values (0-9) back to ASCII digits, so int(...) can read them
+_VALUES_TO_DIGITS = bytes((48 + code) % 256 for code in range(256))
+
 
 class ChecksumValidator(metaclass=ABCMeta):
     def __repr__(self):
@@ -17,6 +26,24 @@ class ChecksumValidator(metaclass=ABCMeta):
     def passes(self, serial_number: SerialNumber, check_digit: int) -> bool:
         raise NotImplementedError
 
+    @abstractmethod
+    def passes_values(self, values: bytes, check_digit: int) -> bool:
+        """Same as passes(...), for the serial number as produced by
+        SerialNumberParser.parse_values(...)
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def passes_matrix(
+        self,
+        values: "numpy.ndarray",
+        check_digits: "numpy.ndarray",
+    ) -> "numpy.ndarray":
+        """Vectorized passes(...) over an (n, length) matrix of serial number
+        values and n check digits, returning an array of n booleans.
+        """
+        raise NotImplementedError
+
     @classmethod
     def from_spec(cls, validation_spec: Spec) -> Optional["ChecksumValidator"]:
         checksum_spec = validation_spec.get("checksum")
@@ -51,15 +78,33 @@ class S10(ChecksumValidator):
         for digit, weight in zip(serial_number, self.WEIGHTS):
             total += digit * weight
 
-        remainder = total % 11
-        if remainder == 1:
-            check = 0
-        elif remainder == 0:
-            check = 5
-        else:
-            check = 11 - remainder
+        return _s10_check(total) == check_digit
+
+    def passes_values(self, values: bytes, check_digit: int) -> bool:
+        return _s10_check(sum(map(mul, values, self.WEIGHTS))) == check_digit
+
+    def passes_matrix(self, values, check_digits):
+        import numpy
+
+        length = min(values.shape[1], len(self.WEIGHTS))
+        weights = numpy.array(self.WEIGHTS[:length], dtype=numpy.int64)
+        remainder = values[:, :length].astype(numpy.int64) @ weights % 11
+        check = numpy.where(
+            remainder == 1,
+            0,
+            numpy.where(remainder == 0, 5, 11 - remainder),
+        )
+        return check == check_digits
 
-        return check == check_digit
+
+def _s10_check(total: int) -> int:
+    remainder = total % 11
+    if remainder == 1:
+        return 0
+    elif remainder == 0:
+        return 5
+
+    return 11 - remainder
 
 
 class Mod10(ChecksumValidator):
@@ -70,6 +115,7 @@ class Mod10(ChecksumValidator):
     ):
         self.odds_multiplier = odds_multiplier
         self.evens_multiplier = evens_multiplier
+        self._weights = self._weights_for(32)
 
     def __repr__(self):
         return repr_with_args(
@@ -97,11 +143,42 @@ class Mod10(ChecksumValidator):
 
         return check == check_digit
 
+    def passes_values(self, values: bytes, check_digit: int) -> bool:
+        weights = self._weights
+        if len(values) > len(weights):
+            weights = self._weights_for(len(values))
+
+        return (-sum(map(mul, values, weights))) % 10 == check_digit
+
+    def passes_matrix(self, values, check_digits):
+        import numpy
+
+        weights = numpy.array(self._weights_for(values.shape[1]), dtype=numpy.int64)
+        return -(values.astype(numpy.int64) @ weights) % 10 == check_digits
+
+    def _weights_for(self, length: int) -> Sequence[int]:
+        # Index 0 is "even", matching passes(...)
+        evens = self.evens_multiplier or 1
+        odds = self.odds_multiplier or 1
+        return tuple(evens if index % 2 == 0 else odds for index in range(length))
+
 
 class Mod7(ChecksumValidator):
     def passes(self, serial_number: SerialNumber, check_digit: int) -> bool:
         return check_digit == (to_int(serial_number) % 7)
 
+    def passes_values(self, values: bytes, check_digit: int) -> bool:
+        return check_digit == (int(values.translate(_VALUES_TO_DIGITS)) % 7)
+
+    def passes_matrix(self, values, check_digits):
+        import numpy
+
+        remainder = numpy.zeros(values.shape[0], dtype=numpy.int64)
+        for column in range(values.shape[1]):
+            remainder = (remainder * 10 + values[:, column]) % 7
+
+        return remainder == check_digits
+
 
 class SumProductWithWeightsAndModulo(ChecksumValidator):
     def __init__(self, weights: List[int], first_modulo: int, second_modulo: int):
@@ -124,3 +201,15 @@ class SumProductWithWeightsAndModulo(ChecksumValidator):
 
         check = total % self.first_modulo % self.second_modulo
         return check == check_digit
+
+    def passes_values(self, values: bytes, check_digit: int) -> bool:
+        total = sum(map(mul, values, self.weights))
+        return total % self.first_modulo % self.second_modulo == check_digit
+
+    def passes_matrix(self, values, check_digits):
+        import numpy
+
+        length = min(values.shape[1], len(self.weights))
+        weights = numpy.array(self.weights[:length], dtype=numpy.int64)
+        total = values[:, :length].astype(numpy.int64) @ weights
+        return total % self.first_modulo % self.second_modulo == check_digits
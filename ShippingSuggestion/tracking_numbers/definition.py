@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import Dict
+from typing import FrozenSet
 from typing import List
+from typing import Match
 from typing import Optional
 from typing import Pattern
 
@@ -11,11 +13,13 @@ from tracking_numbers.serial_number import DefaultSerialNumberParser
 from tracking_numbers.serial_number import SerialNumberParser
 from tracking_numbers.serial_number import UPSSerialNumberParser
 from tracking_numbers.types import Courier
+from tracking_numbers.types import NO_VALIDATION_ERRORS
 from tracking_numbers.types import Product
 from tracking_numbers.types import SerialNumber
 from tracking_numbers.types import Spec
 from tracking_numbers.types import TrackingNumber
 from tracking_numbers.types import ValidationError
+from tracking_numbers.types import ValidationErrors
 from tracking_numbers.value_matcher import ValueMatcher
 
 MatchData = Dict[str, str]
@@ -39,6 +43,17 @@ class AdditionalValidation:
             value_matchers=value_matchers,
         )
 
+    def passes(self, raw_value: Optional[str]) -> bool:
+        if not raw_value:
+            return False
+
+        value = _remove_whitespace(raw_value)
+        for value_matcher in self.value_matchers:
+            if value_matcher.matches(value):
+                return True
+
+        return False
+
 
 class TrackingNumberDefinition:
     courier: Courier
@@ -66,6 +81,7 @@ class TrackingNumberDefinition:
         self.serial_number_parser = serial_number_parser
         self.checksum_validator = checksum_validator
         self.additional_validations = additional_validations
+        self._group_names: FrozenSet[str] = frozenset(number_regex.groupindex)
 
     def __repr__(self):
         return repr_with_args(
@@ -123,10 +139,50 @@ class TrackingNumberDefinition:
             courier=self.courier,
             product=self.product,
             serial_number=serial_number,
-            tracking_url=self.tracking_url(tracking_number),
+            tracking_url_template=self.tracking_url_template,
             validation_errors=validation_errors,
         )
 
+    def check(self, tracking_number: str) -> Optional[bool]:
+        """Like test(...), but only reports whether the number is valid for this
+        definition, or None if it doesn't match at all. Stops at the first
+        failing validation, without building a TrackingNumber, the serial number
+        list or the validation errors.
+        """
+        match = self.number_regex.fullmatch(tracking_number)
+        if not match:
+            return None
+
+        if self.checksum_validator and not self._passes_checksum(match):
+            return False
+
+        for validation in self.additional_validations:
+            if not validation.passes(self._group(match, validation.regex_group_name)):
+                return False
+
+        return True
+
+    def _group(self, match: Match, name: str) -> Optional[str]:
+        # Same as match.groupdict().get(name), without building the dict
+        return match.group(name) if name in self._group_names else None
+
+    def _passes_checksum(self, match: Match) -> bool:
+        raw_serial_number = self._group(match, "SerialNumber")
+        check_digit = self._group(match, "CheckDigit")
+        values = None
+        if raw_serial_number and check_digit and check_digit.isdecimal():
+            serial_number = _remove_whitespace(raw_serial_number)
+            values = self.serial_number_parser.parse_values(serial_number)
+
+        if values is None:
+            # Missing groups, a check digit that isn't a digit or characters
+            # outside the value tables
+            match_data = match.groupdict()
+            serial_number = self._get_serial_number(match_data)
+            return not self._get_checksum_errors(serial_number, match_data)
+
+        return self.checksum_validator.passes_values(values, int(check_digit))
+
     def _get_serial_number(self, match_data: MatchData) -> Optional[SerialNumber]:
         raw_serial_number = match_data.get("SerialNumber")
         if raw_serial_number:
@@ -140,7 +196,7 @@ class TrackingNumberDefinition:
         self,
         serial_number: Optional[SerialNumber],
         match_data: MatchData,
-    ) -> List[ValidationError]:
+    ) -> ValidationErrors:
         errors: List[ValidationError] = []
         checksum_error = self._get_checksum_errors(serial_number, match_data)
         if checksum_error:
@@ -151,7 +207,7 @@ class TrackingNumberDefinition:
             if additional_error:
                 errors.append(additional_error)
 
-        return errors
+        return tuple(errors) if errors else NO_VALIDATION_ERRORS
 
     def _get_checksum_errors(
         self,
@@ -168,6 +224,10 @@ class TrackingNumberDefinition:
         if not check_digit:
             return "checksum", "CheckDigit not found"
 
+        # Some formats allow letters where the check digit goes; none can match
+        if not check_digit.isdecimal():
+            return "checksum", "Checksum validation failed"
+
         passes_checksum = self.checksum_validator.passes(
             serial_number=serial_number,
             check_digit=int(check_digit),
@@ -206,4 +266,7 @@ class TrackingNumberDefinition:
 
 
 def _remove_whitespace(value: str) -> str:
+    if value.isalnum():
+        return value
+
     return "".join(ch for ch in value if ch.strip())
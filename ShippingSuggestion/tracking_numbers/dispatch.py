@@ -0,0 +1,262 @@
+import re
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from tracking_numbers.definition import TrackingNumberDefinition
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore[no-redef]
+
+Candidates = Tuple[TrackingNumberDefinition, ...]
+
+# Anything longer than this is treated as unbounded rather than enumerated
+MAX_INDEXED_LENGTH = 64
+
+_SPACE_ONLY = [(sre_parse.IN, [(sre_parse.CATEGORY, sre_parse.CATEGORY_SPACE)])]
+_ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+
+class Signature(NamedTuple):
+    """The cheap features a number must have for a definition to match it,
+    computed on the number with all whitespace removed.
+
+    ``lengths`` and ``first_chars`` are ``None`` when they can't be bounded.
+    """
+
+    lengths: Optional[FrozenSet[int]]
+    first_chars: Optional[FrozenSet[str]]
+    nullable: bool
+
+    def accepts(self, length: int, first_char: str) -> bool:
+        if self.lengths is not None and length not in self.lengths:
+            return False
+
+        if length == 0 or self.first_chars is None:
+            return True
+
+        return first_char in self.first_chars
+
+
+UNBOUNDED = Signature(lengths=None, first_chars=None, nullable=True)
+_EMPTY = Signature(lengths=frozenset([0]), first_chars=frozenset(), nullable=True)
+
+
+class _Unindexable(Exception):
+    pass
+
+
+def signature_of(number_regex: re.Pattern) -> Signature:
+    """Derives the length and leading-character features of a definition's regex.
+
+    Every regex in the spec allows whitespace between characters, so runs of
+    ``\\s`` are dropped and the remaining atoms describe the normalized number.
+    Anything that could consume whitespace itself (``.``, negated classes, ...)
+    makes the definition unindexable, and it is tested against every number.
+    """
+    if number_regex.flags & re.IGNORECASE:
+        return UNBOUNDED
+
+    try:
+        return _sequence(list(sre_parse.parse(number_regex.pattern)))
+    except _Unindexable:
+        return UNBOUNDED
+
+
+def _sequence(items: List[Tuple]) -> Signature:
+    lengths: Optional[FrozenSet[int]] = frozenset([0])
+    first_chars: Optional[FrozenSet[str]] = frozenset()
+    leading = True
+
+    for op, av in items:
+        item = _node(op, av)
+        if leading:
+            first_chars = _union(first_chars, item.first_chars)
+            leading = item.nullable
+
+        lengths = _sumset(lengths, item.lengths)
+
+    return Signature(lengths=lengths, first_chars=first_chars, nullable=leading)
+
+
+def _node(op, av) -> Signature:
+    if op is sre_parse.LITERAL:
+        return Signature(frozenset([1]), frozenset([chr(av)]), nullable=False)
+
+    if op is sre_parse.IN:
+        return Signature(frozenset([1]), _char_set(av), nullable=False)
+
+    if op in _ZERO_WIDTH:
+        return _EMPTY
+
+    if op is sre_parse.SUBPATTERN:
+        _group, add_flags, _del_flags, pattern = av
+        if add_flags & re.IGNORECASE:
+            raise _Unindexable
+
+        return _sequence(list(pattern))
+
+    if op is sre_parse.BRANCH:
+        branches = [_sequence(list(branch)) for branch in av[1]]
+        lengths: Optional[FrozenSet[int]] = frozenset()
+        first_chars: Optional[FrozenSet[str]] = frozenset()
+        for branch in branches:
+            lengths = _union(lengths, branch.lengths)
+            first_chars = _union(first_chars, branch.first_chars)
+
+        nullable = any(branch.nullable for branch in branches)
+        return Signature(lengths, first_chars, nullable)
+
+    if op in _REPEATS:
+        low, high, pattern = av
+        if list(pattern) == _SPACE_ONLY:
+            return _EMPTY
+
+        item = _sequence(list(pattern))
+        nullable = low == 0 or item.nullable
+        first_chars = item.first_chars if high > 0 else frozenset()
+        if high == sre_parse.MAXREPEAT or item.lengths is None:
+            return Signature(None, first_chars, nullable)
+
+        lengths: Optional[FrozenSet[int]] = frozenset([0])
+        repeated: Optional[FrozenSet[int]] = frozenset()
+        for count in range(high + 1):
+            if count >= low:
+                repeated = _union(repeated, lengths)
+            lengths = _sumset(lengths, item.lengths)
+
+        return Signature(repeated, first_chars, nullable)
+
+    # ANY, NOT_LITERAL, group references, ...
+    raise _Unindexable
+
+
+def _char_set(items: List[Tuple]) -> Optional[FrozenSet[str]]:
+    chars = set()
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_parse.RANGE and av[1] - av[0] < 128:
+            chars.update(chr(code) for code in range(av[0], av[1] + 1))
+        elif op is sre_parse.CATEGORY and av in (
+            sre_parse.CATEGORY_DIGIT,
+            sre_parse.CATEGORY_WORD,
+        ):
+            # Unicode digits / word chars: can't enumerate, but can't be whitespace
+            return None
+        else:
+            raise _Unindexable
+
+    return frozenset(chars)
+
+
+def _union(
+    left: Optional[FrozenSet],
+    right: Optional[FrozenSet],
+) -> Optional[FrozenSet]:
+    if left is None or right is None:
+        return None
+
+    return left | right
+
+
+def _sumset(
+    left: Optional[FrozenSet[int]],
+    right: Optional[FrozenSet[int]],
+) -> Optional[FrozenSet[int]]:
+    if left is None or right is None:
+        return None
+
+    lengths = frozenset(a + b for a in left for b in right)
+    if lengths and max(lengths) > MAX_INDEXED_LENGTH:
+        return None
+
+    return lengths
+
+
+def normalize(number: str) -> str:
+    """Removes all whitespace, the way the definitions' regexes ignore it."""
+    if number.isalnum():
+        return number
+
+    return "".join(number.split())
+
+
+class DispatchIndex:
+    """Maps the (normalized length, leading character) of a number to the
+    definitions that could possibly match it, preserving definition order so
+    that the first valid match is the same as a linear scan over all of them.
+    """
+
+    def __init__(
+        self,
+        definitions: Sequence[TrackingNumberDefinition],
+        signatures: Optional[Sequence[Signature]] = None,
+    ):
+        self.definitions = list(definitions)
+        if signatures is None:
+            signatures = [
+                signature_of(definition.number_regex) for definition in definitions
+            ]
+
+        # Precomputed signatures let lazy definitions stay unloaded until used
+        self.signatures = list(signatures)
+
+        keys: Dict[int, set] = {0: {""}}
+        for signature in self.signatures:
+            for length in signature.lengths or ():
+                chars = keys.setdefault(length, set())
+                chars.update(signature.first_chars or ())
+
+        for signature in self.signatures:
+            if signature.lengths is None:
+                for chars in keys.values():
+                    chars.update(signature.first_chars or ())
+
+        # The normalized lengths any definition can match, None if unbounded
+        self.lengths: Optional[FrozenSet[int]] = frozenset(keys) - {0}
+        if any(signature.lengths is None for signature in self.signatures):
+            self.lengths = None
+        self.max_length: Optional[int] = max(self.lengths or [0]) or None
+
+        # Lengths no bounded definition can have only reach the unbounded ones
+        self._unbounded = self._select(lambda signature: signature.lengths is None)
+
+        # length -> (leading character -> definitions, definitions for any
+        # other leading character); nested so lookups don't build a key tuple
+        self._by_length: Dict[int, Tuple[Dict[str, Candidates], Candidates]] = {}
+        for length, chars in keys.items():
+            others = self._select(
+                lambda signature: (
+                    signature.first_chars is None
+                    and (signature.lengths is None or length in signature.lengths)
+                ),
+            )
+            by_char = {
+                char: self._select(lambda signature: signature.accepts(length, char))
+                for char in chars
+            }
+            self._by_length[length] = (by_char, others)
+
+    def _select(self, predicate) -> Candidates:
+        return tuple(
+            definition
+            for definition, signature in zip(self.definitions, self.signatures)
+            if predicate(signature)
+        )
+
+    def candidates(self, number: str) -> Candidates:
+        normalized = normalize(number)
+        buckets = self._by_length.get(len(normalized))
+        if buckets is None:
+            return self._unbounded
+
+        by_char, others = buckets
+        return by_char.get(normalized[:1], others)
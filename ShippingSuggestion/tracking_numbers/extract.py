@@ -0,0 +1,131 @@
+import mmap
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+from typing import Deque
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from tracking_numbers.dispatch import MAX_INDEXED_LENGTH
+from tracking_numbers.dispatch import DispatchIndex
+from tracking_numbers.types import TrackingNumber
+
+Buffer = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+
+_WORD = re.compile(r"[0-9A-Za-z]+")
+_WORD_BYTES = re.compile(rb"[0-9A-Za-z]+")
+
+# (start offset, end offset, word)
+_Word = Tuple[int, int, str]
+
+
+@dataclass
+class TrackingNumberMatch:
+    """A tracking number found in a larger text. ``start`` and ``end`` are
+    offsets into the scanned buffer (characters for str, bytes otherwise),
+    and the number is given with its separating spaces removed.
+    """
+
+    start: int
+    end: int
+    tracking_number: TrackingNumber
+
+
+class TrackingNumberScanner:
+    """Finds tracking numbers in text in a single pass.
+
+    Numbers are runs of ASCII letters and digits, or several such runs
+    separated by single spaces (e.g. "1Z 999 AA1 0123 4567 84"), so only the
+    words that could still be part of a number are ever held in memory.
+    Overlapping candidates resolve to the earliest start, then the longest.
+    """
+
+    def __init__(
+        self,
+        index: DispatchIndex,
+        is_valid: Callable[[str], bool],
+        lookup: Callable[[str], Optional[TrackingNumber]],
+    ):
+        self.index = index
+        self.is_valid = is_valid
+        self.lookup = lookup
+        self.lengths = index.lengths
+        self.max_length = index.max_length or MAX_INDEXED_LENGTH
+
+    def scan(self, buffer: Buffer) -> Iterator[TrackingNumberMatch]:
+        if isinstance(buffer, str):
+            words = (
+                (match.start(), match.end(), match.group())
+                for match in _WORD.finditer(buffer)
+            )
+            space = " "
+        else:
+            # re scans bytes-like objects (including mmap) in place
+            words = (
+                (match.start(), match.end(), match.group().decode("ascii"))
+                for match in _WORD_BYTES.finditer(buffer)
+            )
+            space = ord(" ")
+
+        pending: Deque[_Word] = deque()
+        pending_length = 0
+        for word in words:
+            start = word[0]
+            if pending and not (
+                start == pending[-1][1] + 1 and buffer[start - 1] == space
+            ):
+                yield from self._drain(pending, final=True)
+                pending_length = 0
+
+            pending.append(word)
+            pending_length += len(word[2])
+            if pending_length >= self.max_length:
+                yield from self._drain(pending, final=False)
+                pending_length = sum(len(text) for _, _, text in pending)
+
+        yield from self._drain(pending, final=True)
+
+    def _drain(
+        self,
+        pending: Deque[_Word],
+        final: bool,
+    ) -> Iterator[TrackingNumberMatch]:
+        """Resolves the leading words that can't be extended any further"""
+        while pending:
+            total = sum(len(text) for _, _, text in pending)
+            if not final and total < self.max_length:
+                return
+
+            found = self._longest_at_head(pending)
+            if found is None:
+                pending.popleft()
+                continue
+
+            words_used, tracking_number = found
+            end = pending[words_used - 1][1]
+            yield TrackingNumberMatch(pending[0][0], end, tracking_number)
+            for _ in range(words_used):
+                pending.popleft()
+
+    def _longest_at_head(
+        self,
+        pending: Deque[_Word],
+    ) -> Optional[Tuple[int, TrackingNumber]]:
+        candidates = []
+        number = ""
+        for words_used, (_, _, text) in enumerate(pending, start=1):
+            number += text
+            if len(number) > self.max_length:
+                break
+
+            if self.lengths is None or len(number) in self.lengths:
+                candidates.append((words_used, number))
+
+        for words_used, number in reversed(candidates):
+            if self.is_valid(number):
+                return words_used, self.lookup(number)
+
+        return None
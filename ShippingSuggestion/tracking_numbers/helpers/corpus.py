@@ -0,0 +1,236 @@
+"""Synthetic tracking-number corpora for benchmarks and tests.
+
+Valid numbers are generated for a definition by producing a random string its
+regex matches, substituting values its additional validations accept, and then
+picking the check digit its checksum validator accepts.
+"""
+
+import random
+import string
+from dataclasses import dataclass
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from tracking_numbers import DEFINITIONS
+from tracking_numbers import is_valid_tracking_number
+from tracking_numbers.definition import TrackingNumberDefinition
+from tracking_numbers.value_matcher import ExactValueMatcher
+from tracking_numbers.value_matcher import RegexValueMatcher
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore[no-redef]
+
+VALID = "valid"
+NEAR_MISS = "near_miss"
+INVALID = "invalid"
+NOISE = "noise"
+
+MAX_ATTEMPTS = 200
+
+# Real-world valid numbers, one or more per carrier
+VALID_NUMBERS = [
+    "1Z5R89390357567127",
+    "1Z999AA10123456784",
+    "TBA000000000000",
+    "RB123456785GB",
+    "986578788855",
+    "3318810025",
+    "C11031500001879",
+    "9261292700768711948021",
+    "420221539101026837331000039521",
+    "9611020987654312345672",
+]
+
+# Caps unbounded repeats (e.g. "x*") when generating from a regex
+_MAX_EXTRA_REPEATS = 3
+_SPACE_ONLY = [(sre_parse.IN, [(sre_parse.CATEGORY, sre_parse.CATEGORY_SPACE)])]
+_NOISE_CHARS = string.ascii_letters + string.digits + string.punctuation + " "
+
+
+@dataclass
+class CorpusEntry:
+    number: str
+    kind: str
+    # The definition a valid or near-miss number was generated from
+    definition: Optional[TrackingNumberDefinition]
+
+
+def generate_from_regex(pattern: str, rng: random.Random) -> str:
+    """A random string matching pattern, ignoring lookarounds and optional
+    whitespace (callers re-check with fullmatch)
+    """
+    return _generate(list(sre_parse.parse(pattern)), rng)
+
+
+def _generate(items, rng: random.Random) -> str:
+    parts = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            parts.append(chr(av))
+        elif op is sre_parse.IN:
+            parts.append(rng.choice(_chars_in(av)))
+        elif op is sre_parse.SUBPATTERN:
+            parts.append(_generate(list(av[-1]), rng))
+        elif op is sre_parse.BRANCH:
+            parts.append(_generate(list(rng.choice(av[1])), rng))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, pattern = av
+            if list(pattern) == _SPACE_ONLY:
+                continue
+
+            high = min(high, low + _MAX_EXTRA_REPEATS)
+            for _ in range(rng.randint(low, high)):
+                parts.append(_generate(list(pattern), rng))
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue
+        else:
+            raise ValueError(f"Can't generate from regex op {op}")
+
+    return "".join(parts)
+
+
+def _chars_in(items) -> str:
+    chars = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            chars.append(chr(av))
+        elif op is sre_parse.RANGE:
+            chars.extend(chr(code) for code in range(av[0], av[1] + 1))
+        elif op is sre_parse.CATEGORY and av is sre_parse.CATEGORY_DIGIT:
+            chars.extend(string.digits)
+        else:
+            raise ValueError(f"Can't generate from character class item {op}")
+
+    return "".join(chars)
+
+
+def _replace_group(number: str, definition: TrackingNumberDefinition, group, value):
+    match = definition.number_regex.fullmatch(number)
+    start, end = match.span(group)
+    return number[:start] + value + number[end:]
+
+
+def _accepted_values(validation, length: int, rng: random.Random) -> List[str]:
+    values = []
+    for value_matcher in validation.value_matchers:
+        if isinstance(value_matcher, ExactValueMatcher):
+            values.append(value_matcher.value)
+        elif isinstance(value_matcher, RegexValueMatcher):
+            values.append(generate_from_regex(value_matcher.pattern.pattern, rng))
+
+    return [value for value in values if len(value) == length]
+
+
+def generate_valid(definition: TrackingNumberDefinition, rng: random.Random) -> str:
+    """A random number that definition.test(...) considers valid"""
+    regex = definition.number_regex
+    for _ in range(MAX_ATTEMPTS):
+        number = generate_from_regex(regex.pattern, rng)
+        match = regex.fullmatch(number)
+        if not match:
+            continue
+
+        for validation in definition.additional_validations:
+            group = validation.regex_group_name
+            if match.group(group) is None:
+                continue
+
+            length = len(match.group(group))
+            values = _accepted_values(validation, length, rng)
+            if values:
+                number = _replace_group(number, definition, group, rng.choice(values))
+
+        if definition.checksum_validator and regex.fullmatch(number):
+            for digit in string.digits:
+                candidate = _replace_group(number, definition, "CheckDigit", digit)
+                if definition.check(candidate):
+                    number = candidate
+                    break
+
+        if definition.check(number):
+            return number
+
+    raise ValueError(f"Couldn't generate a valid number for {definition.product.name}")
+
+
+def generate_near_miss(definition: TrackingNumberDefinition, rng: random.Random) -> str:
+    """A number shaped like a valid one (usually still matching the regex)
+    that fails validation because one character was changed
+    """
+    for _ in range(MAX_ATTEMPTS):
+        number = generate_valid(definition, rng)
+        index = rng.randrange(len(number))
+        alphabet = string.digits if number[index].isdigit() else string.ascii_uppercase
+        replacement = rng.choice(alphabet.replace(number[index], ""))
+        candidate = number[:index] + replacement + number[index + 1 :]
+        if not definition.check(candidate) and not _is_valid(candidate):
+            return candidate
+
+    raise ValueError(f"Couldn't generate a near miss for {definition.product.name}")
+
+
+def generate_invalid(rng: random.Random, lengths: Sequence[int]) -> str:
+    """A random alphanumeric string of a plausible length that isn't valid"""
+    alphabet = string.digits * 3 + string.ascii_uppercase
+    for _ in range(MAX_ATTEMPTS):
+        length = rng.choice(lengths)
+        number = "".join(rng.choice(alphabet) for _ in range(length))
+        if not _is_valid(number):
+            return number
+
+    raise ValueError("Couldn't generate an invalid number")
+
+
+def generate_noise(rng: random.Random) -> str:
+    length = rng.randint(0, 60)
+    return "".join(rng.choice(_NOISE_CHARS) for _ in range(length))
+
+
+def _is_valid(number: str) -> bool:
+    try:
+        return is_valid_tracking_number(number)
+    except ValueError:
+        return False
+
+
+def generate_corpus(
+    size: int,
+    valid: float = 0.5,
+    near_miss: float = 0.2,
+    invalid: float = 0.2,
+    seed: int = 0,
+    definitions: Optional[Sequence[TrackingNumberDefinition]] = None,
+) -> List[CorpusEntry]:
+    """A reproducible mix of valid, near-miss, invalid and (for the remaining
+    fraction) noise inputs. Valid and near-miss numbers are spread evenly over
+    the definitions.
+    """
+    if valid < 0 or near_miss < 0 or invalid < 0 or valid + near_miss + invalid > 1:
+        raise ValueError("Fractions must be non-negative and add up to at most 1")
+
+    rng = random.Random(seed)
+    definitions = list(definitions if definitions is not None else DEFINITIONS)
+    lengths = sorted(
+        {len(generate_valid(definition, rng)) for definition in definitions}
+    )
+
+    corpus: List[CorpusEntry] = []
+    for position in range(size):
+        roll = rng.random()
+        definition = definitions[position % len(definitions)]
+        if roll < valid:
+            corpus.append(
+                CorpusEntry(generate_valid(definition, rng), VALID, definition)
+            )
+        elif roll < valid + near_miss:
+            number = generate_near_miss(definition, rng)
+            corpus.append(CorpusEntry(number, NEAR_MISS, definition))
+        elif roll < valid + near_miss + invalid:
+            corpus.append(CorpusEntry(generate_invalid(rng, lengths), INVALID, None))
+        else:
+            corpus.append(CorpusEntry(generate_noise(rng), NOISE, None))
+
+    return corpus
@@ -0,0 +1,198 @@
+"""An on-disk cache of the generated definitions, so that importing
+tracking_numbers doesn't have to execute _generated.py (compiling every regex
+and building every validator) or analyze the regexes for the dispatch index.
+
+Definitions loaded from the cache are materialized one at a time, the first
+time a lookup needs them. The cache ships with the package as
+definitions.pickle; importing never writes into the package, so rebuild it
+whenever _generated.py changes (a stale cache is ignored, and the tests fail
+until it's rebuilt) with
+
+    python -m tracking_numbers.precompiled
+
+from the ShippingSuggestion directory. Set TRACKING_NUMBERS_DEFINITIONS_CACHE
+to a writable path (e.g. under /tmp) to read and refresh a cache there
+instead, or to "off" to always load _generated.py.
+"""
+
+import os
+import pickle
+import zlib
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from tracking_numbers.definition import TrackingNumberDefinition
+from tracking_numbers.dispatch import Signature
+from tracking_numbers.dispatch import signature_of
+from tracking_numbers.types import Courier
+from tracking_numbers.types import Product
+
+# Bump when the cached layout, the pickled classes or signature_of(...) change
+CACHE_VERSION = 2
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATED_PATH = os.path.join(PACKAGE_DIR, "_generated.py")
+DEFAULT_CACHE_PATH = os.path.join(PACKAGE_DIR, "definitions.pickle")
+
+# Kept from the lazy definition itself, so results share the same instances
+_EAGER_ATTRIBUTES = ("courier", "product")
+
+
+class LazyTrackingNumberDefinition(TrackingNumberDefinition):
+    """A definition whose courier and product are known up front, and whose
+    regex, parser and validators are unpickled on first access.
+    """
+
+    def __init__(self, courier: Courier, product: Product, payload: bytes):
+        self.courier = courier
+        self.product = product
+        self._payload = payload
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes that aren't set yet
+        payload = self.__dict__.get("_payload")
+        if payload is None:
+            # Materialized by another thread since the lookup missed; raises
+            # AttributeError only if the attribute really doesn't exist
+            return object.__getattribute__(self, name)
+
+        definition = pickle.loads(payload)
+        for key, value in vars(definition).items():
+            if key not in _EAGER_ATTRIBUTES:
+                setattr(self, key, value)
+
+        # Popped rather than deleted: another thread may be materializing too
+        self.__dict__.pop("_payload", None)
+        return getattr(self, name)
+
+    @property
+    def materialized(self) -> bool:
+        return "_payload" not in self.__dict__
+
+
+def cache_path() -> Optional[str]:
+    """Where the cache is read from: TRACKING_NUMBERS_DEFINITIONS_CACHE, or
+    the one shipped with the package.
+    """
+    path = os.environ.get("TRACKING_NUMBERS_DEFINITIONS_CACHE")
+    if path == "off":
+        return None
+
+    return path or DEFAULT_CACHE_PATH
+
+
+def writable_cache_path() -> Optional[str]:
+    """Where a stale or missing cache is refreshed at import: only an
+    explicitly configured TRACKING_NUMBERS_DEFINITIONS_CACHE.
+    """
+    path = os.environ.get("TRACKING_NUMBERS_DEFINITIONS_CACHE")
+    if path == "off":
+        return None
+
+    return path or None
+
+
+def source_digest() -> str:
+    # zlib rather than hashlib: importing hashlib alone costs several ms
+    with open(GENERATED_PATH, "rb") as f:
+        source = f.read()
+
+    return f"{len(source)}:{zlib.crc32(source):08x}"
+
+
+def load_definitions() -> Tuple[List[TrackingNumberDefinition], List[Signature]]:
+    """The definitions and their dispatch signatures, from the cache if it is
+    up to date with _generated.py, otherwise from _generated.py (refreshing
+    the cache when one is configured and writable).
+    """
+    path = cache_path()
+    digest = source_digest()
+    if path:
+        cached = _read_cache(path, digest)
+        if cached is not None:
+            return cached
+
+    from tracking_numbers._generated import DEFINITIONS
+
+    signatures = [signature_of(definition.number_regex) for definition in DEFINITIONS]
+    path = writable_cache_path()
+    if path:
+        try:
+            write_cache(path, DEFINITIONS, signatures, digest)
+        except OSError:
+            # e.g. a read-only Lambda filesystem; next cold start retries
+            pass
+
+    return list(DEFINITIONS), signatures
+
+
+def _read_cache(
+    path: str,
+    digest: str,
+) -> Optional[Tuple[List[TrackingNumberDefinition], List[Signature]]]:
+    try:
+        with open(path, "rb") as f:
+            cache: Dict[str, Any] = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+    if cache.get("version") != CACHE_VERSION or cache.get("digest") != digest:
+        return None
+
+    definitions: List[TrackingNumberDefinition] = []
+    for courier_code, courier_name, product_name, payload in cache["definitions"]:
+        definitions.append(
+            LazyTrackingNumberDefinition(
+                Courier(code=courier_code, name=courier_name),
+                Product(name=product_name),
+                payload,
+            ),
+        )
+
+    return definitions, cache["signatures"]
+
+
+def write_cache(
+    path: str,
+    definitions: Sequence[TrackingNumberDefinition],
+    signatures: Sequence[Signature],
+    digest: str,
+) -> None:
+    cache = {
+        "version": CACHE_VERSION,
+        "digest": digest,
+        "definitions": [
+            (
+                definition.courier.code,
+                definition.courier.name,
+                definition.product.name,
+                pickle.dumps(definition, protocol=pickle.HIGHEST_PROTOCOL),
+            )
+            for definition in definitions
+        ],
+        "signatures": list(signatures),
+    }
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so concurrent cold starts never read a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    from tracking_numbers._generated import DEFINITIONS
+
+    target = cache_path() or DEFAULT_CACHE_PATH
+    write_cache(
+        target,
+        DEFINITIONS,
+        [signature_of(definition.number_regex) for definition in DEFINITIONS],
+        source_digest(),
+    )
+    print(f"Wrote {len(DEFINITIONS)} definitions to {target}")
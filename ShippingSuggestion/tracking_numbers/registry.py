@@ -0,0 +1,62 @@
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from tracking_numbers.definition import TrackingNumberDefinition
+from tracking_numbers.dispatch import DispatchIndex
+from tracking_numbers.dispatch import Signature
+
+
+class DefinitionRegistry:
+    """Dictionary indexes over the definitions, built once when they load:
+    by product name, and by courier code or name (all case-insensitive),
+    with a dispatch index per courier for courier-scoped lookups.
+    """
+
+    def __init__(
+        self,
+        definitions: Sequence[TrackingNumberDefinition],
+        signatures: Optional[Sequence[Signature]] = None,
+    ):
+        self.index = DispatchIndex(definitions, signatures=signatures)
+        self.definitions = self.index.definitions
+
+        self._by_product: Dict[str, TrackingNumberDefinition] = {}
+        self._by_courier: Dict[str, List[int]] = {}
+        for position, definition in enumerate(self.definitions):
+            # setdefault: the first definition wins, like a linear scan would
+            self._by_product.setdefault(definition.product.name.lower(), definition)
+
+            code = definition.courier.code.lower()
+            name = definition.courier.name.lower()
+            for key in {code, name}:
+                self._by_courier.setdefault(key, []).append(position)
+
+        self._courier_indexes: Dict[str, DispatchIndex] = {}
+
+    def get_definition(self, product_name: str) -> Optional[TrackingNumberDefinition]:
+        return self._by_product.get(product_name.lower())
+
+    def courier_definitions(self, courier: str) -> Tuple[TrackingNumberDefinition, ...]:
+        positions = self._by_courier.get(courier.lower(), ())
+        return tuple(self.definitions[position] for position in positions)
+
+    def courier_index(self, courier: str) -> Optional[DispatchIndex]:
+        """A dispatch index over one courier's definitions, built on first use"""
+        key = courier.lower()
+        index = self._courier_indexes.get(key)
+        if index is None:
+            positions = self._by_courier.get(key)
+            if not positions:
+                return None
+
+            index = DispatchIndex(
+                [self.definitions[position] for position in positions],
+                signatures=[self.index.signatures[position] for position in positions],
+            )
+            # A racing thread may build the same index; either copy is fine
+            index = self._courier_indexes.setdefault(key, index)
+
+        return index
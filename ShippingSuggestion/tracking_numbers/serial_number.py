@@ -9,6 +9,23 @@ from tracking_numbers.helpers.repr import repr_with_args
 from tracking_numbers.types import SerialNumber
 from tracking_numbers.types import Spec
 
+# bytes.translate(...) tables mapping each latin-1 character of a serial number
+# to its value; INVALID marks characters the list-based parse(...) would reject
+# (or treat differently), for which parse_values(...) returns None
+INVALID = 0xFF
+
+
+def _ups_value(code: int) -> int:
+    if 48 <= code <= 57:
+        return code - 48
+
+    # e.g. superscript digits, which UPSSerialNumberParser._value_of can't int(...)
+    return INVALID if chr(code).isdigit() else (code - 3) % 10
+
+
+DIGIT_VALUES = bytes(code - 48 if 48 <= code <= 57 else INVALID for code in range(256))
+UPS_VALUES = bytes(_ups_value(code) for code in range(256))
+
 
 @dataclass
 class PrependIf:
@@ -24,6 +41,9 @@ class PrependIf:
 
 
 class SerialNumberParser(metaclass=ABCMeta):
+    # The bytes.translate(...) table used by parse_values(...), if any
+    value_table: Optional[bytes] = None
+
     def __repr__(self):
         return repr_with_args(self)
 
@@ -31,8 +51,25 @@ class SerialNumberParser(metaclass=ABCMeta):
     def parse(self, number: str) -> SerialNumber:
         raise NotImplementedError
 
+    def parse_values(self, number: str) -> Optional[bytes]:
+        """Same values as parse(...), one byte each, built without a
+        per-character list. None if the fast path can't represent them.
+        """
+        return None
+
+    @staticmethod
+    def _translate(number: str, table: bytes) -> Optional[bytes]:
+        try:
+            values = number.encode("latin-1").translate(table)
+        except UnicodeEncodeError:
+            return None
+
+        return None if INVALID in values else values
+
 
 class DefaultSerialNumberParser(SerialNumberParser):
+    value_table = DIGIT_VALUES
+
     def __init__(self, prepend_if: Optional[PrependIf] = None):
         self.prepend_if = prepend_if
 
@@ -45,6 +82,12 @@ class DefaultSerialNumberParser(SerialNumberParser):
 
         return [int(digit) for digit in number]
 
+    def parse_values(self, number: str) -> Optional[bytes]:
+        if self.prepend_if:
+            number = self.prepend_if.apply(number)
+
+        return self._translate(number, self.value_table)
+
     @classmethod
     def from_spec(cls, validation_spec: Spec) -> "SerialNumberParser":
         serial_number_format = validation_spec.get("serial_number_format")
@@ -64,12 +107,17 @@ class DefaultSerialNumberParser(SerialNumberParser):
 
 
 class UPSSerialNumberParser(SerialNumberParser):
+    value_table = UPS_VALUES
+
     def __repr__(self):
         return repr_with_args(self)
 
     def parse(self, number: str) -> SerialNumber:
         return [self._value_of(ch) for ch in number]
 
+    def parse_values(self, number: str) -> Optional[bytes]:
+        return self._translate(number, self.value_table)
+
     @staticmethod
     def _value_of(ch: str) -> int:
         # Can't find a definitive spec for _why_ the chars are mapped this way,
@@ -1,39 +1,173 @@
+from dataclasses import FrozenInstanceError
 from dataclasses import dataclass
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Sequence
 from typing import Tuple
 
+from tracking_numbers.helpers.repr import repr_with_args
+
 Spec = Dict[str, Any]
 SerialNumber = List[int]
+FrozenSerialNumber = Tuple[int, ...]
 ValidationError = Tuple[str, str]
+ValidationErrors = Tuple[ValidationError, ...]
+
+# Shared by every valid result
+NO_VALIDATION_ERRORS: ValidationErrors = ()
 
+_PRODUCTS: Dict[str, "Product"] = {}
+_COURIERS: Dict[Tuple[str, str], "Courier"] = {}
 
-@dataclass
+
+@dataclass(frozen=True)
 class Product:
+    """Interned: constructing (or unpickling) an equal product returns the
+    existing instance, so results only ever reference one per product.
+    """
+
+    __slots__ = ("name",)
     name: str
 
+    def __new__(cls, name: str) -> "Product":
+        product = _PRODUCTS.get(name)
+        if product is None:
+            product = _PRODUCTS.setdefault(name, super().__new__(cls))
+        return product
 
-@dataclass
+    def __reduce__(self):
+        return Product, (self.name,)
+
+
+@dataclass(frozen=True)
 class Courier:
+    """Interned like Product."""
+
+    __slots__ = ("code", "name")
     code: str
     name: str
 
+    def __new__(cls, code: str, name: str) -> "Courier":
+        courier = _COURIERS.get((code, name))
+        if courier is None:
+            courier = _COURIERS.setdefault((code, name), super().__new__(cls))
+        return courier
+
+    def __reduce__(self):
+        return Courier, (self.code, self.name)
+
 
-@dataclass
 class TrackingNumber:
+    """A lookup result.
+
+    Slotted and immutable, since cached results are shared between callers:
+    serial_number and validation_errors are stored as tuples, whatever
+    sequence they're given as. Given a tracking_url_template (keyword only)
+    instead of a tracking_url, the tracking URL is only formatted when it is
+    read.
+    """
+
+    __slots__ = (
+        "number",
+        "courier",
+        "product",
+        "serial_number",
+        "validation_errors",
+        "_tracking_url",
+        "_tracking_url_template",
+    )
+
     number: str
     courier: Courier
     product: Product
-    serial_number: Optional[SerialNumber]
-    tracking_url: Optional[str]
-    validation_errors: List[ValidationError]
+    serial_number: Optional[FrozenSerialNumber]
+    validation_errors: ValidationErrors
+
+    def __init__(
+        self,
+        number: str,
+        courier: Courier,
+        product: Product,
+        serial_number: Optional[Sequence[int]],
+        tracking_url: Optional[str] = None,
+        validation_errors: Sequence[ValidationError] = NO_VALIDATION_ERRORS,
+        *,
+        tracking_url_template: Optional[str] = None,
+    ):
+        setattr_ = object.__setattr__
+        setattr_(self, "number", number)
+        setattr_(self, "courier", courier)
+        setattr_(self, "product", product)
+        if serial_number is not None:
+            serial_number = tuple(serial_number)
+        if validation_errors.__class__ is not tuple:
+            validation_errors = tuple(validation_errors)
+
+        setattr_(self, "serial_number", serial_number)
+        setattr_(self, "validation_errors", validation_errors)
+        setattr_(self, "_tracking_url", tracking_url)
+        setattr_(self, "_tracking_url_template", tracking_url_template)
 
     @property
     def valid(self) -> bool:
         return not self.validation_errors
 
+    @property
+    def tracking_url(self) -> Optional[str]:
+        if not self._tracking_url_template:
+            return self._tracking_url
+
+        return self._tracking_url_template % self.number
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def _key(self) -> Tuple:
+        return (
+            self.number,
+            self.courier,
+            self.product,
+            self.serial_number,
+            self.tracking_url,
+            self.validation_errors,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        # The rest is derived from the number and product
+        return hash((self.number, self.product))
+
+    def __reduce__(self):
+        return TrackingNumber, (
+            self.number,
+            self.courier,
+            self.product,
+            self.serial_number,
+            self.tracking_url,
+            self.validation_errors,
+        )
+
+    def __repr__(self):
+        return repr_with_args(
+            self,
+            number=self.number,
+            courier=self.courier,
+            product=self.product,
+            serial_number=self.serial_number,
+            tracking_url=self.tracking_url,
+            validation_errors=self.validation_errors,
+        )
+
 
 def to_int(serial_number: SerialNumber) -> int:
     return int("".join(map(str, serial_number)))
@@ -0,0 +1,57 @@
+"""NumPy-vectorized checksum validation of many same-length serial numbers.
+
+Requires numpy, which the rest of tracking_numbers doesn't depend on.
+"""
+
+from typing import Iterable
+from typing import Sequence
+
+import numpy
+
+from tracking_numbers.checksum_validator import ChecksumValidator
+from tracking_numbers.serial_number import INVALID
+from tracking_numbers.serial_number import DefaultSerialNumberParser
+from tracking_numbers.serial_number import SerialNumberParser
+
+
+def values_matrix(
+    parser: SerialNumberParser,
+    serial_numbers: Sequence[str],
+) -> numpy.ndarray:
+    """Parses same-length serial numbers into an (n, length) uint8 matrix of
+    the values parser.parse(...) would produce for each of them.
+    """
+    if isinstance(parser, DefaultSerialNumberParser) and parser.prepend_if:
+        serial_numbers = [parser.prepend_if.apply(serial) for serial in serial_numbers]
+
+    if not serial_numbers:
+        return numpy.zeros((0, 0), dtype=numpy.uint8)
+
+    length = len(serial_numbers[0])
+    if any(len(serial) != length for serial in serial_numbers):
+        raise ValueError("Serial numbers must all have the same length")
+
+    if parser.value_table is None:
+        raise ValueError(f"{parser!r} has no value table")
+
+    values = "".join(serial_numbers).encode("latin-1").translate(parser.value_table)
+    if INVALID in values:
+        raise ValueError("Serial numbers contain characters without a value")
+
+    return numpy.frombuffer(values, dtype=numpy.uint8).reshape(
+        len(serial_numbers), length
+    )
+
+
+def checksums_pass(
+    validator: ChecksumValidator,
+    parser: SerialNumberParser,
+    serial_numbers: Sequence[str],
+    check_digits: Iterable[int],
+) -> numpy.ndarray:
+    """Validates every (serial number, check digit) pair in one call, giving
+    the same answers as validator.passes(parser.parse(serial), check_digit).
+    """
+    values = values_matrix(parser, serial_numbers)
+    digits = numpy.fromiter(check_digits, dtype=numpy.int64, count=len(values))
+    return validator.passes_matrix(values, digits)
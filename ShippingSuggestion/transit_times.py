@@ -0,0 +1,130 @@
+"""
+Transit times: business days in transit by origin zone, destination zone and
+service, for delivery ETAs.
+
+The matrix is loaded from a local JSON file (transit_times.json next to this
+module, or the file named by TRANSIT_TIMES_PATH) into one uint8 array. Missing
+routes are filled in from the ANY zones at load time, so a lookup is three dict
+lookups and one array index, and never leaves the process.
+"""
+import datetime
+import json
+import os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from ShippingSuggestion.rate_cards import ANY
+
+DEFAULT_TRANSIT_TIMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transit_times.json")
+
+# Cells of the matrix without a transit time
+UNKNOWN = np.iinfo(np.uint8).max
+
+
+class TransitTimes:
+    """
+    Transit times of every route and service.
+
+    Args:
+        origins (dict): Origin zone -> row of days.
+        destinations (dict): Destination zone -> column of days.
+        services (dict): Service (rate card method) -> index into the last
+            axis of days.
+        days (np.ndarray): origins x destinations x services business days,
+            UNKNOWN where there is no transit time.
+        holidays: Dates that aren't business days.
+    """
+
+    __slots__ = ("origins", "destinations", "services", "days", "calendar")
+
+    def __init__(self, origins: Dict[str, int], destinations: Dict[str, int], services: Dict[str, int], days, holidays: Sequence[str] = ()):
+        self.origins = origins
+        self.destinations = destinations
+        self.services = services
+        self.days = np.asarray(days, dtype=np.uint8)
+        self.calendar = np.busdaycalendar(holidays=list(holidays))
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Args:
+            spec (dict): {"services": [...], "holidays": [...], "origins":
+                {origin zone: {destination zone: [days per service]}}}, with
+                null for services that don't serve a route. Routes that
+                aren't listed take the origin's ANY destination's days, or
+                else the ANY origin's.
+        """
+        services = {service: index for index, service in enumerate(spec["services"])}
+        routes = spec["origins"]
+        origins = {origin: index for index, origin in enumerate(routes)}
+        destinations: Dict[str, int] = {}
+        for origin_routes in routes.values():
+            for destination in origin_routes:
+                destinations.setdefault(destination, len(destinations))
+
+        days = np.full((len(origins), len(destinations), len(services)), UNKNOWN, dtype=np.uint8)
+        listed = np.zeros((len(origins), len(destinations)), dtype=bool)
+        for origin, origin_routes in routes.items():
+            for destination, service_days in origin_routes.items():
+                listed[origins[origin], destinations[destination]] = True
+                if len(service_days) != len(services):
+                    raise ValueError(f"{origin} -> {destination} has {len(service_days)} transit times for {len(services)} services")
+                for service, value in enumerate(service_days):
+                    if value is None:
+                        continue
+                    if not 0 <= value < UNKNOWN:
+                        raise ValueError(f"Transit times must be 0-{UNKNOWN - 1} days, got {value}")
+                    days[origins[origin], destinations[destination], service] = value
+
+        days = _fill_from_any(days, listed, origins.get(ANY), destinations.get(ANY))
+        return cls(origins, destinations, services, days, spec.get("holidays", ()))
+
+    @classmethod
+    def load(cls, path=DEFAULT_TRANSIT_TIMES_PATH):
+        with open(path) as f:
+            return cls.from_spec(json.load(f))
+
+    @classmethod
+    def from_env(cls):
+        """The transit times in TRANSIT_TIMES_PATH (default: the bundled transit_times.json)."""
+        return cls.load(os.environ.get("TRANSIT_TIMES_PATH") or DEFAULT_TRANSIT_TIMES_PATH)
+
+    def transit_days(self, origin, destination, service) -> Optional[int]:
+        """
+        Returns:
+            int: Business days from origin to destination zone with the
+            service, or None if the matrix doesn't cover them.
+        """
+        origin_index = self.origins.get(origin, self.origins.get(ANY))
+        destination_index = self.destinations.get(destination, self.destinations.get(ANY))
+        service_index = self.services.get(service)
+        if origin_index is None or destination_index is None or service_index is None:
+            return None
+
+        days = self.days[origin_index, destination_index, service_index]
+        return None if days == UNKNOWN else int(days)
+
+    def eta(self, origin, destination, service, ship_date: datetime.date) -> Optional[datetime.date]:
+        """The delivery date of a parcel shipped on ship_date (or the next business day)."""
+        days = self.transit_days(origin, destination, service)
+        if days is None:
+            return None
+
+        return self.eta_after(days, ship_date)
+
+    def eta_after(self, days, ship_date: datetime.date) -> datetime.date:
+        """The delivery date of a parcel days business days in transit from ship_date (or the next business day)."""
+        delivery = np.busday_offset(np.datetime64(ship_date, "D"), days, roll="forward", busdaycal=self.calendar)
+        return delivery.astype(datetime.date)
+
+
+def _fill_from_any(days, listed, any_origin, any_destination):
+    """Fills unlisted routes from the origin's ANY destination, then the ANY origin's"""
+    if any_destination is not None:
+        days = np.where(listed[:, :, None], days, days[:, any_destination : any_destination + 1, :])
+        listed = listed | listed[:, any_destination : any_destination + 1]
+    if any_origin is not None:
+        days = np.where(listed[:, :, None], days, days[any_origin : any_origin + 1, :, :])
+
+    return days
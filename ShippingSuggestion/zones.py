@@ -0,0 +1,216 @@
+"""
+Resolves free-form destinations ("Kingston", "New York 10001", "Berlin,
+Germany") to shipping zones, offline, from a local dataset (zones.json next to
+this module, or the file named by ZONES_PATH).
+
+Postal codes (words in the country's full postal code format, so street and
+unit numbers aren't mistaken for them) are matched by longest prefix in a
+per-country trie, then city names (only the named country's, if the
+destination names one; later parts first, as addresses end with the city),
+then country names. Destinations no rule matches resolve to the ANY zone,
+which every rate card falls back to. The country whose rule matched is
+resolved along with the zone.
+"""
+import json
+import os
+import re
+from typing import Dict, NamedTuple, Optional, Pattern, Set, Tuple
+
+from ShippingSuggestion.cache import LRUCache
+from ShippingSuggestion.rate_cards import ANY
+
+DEFAULT_ZONES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zones.json")
+
+DEFAULT_CACHE_SIZE = 10_000
+
+# Full street addresses are cached too; longer destinations aren't, so
+# garbage input can't pin large strings
+MAX_CACHED_DESTINATION_LENGTH = 256
+
+# Place names are matched on up to this many words
+MAX_NAME_WORDS = 3
+
+_SEPARATORS = re.compile(r"[\W_]+")
+# Punctuation but commas, which separate the parts of a destination
+# (whitespace is left to str.split), and the same as a bytes.translate table
+# for ASCII destinations, which is several times faster
+_PUNCTUATION = re.compile(r"[^\w\s,]+|_+")
+_ASCII_PUNCTUATION = bytes(code if chr(code).isalnum() or chr(code).isspace() or chr(code) == "," else 32 for code in range(256))
+
+
+class Location(NamedTuple):
+    zone: str
+    # The country code, or None if the destination names none and no rule matched
+    country: Optional[str]
+
+
+class PrefixTrie:
+    """Maps prefixes to values and finds the longest prefix of a key."""
+
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children: Dict[str, "PrefixTrie"] = {}
+        self.value: Optional[str] = None
+
+    def insert(self, prefix, value):
+        node = self
+        for char in prefix:
+            node = node.children.setdefault(char, PrefixTrie())
+        node.value = value
+
+    def longest_match(self, key) -> Optional[str]:
+        node = self
+        found = node.value
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.value is not None:
+                found = node.value
+
+        return found
+
+
+def normalize(text):
+    """Lowercases text and turns punctuation and runs of whitespace into single spaces."""
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+class ZoneResolver:
+    """
+    Resolves destinations to zones.
+
+    Args:
+        countries (dict): Country code -> {"names": [...], "zone": ...,
+            "cities": {name: zone}, "postal_format": regex,
+            "postal_codes": {prefix: zone}}. Postal codes are only looked
+            up for countries with a postal_format.
+        default_country (str): Whose postal codes bare codes are matched
+            against when the destination names no country.
+        cache_size (int): How many resolved destinations are kept.
+    """
+
+    def __init__(self, countries, default_country=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.default_country = default_country
+        self.country_zones: Dict[str, Optional[str]] = {}
+        self.country_names: Dict[str, str] = {}
+        # Last word of a country name -> the word counts of the names it ends, longest first
+        self.country_lengths: Dict[str, Tuple[int, ...]] = {}
+        # City name -> country code -> zone, countries in dataset order
+        self.cities: Dict[str, Dict[str, str]] = {}
+        # First word of a city name -> the word counts of the names it starts
+        self.city_lengths: Dict[str, Set[int]] = {}
+        self.postal_codes: Dict[str, PrefixTrie] = {}
+        self.postal_formats: Dict[str, Pattern] = {}
+        for code, country in countries.items():
+            self.country_zones[code] = country.get("zone")
+            # Codes aren't names: "CA" or "DE" are more often US states
+            for name in country.get("names", []):
+                name = normalize(name)
+                self.country_names[name] = code
+                words = name.split()
+                lengths = {len(words), *self.country_lengths.get(words[-1], ())}
+                self.country_lengths[words[-1]] = tuple(sorted(lengths, reverse=True))
+            for name, zone in country.get("cities", {}).items():
+                name = normalize(name)
+                self.cities.setdefault(name, {})[code] = zone
+                words = name.split()
+                self.city_lengths.setdefault(words[0], set()).add(len(words))
+
+            if country.get("postal_format"):
+                self.postal_formats[code] = re.compile(country["postal_format"], re.IGNORECASE)
+            trie = PrefixTrie()
+            for prefix, zone in country.get("postal_codes", {}).items():
+                trie.insert(prefix.upper(), zone)
+            self.postal_codes[code] = trie
+
+        self._cache: LRUCache[Location] = LRUCache(cache_size, max_key_length=MAX_CACHED_DESTINATION_LENGTH)
+
+    @classmethod
+    def from_spec(cls, spec, cache_size=DEFAULT_CACHE_SIZE):
+        return cls(spec.get("countries", {}), spec.get("default_country"), cache_size)
+
+    @classmethod
+    def load(cls, path=DEFAULT_ZONES_PATH, cache_size=DEFAULT_CACHE_SIZE):
+        with open(path) as f:
+            return cls.from_spec(json.load(f), cache_size)
+
+    @classmethod
+    def from_env(cls):
+        """A resolver for ZONES_PATH (default: the bundled zones.json), caching ZONE_CACHE_SIZE destinations."""
+        path = os.environ.get("ZONES_PATH") or DEFAULT_ZONES_PATH
+        cache_size = int(os.environ.get("ZONE_CACHE_SIZE") or DEFAULT_CACHE_SIZE)
+        return cls.load(path, cache_size)
+
+    def resolve(self, destination) -> str:
+        """
+        Returns:
+            str: The destination's zone, or ANY if it can't be resolved.
+        """
+        return self.locate(destination).zone
+
+    def locate(self, destination) -> Location:
+        """
+        Returns:
+            Location: The destination's zone and country.
+        """
+        return self._cache.get_or_compute(destination, self._resolve)
+
+    def cache_stats(self):
+        return self._cache.stats()
+
+    def _resolve(self, destination):
+        # Normalized in one pass; each part is a list of words
+        normalized = destination.casefold()
+        if normalized.isascii():
+            normalized = normalized.encode().translate(_ASCII_PUNCTUATION).decode()
+        else:
+            normalized = _PUNCTUATION.sub(" ", normalized)
+        parts = [words for words in map(str.split, normalized.split(",")) if words]
+
+        country = None
+        country_lengths = self.country_lengths
+        for words in reversed(parts):
+            # The whole part, or up to MAX_NAME_WORDS of its trailing words, as
+            # long as a country name ending in its last word
+            for count in country_lengths.get(words[-1], ()):
+                if count == len(words) or count <= min(len(words) - 1, MAX_NAME_WORDS):
+                    country = self.country_names.get(" ".join(words[-count:]))
+                    if country:
+                        break
+            if country:
+                break
+
+        postal_country = country or self.default_country
+        postal_format = self.postal_formats.get(postal_country)
+        if postal_format is not None:
+            trie = self.postal_codes[postal_country]
+            for words in parts:
+                for token in words:
+                    if not postal_format.match(token):
+                        continue
+                    zone = trie.longest_match(token.upper())
+                    if zone is not None:
+                        return Location(zone, postal_country)
+
+        city_lengths = self.city_lengths
+        for words in reversed(parts):
+            # Runs of words as long as a city name starting with their first word, longest first
+            starts = [(start, city_lengths[word]) for start, word in enumerate(words) if word in city_lengths]
+            for count in range(min(len(words), MAX_NAME_WORDS), 0, -1):
+                for start, lengths in starts:
+                    if count not in lengths or start + count > len(words):
+                        continue
+                    zones = self.cities.get(" ".join(words[start : start + count]))
+                    if not zones:
+                        continue
+                    # An unqualified city name means the first country that has it
+                    city_country = country or next(iter(zones))
+                    if city_country in zones:
+                        return Location(zones[city_country], city_country)
+
+        if country and self.country_zones.get(country):
+            return Location(self.country_zones[country], country)
+
+        return Location(ANY, country)
@@ -1,9 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import json
+import os
+import queue
+from utils.vendored import load_easypost, load_tracking_numbers
+
+load_tracking_numbers()
+# Live shipping rates go through the easypost SDK vendored for OrderStatusTracking
+if os.environ.get("EASYPOST_API_KEY"):
+    load_easypost()
+
 from InvoiceGenerator.InvoiceGenerator import lambda_handler as invoice_handler
+from InvoiceGenerator.InvoiceGenerator import generate_invoice
+from InvoiceGenerator.batch import BatchStats, generate_invoices, with_summary
+from InvoiceGenerator.jobs import INVOICE_JOBS
 from order_validation.order_validation import lambda_handler as validation_handler
 from OrderStatusTracking.OrderStatusTracking import lambda_handler as tracking_handler
 from ShippingSuggestion.ShippingSuggestion import lambda_handler as shipping_handler
+from ShippingSuggestion.ShippingSuggestion import suggest_shipping_batch
+from utils.ndjson import dump_ndjson, iter_ndjson
 
 api = Flask(__name__)
 
@@ -27,7 +41,11 @@ def home():
             <ul>
                 <li><code>POST /order_validation</code></li>
                 <li><code>POST /invoiceGenerator</code></li>
+                <li><code>POST /invoiceGenerator/batch</code> (NDJSON)</li>
+                <li><code>POST /invoiceGenerator/lines</code> (NDJSON line items)</li>
+                <li><code>POST /invoiceGenerator/jobs</code> (202, then <code>GET /invoiceGenerator/jobs/&lt;job_id&gt;</code>)</li>
                 <li><code>POST /ShippingSuggestion</code></li>
+                <li><code>POST /ShippingSuggestion/batch</code> (NDJSON)</li>
                 <li><code>POST /OrderStatusTracking</code></li>
             </ul>
             <p>See the <a href="https://github.com/Stefodan21/Order_fullfillment_Project" target="_blank">GitHub repository</a> for usage details.</p>
@@ -44,16 +62,88 @@ def validate():
 
 @api.route('/invoiceGenerator', methods=['POST'])
 def gen_invoice():
+    # "Prefer: respond-async" queues the invoice as a job instead
+    if 'respond-async' in request.headers.get('Prefer', ''):
+        return submit_invoice_job()
+
     event = {"body": request.json}
     result = invoice_handler(event, None)
     return jsonify(json.loads(result['body'])), result['statusCode']
 
+@api.route('/invoiceGenerator/batch', methods=['POST'])
+def gen_invoice_batch():
+    # One invoice request per line in, one result per line out, then a summary
+    # line. PDFs render across INVOICE_RENDER_PROCESSES processes (default: one
+    # per CPU, 0: in this process).
+    processes = os.environ.get("INVOICE_RENDER_PROCESSES")
+    stats = BatchStats()
+    results = generate_invoices(
+        iter_ndjson(request.stream),
+        os.environ["INVOICE_BUCKET_NAME"],
+        os.environ["DYNAMODB_TABLE_NAME"],
+        processes=int(processes) if processes else None,
+        stats=stats,
+    )
+    return Response(stream_with_context(dump_ndjson(with_summary(results, stats))), mimetype='application/x-ndjson')
+
+@api.route('/invoiceGenerator/lines', methods=['POST'])
+def gen_invoice_lines():
+    # The first line is the invoice request and every line after it a line
+    # item; pages are laid out as the lines arrive, so memory stays bounded
+    # however many items the order has
+    lines = iter_ndjson(request.stream)
+    _, body = next(lines, (None, None))
+    if not body or not isinstance(body, dict):
+        return jsonify({'error': 'Invalid input'}), 400
+
+    status, result = generate_invoice(body, items=(value for _, value in lines))
+    return jsonify(result), status
+
+@api.route('/invoiceGenerator/jobs', methods=['POST'])
+def submit_invoice_job():
+    # Answers as soon as the invoice is queued; poll the Location for its path
+    body = request.get_json(silent=True)
+    if not body or not isinstance(body, dict):
+        return jsonify({'error': 'Invalid input'}), 400
+
+    try:
+        job = INVOICE_JOBS.submit(body)
+    except queue.Full:
+        return jsonify({'error': 'Too many invoices queued, retry later'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        print(f"Error: Unable to save the invoice job's status to DynamoDB. {e}")
+        return jsonify({'error': 'Failed to queue the invoice'}), 500
+    return jsonify(job), 202, {'Location': f"/invoiceGenerator/jobs/{job['job_id']}"}
+
+@api.route('/invoiceGenerator/jobs/<job_id>')
+def invoice_job_status(job_id):
+    try:
+        job = INVOICE_JOBS.status(job_id)
+    except Exception as e:
+        print(f"Error: Unable to read the invoice job's status from DynamoDB. {e}")
+        return jsonify({'error': 'Failed to read the job status'}), 500
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job), 200
+
+@api.route('/invoiceGenerator/jobs')
+def invoice_job_stats():
+    # Queue depth, job counts, and recent wait and latency percentiles
+    return jsonify(INVOICE_JOBS.stats()), 200
+
 @api.route('/ShippingSuggestion', methods=['POST'])
 def shipping_suggestion():
     event = {'body': request.json}
     result = shipping_handler(event, None)
     return jsonify(json.loads(result['body'])), result['statusCode']
 
+@api.route('/ShippingSuggestion/batch', methods=['POST'])
+def shipping_suggestion_batch():
+    # One JSON request body per line in, one result per line out. Lines are
+    # read and answered a chunk at a time, so a wave is never held in memory.
+    results = suggest_shipping_batch(iter_ndjson(request.stream))
+    return Response(stream_with_context(dump_ndjson(results)), mimetype='application/x-ndjson')
+
 
 @api.route('/OrderStatusTracking', methods=['POST'])
 def track_status():
@@ -0,0 +1,73 @@
+"""
+Per-invocation AWS setup cost: creating the invoice handler's S3 and DynamoDB
+resources from scratch (as every invocation used to) against reusing them from
+the shared registry, as a warm container does.
+
+No requests are sent; only session, client and resource creation is timed.
+
+Usage:
+    python benchmarks/bench_aws_clients.py [--invocations 50] [--repeat 3]
+"""
+
+import argparse
+import os
+import timeit
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+import boto3
+
+from utils.aws import AWSRegistry
+
+TABLE_NAME = "invoices"
+
+
+def from_scratch():
+    s3 = boto3.resource("s3")
+    dynamodb = boto3.resource("dynamodb")
+    return s3, dynamodb.Table(TABLE_NAME)
+
+
+def from_registry(registry):
+    return registry.resource("s3"), registry.table(TABLE_NAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invocations", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Endpoint resolution needs a region, not credentials
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    registry = AWSRegistry()
+    cold_time = min(
+        timeit.repeat(
+            lambda: from_registry(AWSRegistry()), number=1, repeat=args.repeat
+        )
+    )
+    from_registry(registry)
+
+    scratch_time = min(
+        timeit.repeat(from_scratch, number=args.invocations, repeat=args.repeat)
+    )
+    warm_time = min(
+        timeit.repeat(
+            lambda: from_registry(registry),
+            number=args.invocations,
+            repeat=args.repeat,
+        )
+    )
+    scratch_ms = scratch_time / args.invocations * 1e3
+    warm_ms = warm_time / args.invocations * 1e3
+    print(f"registry, first (cold) invocation: {cold_time * 1e3:9.3f} ms")
+    print(f"boto3.resource per invocation:     {scratch_ms:9.3f} ms")
+    print(
+        f"registry, warm invocation:         {warm_ms:9.3f} ms"
+        f"  (saves {scratch_ms - warm_ms:.1f} ms per invocation)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Invoice batch throughput: one invoice at a time the way /invoiceGenerator used
+to run (put_item, query, render, put_object) against generate_invoices(...)
+with a process pool, batch_writer and concurrent uploads.
+
+AWS is replaced by in-process stand-ins that sleep for a fixed latency per
+request, so only the pipeline is measured, not the network.
+
+Usage:
+    python benchmarks/bench_invoice_batch.py [--invoices 2000] [--processes 4]
+        [--latency-ms 15] [--upload-workers 16]
+"""
+
+import argparse
+import time
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from InvoiceGenerator.InvoiceGenerator import invoice_file_name
+from InvoiceGenerator.InvoiceGenerator import prepare_invoice
+from InvoiceGenerator.InvoiceGenerator import render_invoice
+from InvoiceGenerator.batch import BatchStats
+from InvoiceGenerator.batch import generate_invoices
+from utils.aws import AWSRegistry
+
+# batch_writer sends up to 25 items per BatchWriteItem request
+BATCH_WRITE_SIZE = 25
+
+
+class LatencySession:
+    """Stands in for a boto3 Session whose every request takes `latency` seconds"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def client(self, service, config=None):
+        return self
+
+    def resource(self, service, config=None):
+        return self
+
+    def Table(self, name):
+        return self
+
+    def Bucket(self, name):
+        return self
+
+    def put_item(self, Item, **kwargs):
+        time.sleep(self.latency)
+
+    def query(self, **kwargs):
+        time.sleep(self.latency)
+        return {"Items": []}
+
+    def put_object(self, **kwargs):
+        time.sleep(self.latency)
+
+    def batch_writer(self):
+        return LatencyBatchWriter(self.latency)
+
+
+class LatencyBatchWriter:
+    def __init__(self, latency):
+        self.latency = latency
+        self.buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.buffered:
+            time.sleep(self.latency)
+
+    def put_item(self, Item):
+        self.buffered += 1
+        if self.buffered == BATCH_WRITE_SIZE:
+            time.sleep(self.latency)
+            self.buffered = 0
+
+
+def one_at_a_time(orders, session):
+    for _, body in orders:
+        item, fields = prepare_invoice(body)
+        session.put_item(Item=item)
+        session.query()
+        pdf_bytes = render_invoice(**fields)
+        session.put_object(Key=invoice_file_name(item), Body=pdf_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=15)
+    parser.add_argument("--upload-workers", type=int, default=16)
+    parser.add_argument(
+        "--sequential-sample",
+        type=int,
+        default=200,
+        help="invoices timed one at a time (extrapolated)",
+    )
+    args = parser.parse_args()
+
+    session = LatencySession(args.latency_ms / 1e3)
+    orders = [
+        (line, {"customer_name": f"Customer {line}", "item_price": 12.5})
+        for line in range(1, args.invoices + 1)
+    ]
+
+    sample = orders[: args.sequential_sample]
+    started = time.perf_counter()
+    one_at_a_time(sample, session)
+    sequential_rate = len(sample) / (time.perf_counter() - started)
+    print(
+        f"{args.invoices} invoices, {args.latency_ms:g} ms per AWS request,"
+        f" {args.processes} render processes, {args.upload_workers} uploaders"
+    )
+    print(f"one at a time:     {sequential_rate:8.0f} invoices/s")
+
+    for processes in (0, args.processes):
+        stats = BatchStats()
+        results = generate_invoices(
+            orders,
+            "invoices",
+            "orders",
+            processes=processes,
+            upload_workers=args.upload_workers,
+            aws=AWSRegistry(lambda: session),
+            stats=stats,
+        )
+        for _ in results:
+            pass
+        summary = stats.summary()
+        assert summary["invoices"] == args.invoices and not summary["failed"]
+        rate = summary["invoices_per_second"]
+        print(
+            f"generate_invoices: {rate:8.0f} invoices/s  ({rate / sequential_rate:5.1f}x)"
+            f"  [{processes or 'no'} render processes]"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Invoice request latency: POST /invoiceGenerator, which answers once the
+invoice is saved, rendered and uploaded, against POST /invoiceGenerator/jobs,
+which answers 202 once it's queued, and how long the queued jobs then take.
+
+AWS is replaced by in-process stand-ins that sleep for a fixed latency per
+request (see bench_invoice_batch.py).
+
+Usage:
+    python benchmarks/bench_invoice_jobs.py [--requests 500] [--workers 8]
+        [--latency-ms 15]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+import api as api_module
+from bench_invoice_batch import LatencySession
+from InvoiceGenerator import InvoiceGenerator
+from InvoiceGenerator.jobs import InvoiceJobs
+from utils.aws import AWSRegistry
+
+PAYLOAD = {
+    "customer_name": "Stefaan",
+    "customer_address": "Jamaica",
+    "business_name": "CloudSoft",
+    "item_purchased": "Serverless Mastery",
+    "item_price": 120,
+    "item_quantity": 2,
+}
+
+
+def post_all(client, path, count, expected_status):
+    """Milliseconds per request"""
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = client.post(path, json=PAYLOAD)
+        latencies.append((time.perf_counter() - started) * 1e3)
+        assert response.status_code == expected_status, response.get_data()
+    return latencies
+
+
+def describe(latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    return f"p50 {statistics.median(ordered):7.2f} ms  p95 {p95:7.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=15)
+    args = parser.parse_args()
+
+    os.environ.setdefault("INVOICE_BUCKET_NAME", "invoices")
+    os.environ.setdefault("DYNAMODB_TABLE_NAME", "orders")
+    InvoiceGenerator.AWS = AWSRegistry(lambda: LatencySession(args.latency_ms / 1e3))
+    jobs = api_module.INVOICE_JOBS = InvoiceJobs(
+        workers=args.workers, max_queued=args.requests
+    )
+    client = api_module.api.test_client()
+
+    print(
+        f"{args.requests} requests, {args.latency_ms:g} ms per AWS request,"
+        f" {args.workers} job workers"
+    )
+    sync = post_all(client, "/invoiceGenerator", args.requests, 200)
+    print(f"POST /invoiceGenerator (sync):  {describe(sync)}")
+
+    started = time.perf_counter()
+    queued = post_all(client, "/invoiceGenerator/jobs", args.requests, 202)
+    print(f"POST /invoiceGenerator/jobs:    {describe(queued)}")
+    jobs.join()
+    seconds = time.perf_counter() - started
+    stats = jobs.stats()
+    assert stats["completed"] == args.requests, stats
+    print(
+        f"jobs done in {seconds:.2f} s ({args.requests / seconds:.0f} invoices/s),"
+        f" wait p95 {stats['wait_ms']['p95']} ms, latency p95 {stats['latency_ms']['p95']} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
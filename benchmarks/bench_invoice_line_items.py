@@ -0,0 +1,106 @@
+"""
+Line-item invoices at 10, 1k and 50k lines: iter_invoice_pdf(...), which
+writes each page out as it fills, against fpdf laying out every row and
+holding the whole document until output. Reports lines per second, pages,
+size and peak Python memory (tracemalloc, measured in a separate pass).
+
+Items are generated lazily, as an NDJSON stream would deliver them, so the
+memory is the renderer's own.
+
+Usage:
+    python benchmarks/bench_invoice_line_items.py [--lines 10 1000 50000]
+        [--fpdf-max-lines 50000]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from InvoiceGenerator.line_items import iter_invoice_pdf
+from InvoiceGenerator.template import new_document
+
+FIELDS = {
+    "business_name": "CloudSoft",
+    "invoice_number": "5b0c3f0e-8a52-4a8e-9d0f-8a3f1e0f2b7c",
+    "order_id": "0f8e0b1c-7a3d-4c55-8b61-2a8f7e6d5c4b",
+    "ordered_at": "2026-10-18T12:00:00.000000Z",
+    "customer_name": "Stefaan",
+    "customer_address": "Jamaica",
+}
+
+
+def items(count):
+    for n in range(count):
+        yield {
+            "item_purchased": f"Replacement part #{n:06d}, stainless",
+            "item_price": 3.75 + n % 17,
+            "item_quantity": 1 + n % 9,
+        }
+
+
+def streamed(count):
+    """Bytes written and pages"""
+    size = pages = 0
+    for chunk in iter_invoice_pdf(FIELDS, items(count)):
+        size += len(chunk)
+        pages += chunk.count(b"/Type /Page\n")
+    return size, pages
+
+
+def fpdf_in_memory(count):
+    """The same rows as fpdf cells, with fpdf's automatic page breaks"""
+    pdf = new_document()
+    pdf.set_font("Arial", size=10)
+    for item in items(count):
+        amount = item["item_price"] * item["item_quantity"]
+        pdf.cell(110, 6, txt=item["item_purchased"])
+        pdf.cell(20, 6, txt=f"{item['item_quantity']}", align="R")
+        pdf.cell(30, 6, txt=f"${item['item_price']:.2f}", align="R")
+        pdf.cell(30, 6, txt=f"${amount:.2f}", align="R", ln=True)
+    document = pdf.output(dest="S").encode("latin1")
+    return len(document), pdf.page
+
+
+def measure(render, count):
+    started = time.perf_counter()
+    size, pages = render(count)
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    render(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, size, pages, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument(
+        "--fpdf-max-lines",
+        type=int,
+        default=50000,
+        help="skip the fpdf comparison above this many lines",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'lines':>7} {'renderer':<16} {'seconds':>8} {'lines/s':>9}"
+        f" {'pages':>6} {'KiB':>7} {'peak KiB':>9}"
+    )
+    for count in args.lines:
+        renderers = [("iter_invoice_pdf", streamed)]
+        if count <= args.fpdf_max_lines:
+            renderers.append(("fpdf, in memory", fpdf_in_memory))
+        for name, render in renderers:
+            seconds, size, pages, peak = measure(render, count)
+            print(
+                f"{count:>7} {name:<16} {seconds:8.3f} {count / seconds:9.0f}"
+                f" {pages:>6} {size / 1024:7.0f} {peak / 1024:9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
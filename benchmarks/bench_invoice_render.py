@@ -0,0 +1,98 @@
+"""
+Invoices rendered per second: the previous render path (save to invoices/,
+render again as a string, copy through a BytesIO) against render_invoice(...),
+which renders once in memory.
+
+Usage:
+    python benchmarks/bench_invoice_render.py [--invoices 500] [--repeat 3]
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import timeit
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from fpdf import FPDF
+
+from InvoiceGenerator.InvoiceGenerator import render_invoice
+
+FIELDS = {
+    "business_name": "CloudSoft",
+    "invoice_number": "5b0c3f0e-8a52-4a8e-9d0f-8a3f1e0f2b7c",
+    "order_id": "0f8e0b1c-7a3d-4c55-8b61-2a8f7e6d5c4b",
+    "ordered_at": "2026-10-18T12:00:00.000000Z",
+    "customer_name": "Stefaan",
+    "customer_address": "Jamaica",
+    "item_bought": "Serverless Mastery",
+    "item_price": 120,
+    "item_quantity": 2,
+}
+
+
+def legacy_render(fields, output_dir):
+    """The handler's render path before rendering moved into memory"""
+    pdf = FPDF(orientation="portrait", unit="mm", format="A4")
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(
+        200, 10, txt=f"Invoice from: {fields['business_name']}", ln=True, align="C"
+    )
+    pdf.cell(200, 10, txt=f"Invoice Number: {fields['invoice_number']}", ln=True)
+    pdf.cell(200, 10, txt=f"Order ID: {fields['order_id']}", ln=True)
+    pdf.cell(200, 10, txt=f"Ordered At: {fields['ordered_at']}", ln=True)
+    pdf.cell(200, 10, txt="Thank you for your order!", ln=True)
+    pdf.cell(200, 10, txt=f"Customer Name: {fields['customer_name']}", ln=True)
+    pdf.cell(200, 10, txt=f"Customer Address: {fields['customer_address']}", ln=True)
+    pdf.cell(200, 10, txt=f"Item Purchased: {fields['item_bought']}", ln=True)
+    pdf.cell(200, 10, txt=f"Item Price: ${fields['item_price']:.2f}", ln=True)
+    pdf.cell(200, 10, txt=f"Item Quantity: {fields['item_quantity']}", ln=True)
+    total = fields["item_price"] * fields["item_quantity"]
+    pdf.cell(200, 10, txt=f"Total Amount: ${total:.2f}", ln=True)
+    pdf.cell(200, 10, txt=" ", ln=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    pdf.output(os.path.join(output_dir, "invoice.pdf"))
+    pdf_bytes = pdf.output(dest="S").encode("latin1")
+    return io.BytesIO(pdf_bytes).getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = os.path.join(tmp, "invoices")
+        # Same document; only the creation timestamp may differ
+        assert len(legacy_render(FIELDS, output_dir)) == len(render_invoice(**FIELDS))
+
+        legacy_time = min(
+            timeit.repeat(
+                lambda: legacy_render(FIELDS, output_dir),
+                number=args.invoices,
+                repeat=args.repeat,
+            )
+        )
+    memory_time = min(
+        timeit.repeat(
+            lambda: render_invoice(**FIELDS),
+            number=args.invoices,
+            repeat=args.repeat,
+        )
+    )
+    print(f"{args.invoices} invoices")
+    print(
+        f"save + render again + BytesIO: {args.invoices / legacy_time:8.0f} invoices/s"
+    )
+    print(
+        f"render_invoice (in memory):    {args.invoices / memory_time:8.0f} invoices/s"
+        f"  ({legacy_time / memory_time:4.2f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
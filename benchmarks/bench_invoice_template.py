@@ -0,0 +1,72 @@
+"""
+CPU per invoice: fpdf drawing every cell of the invoice (how render_invoice
+worked before templates) against render_invoice filling in the compiled
+INVOICE_TEMPLATE.
+
+Usage:
+    python benchmarks/bench_invoice_template.py [--invoices 2000] [--repeat 3]
+"""
+
+import argparse
+import re
+import time
+import timeit
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from InvoiceGenerator.InvoiceGenerator import INVOICE_LINES, render_invoice
+from InvoiceGenerator.template import compile_template, draw
+
+FIELDS = {
+    "business_name": "CloudSoft",
+    "invoice_number": "5b0c3f0e-8a52-4a8e-9d0f-8a3f1e0f2b7c",
+    "order_id": "0f8e0b1c-7a3d-4c55-8b61-2a8f7e6d5c4b",
+    "ordered_at": "2026-10-18T12:00:00.000000Z",
+    "customer_name": "Stefaan",
+    "customer_address": "Jamaica",
+    "item_bought": "Serverless Mastery",
+    "item_price": 120,
+    "item_quantity": 2,
+}
+
+
+def cpu_seconds(function, number, repeat):
+    return min(
+        timeit.repeat(function, timer=time.process_time, number=number, repeat=repeat)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    values = dict(FIELDS, total=FIELDS["item_price"] * FIELDS["item_quantity"])
+    # The same document; only the creation timestamp may differ
+    assert re.sub(rb"D:\d{14}", b"", draw(INVOICE_LINES, values)) == re.sub(
+        rb"D:\d{14}", b"", render_invoice(**FIELDS)
+    )
+
+    compile_time = cpu_seconds(lambda: compile_template(INVOICE_LINES), 10, args.repeat)
+    drawn_time = cpu_seconds(
+        lambda: draw(INVOICE_LINES, values), args.invoices, args.repeat
+    )
+    template_time = cpu_seconds(
+        lambda: render_invoice(**FIELDS), args.invoices, args.repeat
+    )
+    print(f"{args.invoices} invoices, CPU time")
+    print(f"compile_template (once per process): {compile_time / 10 * 1e6:8.0f} us")
+    print(
+        f"fpdf, cell by cell:                  {drawn_time / args.invoices * 1e6:8.0f} us/invoice"
+        f"  {args.invoices / drawn_time:8.0f} invoices/s"
+    )
+    print(
+        f"render_invoice (compiled template):  {template_time / args.invoices * 1e6:8.0f} us/invoice"
+        f"  {args.invoices / template_time:8.0f} invoices/s"
+        f"  ({drawn_time / template_time:4.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Times consolidate(...) over N pending parcels and reports how many shipments
+and how much cost consolidation saves.
+
+Usage:
+    python benchmarks/bench_shipping_consolidation.py [--parcels 100000]
+        [--destinations 2000] [--hours 24] [--window 4] [--repeat 3]
+"""
+
+import argparse
+import random
+import timeit
+from collections import Counter
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from ShippingSuggestion.consolidation import Parcel
+from ShippingSuggestion.consolidation import consolidate
+from ShippingSuggestion.rate_cards import RateCards
+from ShippingSuggestion.rate_cards import DEFAULT_RATE_CARDS_PATH
+from ShippingSuggestion.zones import ZoneResolver
+
+
+def build_parcels(count, destinations, hours, rng):
+    return [
+        Parcel(
+            id=f"parcel-{index}",
+            destination=f"City {rng.randrange(destinations)}",
+            weight=round(rng.uniform(0.1, 20), 2),
+            ready_at=rng.uniform(0, hours * 3600),
+            volume=round(rng.uniform(50, 2000)),
+        )
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parcels", type=int, default=100000)
+    parser.add_argument("--destinations", type=int, default=2000)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--window", type=float, default=4, help="hours")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    cards = RateCards.load(DEFAULT_RATE_CARDS_PATH)
+    zones = ZoneResolver.load()
+    parcels = build_parcels(args.parcels, args.destinations, args.hours, rng)
+    window = args.window * 3600
+
+    result = consolidate(parcels, cards, window, resolve_zone=zones.resolve)
+    elapsed = min(
+        timeit.repeat(
+            lambda: consolidate(parcels, cards, window, resolve_zone=zones.resolve),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+    separate = sum(
+        decision.separate_cost
+        for decision in result.decisions
+        if decision.separate_cost == decision.separate_cost
+    )
+    print(
+        f"{args.parcels} parcels to {args.destinations} destinations"
+        f" over {args.hours:g}h, {args.window:g}h windows"
+    )
+    print(
+        f"consolidate: {elapsed * 1e3:8.1f} ms  ({args.parcels / elapsed:,.0f} parcels/s)"
+    )
+    print(f"shipments:   {len(result.shipments):8d}  (groups: {len(result.decisions)})")
+    print(f"cost:        {separate:10.0f} separately, saved {result.savings:.0f}")
+    for reason, count in Counter(d.reason for d in result.decisions).most_common():
+        print(f"  {count:8d} {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares quoting a multi-piece shipment with one suggest_shipping(...) call
+against one call per piece.
+
+Usage:
+    python benchmarks/bench_shipping_pieces.py [--pieces 500] [--repeat 5]
+"""
+
+import argparse
+import random
+import timeit
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from ShippingSuggestion.ShippingSuggestion import suggest_shipping
+
+TRACKING_NUMBER = "1Z5R89390357567127"
+
+
+def build_pieces(count, rng):
+    return [
+        {
+            "weight": round(rng.uniform(0.5, 30), 1),
+            "dimensions": {
+                "length": rng.randint(4, 30),
+                "width": rng.randint(4, 20),
+                "height": rng.randint(2, 20),
+            },
+        }
+        for _ in range(count)
+    ]
+
+
+def per_piece(pieces):
+    return sum(
+        suggest_shipping(
+            {
+                "tracking_number": TRACKING_NUMBER,
+                "destination": "Chicago",
+                "weight": piece["weight"],
+                "dimensions": piece["dimensions"],
+            }
+        )[1]["suggestion"]["estimated_cost"]
+        for piece in pieces
+    )
+
+
+def multi_piece(pieces):
+    body = {
+        "tracking_number": TRACKING_NUMBER,
+        "destination": "Chicago",
+        "pieces": pieces,
+    }
+    return suggest_shipping(body)[1]["suggestion"]["estimated_cost"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pieces", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pieces = build_pieces(args.pieces, random.Random(42))
+    assert per_piece(pieces) == multi_piece(pieces)
+
+    loop_time = min(
+        timeit.repeat(lambda: per_piece(pieces), number=1, repeat=args.repeat)
+    )
+    batch_time = min(
+        timeit.repeat(lambda: multi_piece(pieces), number=1, repeat=args.repeat)
+    )
+    print(f"{args.pieces} pieces")
+    print(f"one request per piece: {loop_time * 1e3:8.2f} ms")
+    print(
+        f"one multi-piece request: {batch_time * 1e3:6.2f} ms"
+        f"  ({loop_time / batch_time:4.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compares cheapest_quotes(...) over N parcels x M carriers against looping
+suggest_shipping_method(...) over every parcel and carrier.
+
+Usage:
+    python benchmarks/bench_shipping_quotes.py [--parcels 10000] [--carriers 8]
+        [--destinations 50] [--breaks 40] [--repeat 3]
+"""
+
+import argparse
+import random
+import timeit
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from ShippingSuggestion import ShippingSuggestion
+from ShippingSuggestion.quoting import cheapest_quotes
+from ShippingSuggestion.rate_cards import ANY
+from ShippingSuggestion.rate_cards import RateCards
+
+
+class FixedRateCards:
+    """Stands in for the handler's RateCardStore"""
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def current(self):
+        return self.cards
+
+
+def build_rate_cards(carriers, breaks, rng):
+    spec = {"carriers": {}}
+    for carrier in range(carriers):
+        spec["carriers"][f"Carrier {carrier}"] = {
+            "zones": {
+                ANY: [
+                    {
+                        "max_weight": (rate + 1) * 0.5,
+                        "method": f"Method {rate // 10}",
+                        "cost": round(rng.uniform(5, 10) + rate, 2),
+                    }
+                    for rate in range(breaks)
+                ]
+            }
+        }
+    return RateCards.from_spec(spec)
+
+
+def via_loop(weights, destinations, carriers):
+    cheapest = []
+    for weight, destination in zip(weights, destinations):
+        best = None
+        for carrier in carriers:
+            suggestion = ShippingSuggestion.suggest_shipping_method(
+                weight, destination, carrier
+            )
+            if suggestion and (best is None or suggestion["estimated_cost"] < best[2]):
+                best = (carrier, suggestion["method"], suggestion["estimated_cost"])
+        cheapest.append(best)
+    return cheapest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parcels", type=int, default=10000)
+    parser.add_argument("--carriers", type=int, default=8)
+    parser.add_argument("--destinations", type=int, default=50)
+    parser.add_argument("--breaks", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    cards = build_rate_cards(args.carriers, args.breaks, rng)
+    ShippingSuggestion.RATE_CARDS = FixedRateCards(cards)
+    carriers = list(cards.carriers)
+    weights = [
+        round(rng.uniform(0.1, args.breaks * 0.5), 2) for _ in range(args.parcels)
+    ]
+    destinations = [
+        f"City {rng.randrange(args.destinations)}" for _ in range(args.parcels)
+    ]
+
+    looped = via_loop(weights, destinations, carriers)
+    quotes = cheapest_quotes(weights, destinations, cards, carriers)
+    assert [row[2] for row in looped] == list(quotes.costs)
+
+    loop_time = min(
+        timeit.repeat(
+            lambda: via_loop(weights, destinations, carriers),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+    vector_time = min(
+        timeit.repeat(
+            lambda: cheapest_quotes(weights, destinations, cards, carriers),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+    print(
+        f"{args.parcels} parcels x {len(carriers)} carriers, {args.breaks} weight breaks"
+    )
+    print(f"suggest_shipping_method loop: {loop_time * 1e3:8.1f} ms")
+    print(
+        f"cheapest_quotes:              {vector_time * 1e3:8.1f} ms"
+        f"  ({loop_time / vector_time:4.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
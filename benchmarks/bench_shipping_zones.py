@@ -0,0 +1,80 @@
+"""
+Destination-to-zone resolution throughput, with and without the resolution
+cache, on a mix of city names, postal codes, "city, country" strings, full
+street addresses (most over 64 characters) and unknown places.
+
+Usage:
+    python benchmarks/bench_shipping_zones.py [--destinations 200000]
+        [--distinct 5000] [--repeat 3]
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from workload import ROOT_DIR  # noqa: F401 (puts the handlers on sys.path)
+
+from ShippingSuggestion.zones import DEFAULT_ZONES_PATH
+from ShippingSuggestion.zones import ZoneResolver
+
+
+def build_destinations(count, distinct, rng):
+    with open(DEFAULT_ZONES_PATH) as f:
+        countries = json.load(f)["countries"]
+
+    cities = [
+        (city, country["names"][0])
+        for country in countries.values()
+        for city in country.get("cities", {})
+    ]
+    pool = []
+    for _ in range(distinct):
+        roll = rng.random()
+        city, country = rng.choice(cities)
+        if roll < 0.25:
+            pool.append(city)
+        elif roll < 0.5:
+            pool.append(f"{city}, {country}")
+        elif roll < 0.75:
+            pool.append(f"{rng.randrange(100000):05d}")
+        elif roll < 0.9:
+            pool.append(
+                f"Attn: Receiving Dept, {rng.randrange(1, 9999)} Industrial Park"
+                f" Boulevard, Suite {rng.randrange(1, 999)}, {city}, {country}"
+            )
+        else:
+            pool.append(f"Unknown Place {rng.randrange(10000)}")
+
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--destinations", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    destinations = build_destinations(
+        args.destinations, args.distinct, random.Random(42)
+    )
+    resolver = ZoneResolver.load()
+    for name, resolve in (
+        ("uncached", resolver._resolve),
+        ("cached", resolver.resolve),
+    ):
+        elapsed = min(
+            timeit.repeat(
+                lambda: [resolve(destination) for destination in destinations],
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(f"{name:<9} {len(destinations) / elapsed:12,.0f} destinations/s")
+
+    print(f"cache hit rate: {resolver.cache_stats().hit_rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares get_tracking_number against the original linear scan over DEFINITIONS
+on a mix of valid and invalid tracking numbers.
+
+Usage:
+    python benchmarks/bench_tracking_dispatch.py [--numbers 20000] [--repeat 5]
+"""
+
+import argparse
+import timeit
+
+from workload import build_workload
+
+from tracking_numbers import DEFINITIONS
+from tracking_numbers import get_tracking_number
+
+
+def linear_scan(number):
+    for tn_definition in DEFINITIONS:
+        tracking_number = tn_definition.test(number)
+        if tracking_number and tracking_number.valid:
+            return tracking_number
+
+    return None
+
+
+def safe(lookup):
+    def run(number):
+        try:
+            return lookup(number)
+        except ValueError:
+            return None
+
+    return run
+
+
+def bench(lookup, numbers, repeat):
+    lookup = safe(lookup)
+    best = min(
+        timeit.repeat(
+            lambda: [lookup(number) for number in numbers], number=1, repeat=repeat
+        )
+    )
+    return best / len(numbers) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--numbers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for valid_ratio in (0.0, 0.25, 0.5, 1.0):
+        numbers = build_workload(args.numbers, valid_ratio)
+        before = bench(linear_scan, numbers, args.repeat)
+        after = bench(get_tracking_number, numbers, args.repeat)
+        print(
+            f"valid={valid_ratio:>4.0%}  linear: {before:7.2f} us/lookup  "
+            f"indexed: {after:7.2f} us/lookup  speedup: {before / after:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures the cold-start cost of importing tracking_numbers (and of the first
+lookup) in fresh interpreters: the package as of a baseline commit, against
+this tree loading _generated.py and loading the precompiled definitions cache
+shipped with the package.
+
+Usage:
+    python benchmarks/bench_tracking_import.py [--runs 20] [--baseline REF]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+from workload import ROOT_DIR
+
+PACKAGE = "ShippingSuggestion/tracking_numbers"
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from utils.vendored import load_vendored
+tracking_numbers = load_vendored("tracking_numbers", sys.argv[1])
+imported = time.perf_counter()
+tracking_numbers.get_tracking_number("1Z999AA10123456784")
+looked_up = time.perf_counter()
+print(json.dumps([imported - start, looked_up - imported]))
+"""
+
+
+def root_commit():
+    return subprocess.run(
+        ["git", "rev-list", "--max-parents=0", "HEAD"],
+        cwd=ROOT_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()[0]
+
+
+def extract_package(ref, directory):
+    """Extracts tracking_numbers as of ref into directory, returns its path."""
+    archive = os.path.join(directory, "baseline.tar")
+    subprocess.run(
+        ["git", "archive", "--output", archive, ref, PACKAGE],
+        cwd=ROOT_DIR,
+        check=True,
+    )
+    with tarfile.open(archive) as tar:
+        tar.extractall(directory)
+
+    return os.path.join(directory, PACKAGE)
+
+
+def measure(runs, package_dir, cache=None):
+    env = dict(os.environ)
+    env.pop("CODE_GENERATING", None)
+    env.pop("TRACKING_NUMBERS_DEFINITIONS_CACHE", None)
+    if cache:
+        env["TRACKING_NUMBERS_DEFINITIONS_CACHE"] = cache
+
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, package_dir],
+            cwd=ROOT_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        timings.append(json.loads(output))
+
+    import_ms = statistics.median(timing[0] for timing in timings) * 1000
+    lookup_ms = statistics.median(timing[1] for timing in timings) * 1000
+    return import_ms, lookup_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument(
+        "--baseline",
+        help="git ref to compare against (default: the repository's root commit)",
+    )
+    args = parser.parse_args()
+
+    baseline = args.baseline or root_commit()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        variants = (
+            (f"baseline {baseline[:7]}", extract_package(baseline, tmp_dir), None),
+            ("_generated.py", os.path.join(ROOT_DIR, PACKAGE), "off"),
+            ("shipped cache", os.path.join(ROOT_DIR, PACKAGE), None),
+        )
+        for name, package_dir, cache in variants:
+            measure(1, package_dir, cache)  # writes the bytecode
+            import_ms, lookup_ms = measure(args.runs, package_dir, cache)
+            print(
+                f"{name:<16} import: {import_ms:6.2f} ms  "
+                f"first lookup: {lookup_ms:6.2f} ms  (median of {args.runs})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Memory held by get_tracking_number(...) results, measured with tracemalloc over
+a large run of valid numbers (the lookup cache stays disabled, so every result
+is a separate object, as in a bulk job that keeps its results).
+
+Usage:
+    python benchmarks/bench_tracking_memory.py [--numbers 1000000]
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from workload import ROOT_DIR  # noqa: F401 (puts tracking_numbers on sys.path)
+
+from tracking_numbers import DEFINITIONS
+from tracking_numbers import get_tracking_number
+from tracking_numbers.helpers.corpus import VALID
+from tracking_numbers.helpers.corpus import generate_corpus
+
+
+def deep_size(tracking_number):
+    """Bytes of the result and the objects only it references"""
+    size = sys.getsizeof(tracking_number)
+    attributes = getattr(tracking_number, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+
+    for name in ("serial_number", "validation_errors"):
+        value = getattr(tracking_number, name)
+        if value:
+            size += sys.getsizeof(value)
+
+    if attributes is not None and attributes.get("tracking_url"):
+        size += sys.getsizeof(attributes["tracking_url"])
+
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--numbers", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # A few thousand distinct numbers, repeated: the input strings themselves
+    # are shared, so only the results are measured
+    corpus = generate_corpus(5000, valid=1.0, near_miss=0.0, invalid=0.0, seed=0)
+    numbers = [entry.number for entry in corpus if entry.kind == VALID]
+    for number in numbers:
+        get_tracking_number(number)
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    results = [
+        get_tracking_number(numbers[row % len(numbers)]) for row in range(args.numbers)
+    ]
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    list_overhead = sys.getsizeof(results)
+    held = after - before - list_overhead
+    couriers = {id(result.courier) for result in results}
+    products = {id(result.product) for result in results}
+    print(f"results:              {len(results):,}")
+    print(f"held by results:      {held / 2**20:8.1f} MiB")
+    print(f"bytes per result:     {held / len(results):8.1f}")
+    print(f"peak during the run:  {(peak - before) / 2**20:8.1f} MiB")
+    sample = results[: len(numbers)]
+    average = sum(deep_size(result) for result in sample) / len(sample)
+    print(f"deep size (average):  {average:8.1f} bytes")
+    print(f"distinct couriers:    {len(couriers)} (definitions: {len(DEFINITIONS)})")
+    print(f"distinct products:    {len(products)}")
+
+
+if __name__ == "__main__":
+    main()
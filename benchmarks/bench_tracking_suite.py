@@ -0,0 +1,165 @@
+"""
+Per-courier throughput and latency of the tracking-number lookups on a synthetic
+corpus (valid numbers for every definition, near misses, invalid and noise).
+
+Reports lookups/s and p50/p99 latency per courier of the generating definition
+("-" for invalid and noise inputs). Save the results as a JSON baseline, and
+compare a later run against it to spot regressions:
+
+Usage:
+    python benchmarks/bench_tracking_suite.py [--numbers 20000] [--repeat 3]
+        [--valid 0.5] [--near-miss 0.2] [--invalid 0.2] [--seed 0]
+        [--save benchmarks/baselines/tracking_suite.json]
+        [--compare benchmarks/baselines/tracking_suite.json] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from collections import defaultdict
+
+from workload import ROOT_DIR  # noqa: F401 (puts tracking_numbers on sys.path)
+
+from tracking_numbers import get_tracking_number
+from tracking_numbers import is_valid_tracking_number
+from tracking_numbers.helpers.corpus import generate_corpus
+
+LOOKUPS = {
+    "get_tracking_number": get_tracking_number,
+    "is_valid_tracking_number": is_valid_tracking_number,
+}
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def bench(lookup, groups, repeat):
+    """lookups/s and latency percentiles (us) per group, best of repeat runs"""
+    # Warm up: materialize lazily loaded definitions before timing anything
+    for number in groups["all"]:
+        try:
+            lookup(number)
+        except ValueError:
+            pass
+
+    results = {}
+    for group, numbers in sorted(groups.items()):
+        best = None
+        for _ in range(repeat):
+            timings = []
+            for number in numbers:
+                started = time.perf_counter_ns()
+                try:
+                    lookup(number)
+                except ValueError:
+                    pass
+                timings.append(time.perf_counter_ns() - started)
+
+            timings.sort()
+            total = sum(timings)
+            if best is None or total < best[0]:
+                best = (total, timings)
+
+        total, timings = best
+        results[group] = {
+            "numbers": len(numbers),
+            "lookups_per_s": round(len(numbers) / (total / 1e9)),
+            "p50_us": round(percentile(timings, 0.50) / 1e3, 3),
+            "p99_us": round(percentile(timings, 0.99) / 1e3, 3),
+        }
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every group whose throughput dropped by more than
+    tolerance (a fraction) against the baseline
+    """
+    regressions = []
+    for name, groups in results.items():
+        for group, stats in groups.items():
+            before = baseline.get(name, {}).get(group)
+            if before is None:
+                continue
+
+            ratio = stats["lookups_per_s"] / before["lookups_per_s"]
+            if ratio < 1 - tolerance:
+                regressions.append(
+                    f"{name} [{group}]: {before['lookups_per_s']:,} -> "
+                    f"{stats['lookups_per_s']:,} lookups/s ({ratio:.2f}x)"
+                )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--numbers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--valid", type=float, default=0.5)
+    parser.add_argument("--near-miss", type=float, default=0.2)
+    parser.add_argument("--invalid", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(
+        args.numbers,
+        valid=args.valid,
+        near_miss=args.near_miss,
+        invalid=args.invalid,
+        seed=args.seed,
+    )
+    groups = defaultdict(list)
+    for entry in corpus:
+        courier = entry.definition.courier.code if entry.definition else "-"
+        groups[courier].append(entry.number)
+        groups["all"].append(entry.number)
+
+    results = {}
+    for name, lookup in LOOKUPS.items():
+        results[name] = bench(lookup, groups, args.repeat)
+        print(name)
+        for group, stats in results[name].items():
+            print(
+                f"  {group:<10} {stats['numbers']:>7} numbers "
+                f"{stats['lookups_per_s']:>10,} lookups/s "
+                f"p50 {stats['p50_us']:7.2f} us  p99 {stats['p99_us']:7.2f} us"
+            )
+
+    if args.save:
+        report = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "corpus": {
+                "numbers": args.numbers,
+                "valid": args.valid,
+                "near_miss": args.near_miss,
+                "invalid": args.invalid,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares is_valid_tracking_number against get_tracking_number(...) is not None
+on a reject-heavy mix: mostly garbage, some near misses (valid numbers with one
+digit changed) and a few valid numbers.
+
+Usage:
+    python benchmarks/bench_tracking_validity.py [--numbers 20000] [--repeat 5]
+"""
+
+import argparse
+import timeit
+
+from workload import build_workload
+
+from tracking_numbers import get_tracking_number
+from tracking_numbers import identify_tracking_number
+from tracking_numbers import is_valid_tracking_number
+
+
+def via_lookup(number):
+    try:
+        return get_tracking_number(number) is not None
+    except ValueError:
+        return False
+
+
+def via_fast_path(number):
+    try:
+        return is_valid_tracking_number(number)
+    except ValueError:
+        return False
+
+
+def via_identify(number):
+    try:
+        return identify_tracking_number(number) is not None
+    except ValueError:
+        return False
+
+
+def bench(check, numbers, repeat):
+    best = min(
+        timeit.repeat(
+            lambda: [check(number) for number in numbers], number=1, repeat=repeat
+        )
+    )
+    return best / len(numbers) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--numbers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    numbers = build_workload(args.numbers, valid_ratio=0.1, near_miss_ratio=0.2)
+    baseline = bench(via_lookup, numbers, args.repeat)
+    print(f"get_tracking_number(...) is not None: {baseline:6.2f} us/number")
+    for name, check in (
+        ("is_valid_tracking_number(...)", via_fast_path),
+        ("identify_tracking_number(...)", via_identify),
+    ):
+        elapsed = bench(check, numbers, args.repeat)
+        print(f"{name:<37} {elapsed:6.2f} us/number  ({baseline / elapsed:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
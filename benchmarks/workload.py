@@ -0,0 +1,40 @@
+"""Shared setup and tracking-number workloads for the benchmark scripts."""
+
+import os
+import random
+import string
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from utils.vendored import load_tracking_numbers  # noqa: E402
+
+load_tracking_numbers()
+
+from tracking_numbers.helpers.corpus import VALID_NUMBERS  # noqa: E402
+
+
+def near_miss(number, rng):
+    """A valid number with one digit changed, so it still matches the regex"""
+    positions = [index for index, ch in enumerate(number) if ch.isdigit()]
+    index = rng.choice(positions)
+    digit = str((int(number[index]) + rng.randint(1, 9)) % 10)
+    return number[:index] + digit + number[index + 1 :]
+
+
+def build_workload(count, valid_ratio, near_miss_ratio=0.0, seed=42):
+    rng = random.Random(seed)
+    alphabet = string.digits * 3 + string.ascii_uppercase
+    numbers = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < valid_ratio:
+            numbers.append(rng.choice(VALID_NUMBERS))
+        elif roll < valid_ratio + near_miss_ratio:
+            numbers.append(near_miss(rng.choice(VALID_NUMBERS), rng))
+        else:
+            length = rng.randint(6, 34)
+            numbers.append("".join(rng.choice(alphabet) for _ in range(length)))
+
+    return numbers
@@ -0,0 +1,3 @@
+from utils.vendored import load_tracking_numbers
+
+load_tracking_numbers()
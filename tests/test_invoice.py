@@ -1,5 +1,14 @@
 import json
+import re
+import threading
+import zlib
+
+import pytest
+from botocore.exceptions import ClientError
+
 from api import api
+from InvoiceGenerator.batch import BatchStats, generate_invoices
+from utils.aws import AWSRegistry
 
 def test_generate_invoice_success():
     client = api.test_client()
@@ -21,3 +30,460 @@ def test_generate_invoice_success():
     data = response.get_json()
     assert "invoice_path" in data  # or check a message string
 
+
+
+def test_render_invoice_in_memory(tmp_path, monkeypatch):
+    from InvoiceGenerator import InvoiceGenerator
+
+    pdf_bytes = InvoiceGenerator.render_invoice(
+        business_name="CloudSoft",
+        invoice_number="inv-1",
+        order_id="order-1",
+        ordered_at="2026-10-18T12:00:00Z",
+        customer_name="Stefaan",
+        customer_address="Jamaica",
+        item_bought="Serverless Mastery",
+        item_price=120,
+        item_quantity=2,
+    )
+    assert isinstance(pdf_bytes, bytes)
+    assert pdf_bytes.startswith(b"%PDF") and pdf_bytes.rstrip().endswith(b"%%EOF")
+
+    monkeypatch.setattr(InvoiceGenerator, "DEBUG_DIR", str(tmp_path))
+    path = InvoiceGenerator.save_debug_copy(pdf_bytes, "invoice_order-1.pdf")
+    with open(path, "rb") as f:
+        assert f.read() == pdf_bytes
+
+
+@pytest.mark.parametrize("business_name, customer_name", [
+    ("CloudSoft", "Stefaan"),
+    ("Smith (& Sons) \\ Café", ""),
+])
+def test_compiled_template_renders_what_fpdf_draws(business_name, customer_name):
+    from InvoiceGenerator import template
+    from InvoiceGenerator.InvoiceGenerator import INVOICE_LINES, INVOICE_TEMPLATE
+
+    values = {
+        "business_name": business_name,
+        "invoice_number": "inv-1",
+        "order_id": "order-1",
+        "ordered_at": "2026-10-18T12:00:00Z",
+        "customer_name": customer_name,
+        "customer_address": "Jamaica",
+        "item_bought": "Serverless Mastery",
+        "item_price": 120,
+        "item_quantity": 2,
+        "total": 240,
+    }
+    right_aligned = INVOICE_LINES + (("{customer_name}", "R"),)
+    for compiled, lines in ((INVOICE_TEMPLATE, INVOICE_LINES), (template.compile_template(right_aligned), right_aligned)):
+        rendered = compiled.render(values)
+        drawn = template.draw(lines, values)
+        # Only the creation timestamps may differ
+        assert re.sub(rb"D:\d{14}", b"", rendered) == re.sub(rb"D:\d{14}", b"", drawn)
+
+
+def test_compiled_template_is_one_page():
+    from InvoiceGenerator import template
+
+    with pytest.raises(ValueError):
+        template.compile_template([("Line {number}", "")] * 30)
+
+
+class StubSession:
+    """Stands in for a boto3 Session, recording what is created and stored"""
+
+    def __init__(self):
+        self.created = []
+        self.objects = {}
+        self.items = []
+
+    def client(self, service, config=None):
+        self.created.append(("client", service))
+        return StubS3Client(self) if service == "s3" else StubStepFunctions()
+
+    def resource(self, service, config=None):
+        self.created.append(("resource", service))
+        return StubS3(self) if service == "s3" else StubDynamoDB(self)
+
+
+class StubStepFunctions:
+    def start_execution(self, stateMachineArn, input):
+        return {"executionArn": f"{stateMachineArn}:execution"}
+
+
+class StubS3Client:
+    def __init__(self, session):
+        self.session = session
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        # Orders are saved before their invoices are uploaded
+        unlucky = [item["order_id"] for item, _ in self.session.items if item["customer_name"] == "Unlucky"]
+        if any(order_id in Key for order_id in unlucky):
+            raise ConnectionError("connection reset")
+        self.session.objects[Key] = Body
+
+
+class StubS3:
+    def __init__(self, session):
+        self.session = session
+
+    def Bucket(self, name):
+        return StubBucket(self.session, name)
+
+
+class StubBucket:
+    def __init__(self, session, name):
+        self.session = session
+        self.name = name
+
+    def put_object(self, Key, Body, ContentType):
+        # boto3 reads file bodies during the call
+        self.session.objects[Key] = Body.read() if hasattr(Body, "read") else Body
+
+
+class StubDynamoDB:
+    def __init__(self, session):
+        self.session = session
+
+    def Table(self, name):
+        return StubTable(self.session)
+
+
+class StubTable:
+    def __init__(self, session):
+        self.session = session
+
+    def put_item(self, Item, **kwargs):
+        written = any(item["order_id"] == Item["order_id"] for item, _ in self.session.items)
+        if Item.get("order_id") == "taken" or (written and "ConditionExpression" in kwargs):
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        if Item.get("order_id") == "throttled" or Item.get("customer_name") == "Unwritable":
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "PutItem")
+        self.session.items.append((Item, kwargs))
+        return {}
+
+    def batch_writer(self):
+        return StubBatchWriter(self.session)
+
+
+class StubBatchWriter:
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def put_item(self, Item):
+        # The batch fails part of the way, with the rows before it written
+        if Item.get("customer_name") == "Unwritable":
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "BatchWriteItem")
+        self.session.items.append((Item, {}))
+
+
+def test_aws_registry_reuses_clients_and_resources():
+    session = StubSession()
+    registry = AWSRegistry(lambda: session)
+    assert registry.client("stepfunctions") is registry.client("stepfunctions")
+    assert registry.resource("s3") is registry.resource("s3")
+    assert registry.table("invoices") is registry.table("invoices")
+
+    # Resources aren't thread-safe, so other threads get their own
+    other = []
+    thread = threading.Thread(target=lambda: other.append(registry.resource("s3")))
+    thread.start()
+    thread.join()
+    assert other[0] is not registry.resource("s3")
+    assert session.created == [("client", "stepfunctions"), ("resource", "s3"), ("resource", "dynamodb"), ("resource", "s3")]
+
+    registry.reset()
+    registry.resource("s3")
+    assert session.created[-1] == ("resource", "s3")
+
+
+def test_generate_invoice_with_stubbed_aws(monkeypatch):
+    from InvoiceGenerator import InvoiceGenerator
+
+    session = StubSession()
+    monkeypatch.setattr(InvoiceGenerator, "AWS", AWSRegistry(lambda: session))
+    monkeypatch.setenv("INVOICE_BUCKET_NAME", "invoices")
+    monkeypatch.setenv("DYNAMODB_TABLE_NAME", "orders")
+
+    client = api.test_client()
+    payload = {"customer_name": "Stefaan", "item_purchased": "Serverless Mastery", "item_price": 120, "item_quantity": 2}
+    for _ in range(2):
+        response = client.post("/invoiceGenerator", json=payload)
+        assert response.status_code == 200
+
+    assert len(session.objects) == 2
+    assert all(body.startswith(b"%PDF") for body in session.objects.values())
+    # Created once, reused by the warm invocation
+    assert session.created.count(("resource", "s3")) == 1
+    # Written once each, conditionally, and never read back
+    assert [kwargs for _, kwargs in session.items] == [{"ConditionExpression": "attribute_not_exists(order_id)"}] * 2
+
+
+def test_generate_invoice_retried_with_the_callers_key_is_one_order(monkeypatch):
+    from InvoiceGenerator import InvoiceGenerator
+
+    session = StubSession()
+    monkeypatch.setattr(InvoiceGenerator, "AWS", AWSRegistry(lambda: session))
+    monkeypatch.setenv("INVOICE_BUCKET_NAME", "invoices")
+    monkeypatch.setenv("DYNAMODB_TABLE_NAME", "orders")
+
+    client = api.test_client()
+    payload = {"customer_name": "Stefaan", "item_price": 120, "order_id": "order-1", "ordered_at": "2026-10-18T12:00:00Z"}
+    paths = {client.post("/invoiceGenerator", json=payload).get_json()["invoice_path"] for _ in range(2)}
+
+    assert paths == {"invoices/invoice_order-1_2026-10-18T12:00:00Z.pdf"}
+    assert len(session.items) == 1
+    del payload["ordered_at"]
+    assert client.post("/invoiceGenerator", json=payload).status_code == 400
+
+
+def test_save_order_counts_a_retried_write_as_written(monkeypatch):
+    from InvoiceGenerator import InvoiceGenerator
+
+    session = StubSession()
+    monkeypatch.setattr(InvoiceGenerator, "AWS", AWSRegistry(lambda: session))
+    InvoiceGenerator.save_order("orders", {"order_id": "taken", "OrderedAt": "2026-10-18T12:00:00Z"})
+    with pytest.raises(ClientError):
+        InvoiceGenerator.save_order("orders", {"order_id": "throttled", "OrderedAt": "2026-10-18T12:00:00Z"})
+
+
+def test_start_workflow_with_stubbed_aws(monkeypatch):
+    from wf_trigger import startworkflow
+
+    monkeypatch.setattr(startworkflow, "AWS", AWSRegistry(StubSession))
+    monkeypatch.setenv("STATE_MACHINE_ARN", "arn:aws:states:us-east-1:123456789012:stateMachine:orders")
+    result = startworkflow.lambda_handler({"order_id": "order-1"}, None)
+    assert result["statusCode"] == 200
+    assert json.loads(result["body"])["executionArn"].endswith(":execution")
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_generate_invoices_in_batches(processes):
+    session = StubSession()
+    orders = [
+        (1, {"customer_name": "Ada", "item_price": 10, "item_quantity": 3}),
+        (2, None),
+        (3, {"customer_name": "Unlucky", "item_price": 5}),
+        (4, {"customer_name": "Grace", "item_price": "free"}),
+    ] + [(line, {"customer_name": f"Customer {line}", "item_price": 1}) for line in range(5, 25)]
+    stats = BatchStats()
+    results = list(generate_invoices(orders, "invoices", "orders", processes=processes, chunk_size=7, aws=AWSRegistry(lambda: session), stats=stats))
+
+    assert [result["line"] for result in results] == list(range(1, 25))
+    assert results[0]["invoice_path"].startswith("invoices/invoice_" + results[0]["order_id"])
+    assert results[1] == {"line": 2, "error": "Invalid input"}
+    assert results[2]["error"] == "Failed to upload invoice to S3"
+    assert results[3]["error"] == "Failed to render the invoice"
+    assert (stats.invoices, stats.failed) == (21, 3)
+    # Every valid order whose invoice rendered has its row, written through batch_writer
+    assert len(session.items) == 22
+    assert results[3]["order_id"] not in {item["order_id"] for item, _ in session.items}
+    assert set(session.objects) == {result["invoice_path"] for result in results if "invoice_path" in result}
+
+
+def test_generate_invoices_reports_rows_of_a_failed_batch_write_one_by_one():
+    session = StubSession()
+    orders = [(line, {"customer_name": name, "item_price": 1}) for line, name in enumerate(["Ada", "Grace", "Unwritable", "Linus"], 1)]
+    results = list(generate_invoices(orders, "invoices", "orders", processes=0, aws=AWSRegistry(lambda: session)))
+
+    assert [("invoice_path" in result, result.get("error")) for result in results] == [
+        (True, None),
+        (True, None),
+        (False, "Failed to save the order"),
+        (True, None),
+    ]
+    # The rows written before the batch failed aren't written twice
+    assert sorted(item["customer_name"] for item, _ in session.items) == ["Ada", "Grace", "Linus"]
+
+
+def test_render_pool_is_started_once_per_process():
+    from InvoiceGenerator import batch
+
+    assert batch.render_pool(2) is batch.render_pool(2)
+    assert batch.render_pool(2)._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_invoice_batch_route_streams_ndjson(monkeypatch):
+    from InvoiceGenerator import batch
+
+    session = StubSession()
+    monkeypatch.setattr(batch, "AWS", AWSRegistry(lambda: session))
+    monkeypatch.setenv("INVOICE_BUCKET_NAME", "invoices")
+    monkeypatch.setenv("DYNAMODB_TABLE_NAME", "orders")
+    monkeypatch.setenv("INVOICE_RENDER_PROCESSES", "0")
+
+    body = "\n".join(json.dumps({"customer_name": f"Customer {n}", "item_price": 2}) for n in range(3)) + "\nnot json\n"
+    response = api.test_client().post("/invoiceGenerator/batch", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line.get("line") for line in lines[:4]] == [1, 2, 3, 4]
+    assert lines[3] == {"line": 4, "error": "Invalid input"}
+    assert lines[4]["summary"]["invoices"] == 3 and lines[4]["summary"]["failed"] == 1
+    assert len(session.objects) == 3
+
+
+def test_invoice_jobs_refuse_work_past_the_queue_bound():
+    import queue
+
+    from InvoiceGenerator.jobs import InvoiceJobs
+
+    started, release = threading.Event(), threading.Event()
+
+    def generate(body):
+        started.set()
+        release.wait(5)
+        if body.get("fail"):
+            return 500, {"error": "Failed to upload invoice to S3"}
+        return 200, {"invoice_path": f"invoices/{body['order']}.pdf"}
+
+    jobs = InvoiceJobs(workers=1, max_queued=1, generate=generate)
+    first = jobs.submit({"order": 1})
+    assert first["status"] == "queued"
+    started.wait(5)
+    second = jobs.submit({"order": 2, "fail": True})
+    with pytest.raises(queue.Full):
+        jobs.submit({"order": 3})
+    assert jobs.status(first["job_id"])["status"] == "running"
+    assert jobs.stats()["queued"] == 1
+
+    release.set()
+    jobs.join()
+    assert jobs.status(first["job_id"]) == {"job_id": first["job_id"], "status": "done", "invoice_path": "invoices/1.pdf"}
+    assert jobs.status(second["job_id"])["status"] == "failed"
+    assert jobs.status("no-such-job") is None
+    stats = jobs.stats()
+    assert (stats["queued"], stats["running"], stats["completed"], stats["failed"], stats["rejected"]) == (0, 0, 1, 1, 1)
+    assert stats["latency_ms"]["max"] >= stats["wait_ms"]["max"]
+
+
+def test_invoice_job_routes(monkeypatch):
+    from InvoiceGenerator import InvoiceGenerator
+    from InvoiceGenerator.jobs import InvoiceJobs
+
+    session = StubSession()
+    jobs = InvoiceJobs(workers=2)
+    monkeypatch.setattr(InvoiceGenerator, "AWS", AWSRegistry(lambda: session))
+    monkeypatch.setattr("api.INVOICE_JOBS", jobs)
+    monkeypatch.setenv("INVOICE_BUCKET_NAME", "invoices")
+    monkeypatch.setenv("DYNAMODB_TABLE_NAME", "orders")
+
+    client = api.test_client()
+    payload = {"customer_name": "Stefaan", "item_purchased": "Serverless Mastery", "item_price": 120, "item_quantity": 2}
+    queued = client.post("/invoiceGenerator/jobs", json=payload)
+    assert queued.status_code == 202
+    preferred = client.post("/invoiceGenerator", json=payload, headers={"Prefer": "respond-async"})
+    assert preferred.status_code == 202
+    assert client.post("/invoiceGenerator/jobs", json={}).status_code == 400
+
+    jobs.join()
+    for accepted in (queued, preferred):
+        status = client.get(accepted.headers["Location"])
+        assert status.status_code == 200
+        assert status.get_json()["status"] == "done"
+        assert status.get_json()["invoice_path"] in session.objects
+    assert client.get("/invoiceGenerator/jobs/no-such-job").status_code == 404
+    assert client.get("/invoiceGenerator/jobs").get_json()["completed"] == 2
+
+
+class StubStatusTable:
+    """Stands in for an AWSRegistry and the job status table it serves"""
+
+    def __init__(self, fail=False):
+        self.items = {}
+        self.fail = fail
+
+    def table(self, name):
+        return self
+
+    def put_item(self, Item):
+        if self.fail:
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "PutItem")
+        self.items[Item["job_id"]] = Item
+
+    def get_item(self, Key):
+        item = self.items.get(Key["job_id"])
+        return {"Item": item} if item is not None else {}
+
+
+def test_invoice_job_statuses_are_shared_through_the_table(monkeypatch):
+    from InvoiceGenerator.jobs import InvoiceJobs, JobStatusTable
+
+    table = StubStatusTable()
+    statuses = JobStatusTable("invoice-jobs", aws=table)
+    accepting = InvoiceJobs(workers=1, generate=lambda body: (200, {"invoice_path": f"invoices/{body['order']}.pdf"}), statuses=statuses)
+    # Another gunicorn worker, where the poll lands
+    polled = InvoiceJobs(workers=1, statuses=statuses)
+
+    job = accepting.submit({"order": 1})
+    accepting.join()
+    assert polled.status(job["job_id"]) == {"job_id": job["job_id"], "status": "done", "invoice_path": "invoices/1.pdf"}
+    assert polled.status("no-such-job") is None
+    assert table.items[job["job_id"]]["expires_at"] > 0
+
+    # A job whose status can't be shared is refused
+    monkeypatch.setattr("api.INVOICE_JOBS", InvoiceJobs(workers=1, statuses=JobStatusTable("invoice-jobs", aws=StubStatusTable(fail=True))))
+    response = api.test_client().post("/invoiceGenerator/jobs", json={"customer_name": "Stefaan", "item_price": 1})
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Failed to queue the invoice"}
+
+
+def pdf_pages(pdf):
+    """The decompressed page content streams, after checking every xref offset"""
+    xref_at = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    assert pdf[xref_at:].startswith(b"xref")
+    offsets = [int(offset) for offset in re.findall(rb"(\d{10}) 00000 n ", pdf)]
+    for number, offset in enumerate(offsets, 1):
+        assert pdf[offset:].startswith(b"%d 0 obj" % number)
+    return [zlib.decompress(stream) for stream in re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)]
+
+
+def test_line_items_are_paginated_with_running_subtotals():
+    from InvoiceGenerator.line_items import iter_invoice_pdf
+
+    fields = {"business_name": "CloudSoft", "invoice_number": "inv-1", "order_id": "order-1", "ordered_at": "2026-10-18T12:00:00Z", "customer_name": "Ada", "customer_address": "Jamaica"}
+    items = ({"item_purchased": f"Widget (size {n}) " + "x" * 200 * (n == 5), "item_price": 1.25, "item_quantity": 2} for n in range(100))
+    pages = pdf_pages(b"".join(iter_invoice_pdf(fields, items)))
+
+    assert len(pages) == 3
+    assert all(b"(Invoice Number: inv-1)" in page and b"(Page %d)" % number in page for number, page in enumerate(pages, 1))
+    assert b"Customer Name: Ada" in pages[0] and b"Customer Name" not in pages[1]
+    assert sum(page.count(b"Widget") for page in pages) == 100
+    assert b"(Widget \\(size 5\\) xxx" in pages[0] and b"x...)" in pages[0]
+    carried = re.search(rb"\(Subtotal carried forward: \$([\d.]+)\)", pages[0]).group(1)
+    assert b"(Carried forward)" in pages[1] and b"($%s)" % carried in pages[1]
+    assert b"(Total Amount: $250.00)" in pages[2]
+
+    with pytest.raises(ValueError, match="Invalid line item 2"):
+        list(iter_invoice_pdf(fields, [{"item_price": 1}, {"item_price": "free"}]))
+
+
+def test_line_item_invoice_routes(monkeypatch):
+    from InvoiceGenerator import InvoiceGenerator
+
+    session = StubSession()
+    monkeypatch.setattr(InvoiceGenerator, "AWS", AWSRegistry(lambda: session))
+    monkeypatch.setenv("INVOICE_BUCKET_NAME", "invoices")
+    monkeypatch.setenv("DYNAMODB_TABLE_NAME", "orders")
+    client = api.test_client()
+
+    items = [{"item_purchased": f"Part {n}", "item_price": 0.5, "item_quantity": 4} for n in range(60)]
+    response = client.post("/invoiceGenerator", json={"customer_name": "Ada", "items": items})
+    assert response.status_code == 200
+    assert b"(Total Amount: $120.00)" in pdf_pages(session.objects[response.get_json()["invoice_path"]])[-1]
+
+    lines = [json.dumps({"customer_name": "Grace"})] + [json.dumps(item) for item in items[:3]]
+    response = client.post("/invoiceGenerator/lines", data="\n".join(lines), content_type="application/x-ndjson")
+    assert response.status_code == 200
+    assert b"(Total Amount: $6.00)" in pdf_pages(session.objects[response.get_json()["invoice_path"]])[-1]
+
+    # An invalid line halfway through fails the invoice before the order is saved
+    response = client.post("/invoiceGenerator/lines", data="\n".join(lines + ["not json"]), content_type="application/x-ndjson")
+    assert response.status_code == 400 and response.get_json() == {"error": "Invalid line item 4"}
+    assert len(session.items) == 2 and len(session.objects) == 2
@@ -1,5 +1,24 @@
+import datetime
 import json
+import math
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
 from api import api  # assuming api.py is in the root
+from ShippingSuggestion import ShippingSuggestion
+from ShippingSuggestion.ShippingSuggestion import suggest_shipping_method
+from ShippingSuggestion.consolidation import CONSOLIDATED, NOT_CHEAPER, SINGLE_PARCEL, Parcel, consolidate
+from ShippingSuggestion.live_rates import LIVE, RATE_CARD, LiveRates
+from ShippingSuggestion.quoting import billable_weights, cheapest_quotes, quote_pieces
+from ShippingSuggestion.rate_cards import RateCards, RateCardStore
+from ShippingSuggestion.transit_times import TransitTimes
+from ShippingSuggestion.zones import ZoneResolver
+from utils.vendored import load_easypost
 
 def test_shipping_suggestion_success():
     client = api.test_client()
@@ -33,3 +52,441 @@ def test_shipping_missing_field():
     )
     assert response.status_code == 400
     assert "error" in response.get_json()
+
+
+def legacy_suggestion(weight, carrier):
+    # The hardcoded pricing the default rate cards replaced
+    if carrier in ["UPS", "FedEx"]:
+        method, cost = "Express Shipping", 30
+    elif carrier == "USPS":
+        method, cost = "Standard Postal Delivery", 15
+    else:
+        method, cost = "Generic Carrier Shipping", 20
+    if weight > 10:
+        method, cost = "Freight", cost + 20
+    return {"method": method, "estimated_cost": cost}
+
+
+def test_default_rate_cards_match_legacy_pricing():
+    for carrier in ["UPS", "FedEx", "USPS", "DHL", "Unknown"]:
+        for weight in [0.1, 1, 9.99, 10, 10.01, 70, 1000]:
+            assert suggest_shipping_method(weight, "Kingston", carrier) == legacy_suggestion(weight, carrier)
+
+
+def test_rate_cards_reload_when_the_file_changes(tmp_path):
+    path = tmp_path / "rate_cards.json"
+    card = {"carriers": {"UPS": {"zones": {"*": [
+        {"max_weight": 1, "method": "Letter", "cost": 5},
+        {"max_weight": 5, "method": "Parcel", "cost": 9.5},
+    ]}}}}
+    path.write_text(json.dumps(card))
+    store = RateCardStore(str(path), reload_interval=0)
+    assert store.current().quote("UPS", "2", 1) == ("Letter", 5)
+    assert store.current().quote("UPS", "2", 4.2) == ("Parcel", 9.5)
+    assert store.current().quote("UPS", "2", 5.1) is None
+    assert store.current().quote("DHL", "2", 1) is None
+
+    card["carriers"]["UPS"]["zones"]["*"][1]["cost"] = 11
+    path.write_text(json.dumps(card))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert store.current().quote("UPS", "2", 4.2) == ("Parcel", 11)
+
+    # A broken file keeps the last good cards
+    path.write_text("{")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2))
+    assert store.current().quote("UPS", "2", 4.2) == ("Parcel", 11)
+
+    card["carriers"]["UPS"]["zones"]["*"].append({"max_weight": 2, "method": "Parcel", "cost": 1})
+    with pytest.raises(ValueError):
+        RateCards.from_spec(card)
+
+
+def test_cheapest_quotes_match_per_parcel_quotes():
+    rng = random.Random(3)
+    spec = {"carriers": {}}
+    for carrier in ["UPS", "FedEx", "USPS"]:
+        zones = {}
+        for zone in ["*", "1", "2"]:
+            zones[zone] = [
+                {"max_weight": limit, "method": f"{carrier} {limit}", "cost": rng.randint(5, 60)}
+                for limit in [1, 2, 5, 10, 30]
+            ]
+        spec["carriers"][carrier] = {"zones": zones}
+    cards = RateCards.from_spec(spec)
+
+    destinations = [rng.choice(["1", "2", "3"]) for _ in range(500)]
+    weights = [rng.uniform(0, 35) for _ in destinations]
+    quotes = cheapest_quotes(weights, destinations, cards, resolve_zone=lambda destination: destination)
+    for row, (weight, destination) in enumerate(zip(weights, destinations)):
+        options = [
+            (quote.cost, carrier, quote.method)
+            for carrier in cards.carriers
+            for quote in [cards.quote(carrier, destination, weight)]
+            if quote is not None
+        ]
+        if not options:
+            assert quotes.carriers[row] is None and math.isnan(quotes.costs[row])
+            continue
+        cost, carrier, method = min(options, key=lambda option: option[0])
+        assert (quotes.costs[row], quotes.carriers[row], quotes.methods[row]) == (cost, carrier, method)
+
+
+def test_shipping_suggestion_batch_streams_ndjson():
+    client = api.test_client()
+    lines = [
+        json.dumps({"tracking_number": "1Z12345E0205271688", "weight": 8.5, "destination": "Kingston"}),
+        "",
+        "{not json",
+        json.dumps({"tracking_number": "1Z12345E0205271688", "destination": "Kingston"}),
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"tracking_number": "1Z12345E0205271688", "weight": 12, "destination": "x" * 70000}),
+        json.dumps({"tracking_number": "TRACK123XYZ", "weight": 1, "destination": "Kingston"}),
+        # A letter for a check digit is an invalid number, not the end of the stream
+        json.dumps({"tracking_number": "1Z09KP92PZE71GF92G", "weight": 1, "destination": "Kingston"}),
+        json.dumps({"tracking_number": "1Z5R89390357567127", "weight": 2, "destination": "Kingston"}),
+    ]
+    response = client.post(
+        "/ShippingSuggestion/batch",
+        data="\n".join(lines) + "\n",
+        content_type="application/x-ndjson"
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    single = client.post("/ShippingSuggestion", data=lines[0], content_type="application/json")
+    assert results[0] == {"line": 1, **single.get_json()}
+    assert results[1] == {"line": 3, "error": "Invalid input"}
+    assert results[2] == {"line": 4, "error": "Invalid or missing weight"}
+    assert results[3] == {"line": 5, "error": "Invalid input"}
+    assert results[4] == {"line": 6, "error": "Invalid input"}
+    assert results[5]["line"] == 7 and results[5]["carrier"] == "Unknown"
+    assert [result["line"] for result in results[6:]] == [8, 9]
+    assert (results[6]["carrier"], results[7]["carrier"]) == ("Unknown", "UPS")
+
+
+def test_destinations_resolve_to_zones():
+    resolver = ZoneResolver.load()
+    assert resolver.resolve("Kingston") == "caribbean"
+    assert resolver.resolve("Kingston, Ontario, Canada") == "canada"
+    assert resolver.resolve("  new-york 10001 ") == "northeast"
+    # Longest postal prefix wins
+    assert resolver.resolve("96813") == "pacific"
+    assert resolver.resolve("90001") == "west"
+    # A state abbreviation isn't a country code
+    assert resolver.resolve("Los Angeles, CA 90001") == "west"
+    assert resolver.resolve("10115 Berlin, Germany") == "europe"
+    assert resolver.resolve("Sydney") == "*"
+    # Street and unit numbers aren't ZIP codes
+    assert resolver.resolve("Toronto M5V 2T6") == "canada"
+    assert resolver.resolve("Unit 3 Berlin") == "europe"
+    assert resolver.resolve("12 Main St, Toronto") == "canada"
+    assert resolver.resolve("12 Boston St, Miami") == "southeast"
+    assert resolver.resolve("Chicago 60601-1234") == "midwest"
+    assert resolver.resolve("Rue Sainte-Catherine, Montréal, Québec, Canada") == "canada"
+
+    resolver.resolve("Kingston")
+    assert resolver.cache_stats().hits == 1
+    # Full addresses are cached too
+    address = "Attn: Receiving Dept, 4821 Industrial Park Boulevard, Suite 210, Boston, MA 02118"
+    assert resolver.resolve(address) == resolver.resolve(address) == "northeast"
+    assert resolver.cache_stats().hits == 2
+
+
+def test_shipping_cache_expires_and_skips_long_keys(monkeypatch):
+    from ShippingSuggestion import cache
+
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    quotes = cache.LRUCache(2, ttl=30, max_key_length=8)
+    quotes.put("UPS|1", 12.5)
+    quotes.put("x" * 9, 1.0)
+    now[0] += 29
+    assert quotes.get("UPS|1") == 12.5
+    now[0] += 2
+    assert quotes.get("UPS|1") is None
+    assert quotes.get("x" * 9) is None
+
+    stats = quotes.stats()
+    assert (stats.hits, stats.misses, stats.expirations, stats.size) == (1, 2, 1, 0)
+
+
+def test_destination_zone_feeds_pricing(tmp_path, monkeypatch):
+    path = tmp_path / "rate_cards.json"
+    path.write_text(json.dumps({"carriers": {"*": {"zones": {
+        "*": [{"max_weight": None, "method": "Ground", "cost": 10}],
+        "caribbean": [{"max_weight": None, "method": "Air", "cost": 25}],
+    }}}}))
+    monkeypatch.setattr(ShippingSuggestion, "RATE_CARDS", RateCardStore(str(path)))
+    assert suggest_shipping_method(2, "Kingston, Jamaica", "UPS") == {"method": "Air", "estimated_cost": 25}
+    assert suggest_shipping_method(2, "Chicago", "UPS") == {"method": "Ground", "estimated_cost": 10}
+
+
+@pytest.fixture
+def easypost_server():
+    """A local stand-in for the EasyPost shipments API; ca_slow answers once released."""
+    requests_seen = []
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            shipment = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["shipment"]
+            account = shipment["carrier_accounts"][0]
+            requests_seen.append((account, shipment["to_address"]))
+            if account == "ca_slow":
+                release.wait(10)
+            rates = [
+                {"id": "rate_1", "object": "Rate", "carrier": account, "service": "Express", "rate": "19.00", "delivery_days": 1},
+                {"id": "rate_2", "object": "Rate", "carrier": account, "service": "Ground", "rate": "12.34", "delivery_days": 5},
+            ]
+            if account == "ca_priority":
+                rates = [{"id": "rate_3", "object": "Rate", "carrier": account, "service": "Priority", "rate": "25.00", "est_delivery_days": 2}]
+            body = json.dumps({"id": "shp_1", "object": "Shipment", "rates": rates}).encode()
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v2", requests_seen, release
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_live_rates_fall_back_to_rate_cards_and_are_cached(easypost_server):
+    api_base, requests_seen, release = easypost_server
+    easypost = load_easypost()
+    client = easypost.EasyPostClient("test_key", api_base=api_base)
+    live_rates = LiveRates(
+        client,
+        {"UPS": "ca_ups", "FedEx": "ca_slow"},
+        {"zip": "10001", "country": "US"},
+        RateCardStore(),
+        timeout=1,
+    )
+
+    # FedEx doesn't answer until released, so it's past the budget
+    quotes = live_rates.shop("Chicago 60601", 2, "*", "US")
+    assert [(quote.carrier, quote.method, quote.cost, quote.source) for quote in quotes] == [
+        ("UPS", "Ground", 12.34, LIVE),
+        ("FedEx", "Express Shipping", 30, RATE_CARD),
+    ]
+
+    # The late FedEx answer fills the cache, as does UPS; the same weight
+    # bucket is served without asking again (nothing can be fetched once the
+    # pool is shut down)
+    release.set()
+    live_rates._pool.shutdown(wait=True)
+    quotes = live_rates.shop("Chicago 60601", 1.8, "*", "US")
+    assert [(quote.carrier, quote.source) for quote in quotes] == [("UPS", LIVE), ("FedEx", LIVE)]
+    assert sorted(requests_seen) == [("ca_slow", {"zip": "60601", "country": "US"}), ("ca_ups", {"zip": "60601", "country": "US"})]
+
+
+def test_live_rates_are_asked_for_the_destinations_country(easypost_server):
+    api_base, requests_seen, release = easypost_server
+    release.set()
+    easypost = load_easypost()
+    live_rates = LiveRates(
+        easypost.EasyPostClient("test_key", api_base=api_base),
+        {"UPS": "ca_ups"},
+        {"zip": "10001", "country": "US"},
+        RateCardStore(),
+    )
+    resolver = ZoneResolver.load()
+    for destination in ("10115 Berlin, Germany", "Sydney"):
+        location = resolver.locate(destination)
+        live_rates.shop(destination, 2, location.zone, location.country)
+
+    assert requests_seen == [
+        ("ca_ups", {"city": "10115 Berlin, Germany", "country": "DE"}),
+        # An unknown country is left to the carrier
+        ("ca_ups", {"city": "Sydney"}),
+    ]
+
+
+def test_consolidation_packs_parcels_into_carrier_limits():
+    flat = lambda cost: {"*": [{"max_weight": None, "method": "Ground", "cost": cost}]}
+    cards = RateCards.from_spec({"carriers": {
+        "Small": {"limits": {"max_weight": 20, "max_volume": 100}, "zones": flat(10)},
+        "Large": {"zones": flat(45)},
+    }})
+    hour = 3600
+    parcels = [
+        Parcel("a", "Chicago", 12, 0, 10),
+        Parcel("b", "chicago", 8, hour, 10),
+        Parcel("c", "Chicago!", 7, 2 * hour, 10),
+        Parcel("d", "Chicago", 5, 3 * hour, 10),
+        # Next window
+        Parcel("e", "Chicago", 1, 5 * hour, 10),
+        # Too large to share a Small shipment, and Large costs more
+        Parcel("f", "Boston", 1, 0, 95),
+        Parcel("g", "Boston", 1, 0, 10),
+    ]
+    result = consolidate(parcels, cards, window=4 * hour)
+
+    decisions = {decision.parcel_ids: decision for decision in result.decisions}
+    assert set(decisions) == {("a", "b", "c", "d"), ("e",), ("f", "g")}
+    chicago = decisions["a", "b", "c", "d"]
+    assert (chicago.reason, chicago.carrier, chicago.shipments) == (CONSOLIDATED, "Small", 2)
+    assert (chicago.cost, chicago.separate_cost) == (20, 40)
+    assert decisions["e",].reason == SINGLE_PARCEL
+    assert decisions["f", "g"].reason == NOT_CHEAPER
+    assert result.savings == 20
+
+    shipped = sorted((shipment.parcel_ids, shipment.weight, shipment.carrier) for shipment in result.shipments)
+    assert shipped == [
+        (("a", "b"), 20, "Small"),
+        (("c", "d"), 12, "Small"),
+        (("e",), 1, "Small"),
+        (("f",), 1, "Small"),
+        (("g",), 1, "Small"),
+    ]
+
+
+def test_billable_weight_uses_each_carriers_divisor():
+    cards = RateCards.from_spec({"carriers": {
+        "UPS": {"dim_divisor": 139, "zones": {"*": [{"max_weight": 10, "method": "Express", "cost": 30}, {"max_weight": None, "method": "Freight", "cost": 50}]}},
+        "Post": {"zones": {"*": [{"max_weight": 10, "method": "Standard", "cost": 15}, {"max_weight": None, "method": "Freight", "cost": 35}]}},
+    }})
+    # A light 20" cube bills as 58 with UPS, as its actual weight without a divisor
+    assert billable_weights([2, 3], [20 * 20 * 20, 0], [139, math.nan]).tolist() == [[58, 2], [3, 3]]
+
+    quotes = quote_pieces([2, 3], [20 * 20 * 20, 0], "*", cards, ["UPS", "Post"])
+    assert quotes.methods.tolist() == [["Freight", "Standard"], ["Express", "Standard"]]
+    assert quotes.totals().tolist() == [80, 30]
+
+
+def test_consolidation_prices_shipments_by_billable_weight():
+    cards = RateCards.from_spec({"carriers": {
+        "Box": {"dim_divisor": 10, "zones": {"*": [{"max_weight": 5, "method": "Parcel", "cost": 5}, {"max_weight": None, "method": "Freight", "cost": 50}]}},
+    }})
+    # Light but bulky: each bills as 3 on its own, and together as 6
+    parcels = [Parcel("a", "Chicago", 1, 0, 30), Parcel("b", "Chicago", 1, 0, 30)]
+    result = consolidate(parcels, cards)
+
+    (decision,) = result.decisions
+    assert (decision.reason, decision.cost, decision.separate_cost) == (NOT_CHEAPER, 10, 10)
+    assert [shipment.method for shipment in result.shipments] == ["Parcel", "Parcel"]
+
+
+def test_pieces_are_quoted_from_the_rate_cards_with_live_rates_on(monkeypatch):
+    class StubLiveRates:
+        def shop(self, destination, weight, zone, country=None):
+            raise AssertionError("pieces aren't quoted live")
+
+    monkeypatch.setattr(ShippingSuggestion, "LIVE_RATES", StubLiveRates())
+    suggestion = suggest_shipping_method(5, "Chicago", "UPS", pieces=[(2, 0), (3, 0)])
+    assert suggestion["source"] == RATE_CARD
+
+
+def test_shipping_suggestion_prices_pieces_by_billable_weight():
+    client = api.test_client()
+    payload = {
+        "tracking_number": "1Z5R89390357567127",
+        "destination": "Chicago",
+        "ship_date": "2026-10-16",
+        "pieces": [
+            {"weight": 2, "dimensions": {"length": 20, "width": 20, "height": 20}},
+            {"weight": 3},
+        ],
+    }
+    response = client.post("/ShippingSuggestion", json=payload)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["carrier"] == "UPS"
+    assert data["weight"] == 5
+    assert data["suggestion"] == {
+        "method": "Freight, Express Shipping",
+        "estimated_cost": 80,
+        "billable_weight": 61,
+        "pieces": [
+            {"weight": 2, "billable_weight": 58, "method": "Freight", "estimated_cost": 50,
+             "transit_days": 6, "estimated_delivery": "2026-10-26"},
+            {"weight": 3, "billable_weight": 3, "method": "Express Shipping", "estimated_cost": 30,
+             "transit_days": 2, "estimated_delivery": "2026-10-20"},
+        ],
+        # The slowest piece
+        "transit_days": 6,
+        "estimated_delivery": "2026-10-26",
+    }
+
+    payload = {"tracking_number": "1Z5R89390357567127", "destination": "Chicago", "weight": 2, "dimensions": {"length": 20}}
+    response = client.post("/ShippingSuggestion", json=payload)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid dimensions"}
+
+    payload = {"tracking_number": "1Z5R89390357567127", "destination": "Chicago", "pieces": []}
+    assert client.post("/ShippingSuggestion", json=payload).get_json() == {"error": "Invalid pieces"}
+
+
+def test_transit_times_fill_routes_from_any_zone():
+    times = TransitTimes.from_spec({
+        "services": ["Express", "Ground"],
+        "holidays": ["2026-11-26"],
+        "origins": {
+            "*": {"*": [2, 5], "europe": [4, None]},
+            "west": {"west": [1, 3]},
+        },
+    })
+    assert times.days.dtype == np.uint8
+    assert times.transit_days("west", "west", "Ground") == 3
+    # Unlisted zones fall back to the ANY origin and destination
+    assert times.transit_days("west", "midwest", "Ground") == 5
+    assert times.transit_days("south", "europe", "Express") == 4
+    assert times.transit_days("south", "europe", "Ground") is None
+    assert times.transit_days("*", "*", "Teleport") is None
+    # Business days, skipping weekends and holidays
+    assert times.eta("west", "west", "Express", datetime.date(2026, 10, 16)) == datetime.date(2026, 10, 19)
+    assert times.eta("*", "*", "Ground", datetime.date(2026, 11, 24)) == datetime.date(2026, 12, 2)
+
+
+def test_shipping_suggestion_filters_by_delivery_date():
+    client = api.test_client()
+    payload = {
+        "tracking_number": "1Z5R89390357567127",
+        "destination": "Chicago",
+        "weight": 20,
+        "ship_date": "2026-10-16",
+    }
+    suggestion = client.post("/ShippingSuggestion", json=payload).get_json()["suggestion"]
+    assert (suggestion["method"], suggestion["estimated_delivery"]) == ("Freight", "2026-10-26")
+
+    response = client.post("/ShippingSuggestion", json={**payload, "deliver_by": "2026-10-26"})
+    assert response.status_code == 200
+    response = client.post("/ShippingSuggestion", json={**payload, "deliver_by": "2026-10-23"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "No shipping option arrives by deliver_by"}
+    response = client.post("/ShippingSuggestion", json={**payload, "deliver_by": "next week"})
+    assert response.get_json() == {"error": "Invalid deliver_by"}
+
+
+def test_delivery_date_picks_the_cheapest_live_rate_in_time(monkeypatch, easypost_server):
+    api_base, _, release = easypost_server
+    release.set()
+    easypost = load_easypost()
+    live_rates = LiveRates(
+        easypost.EasyPostClient("test_key", api_base=api_base),
+        {"UPS": "ca_ups", "USPS": "ca_priority"},
+        {"zip": "10001", "country": "US"},
+        RateCardStore(),
+    )
+    # Carrier services aren't in the shipped transit times; the quotes' own days are used
+    monkeypatch.setattr(ShippingSuggestion, "LIVE_RATES", live_rates)
+    client = api.test_client()
+    payload = {"tracking_number": "1Z5R89390357567127", "destination": "Chicago", "weight": 2, "ship_date": "2026-10-16"}
+
+    suggestion = client.post("/ShippingSuggestion", json=payload).get_json()["suggestion"]
+    assert (suggestion["method"], suggestion["source"], suggestion["estimated_delivery"]) == ("Ground", LIVE, "2026-10-23")
+
+    suggestion = client.post("/ShippingSuggestion", json={**payload, "deliver_by": "2026-10-20"}).get_json()["suggestion"]
+    assert (suggestion["carrier"], suggestion["method"], suggestion["estimated_cost"]) == ("USPS", "Priority", 25.0)
+    assert [(rate["carrier"], rate["estimated_delivery"]) for rate in suggestion["rates"]] == [("USPS", "2026-10-20")]
+    response = client.post("/ShippingSuggestion", json={**payload, "deliver_by": "2026-10-16"})
+    assert response.status_code == 400
@@ -1,6 +1,7 @@
 import json
 from api import api
 
+
 def test_tracking_success():
     client = api.test_client()
     payload = {
@@ -12,6 +13,51 @@ def test_tracking_success():
         data=json.dumps(payload),
         content_type="application/json"
     )
+
+
+def test_tracking_with_carrier():
+    client = api.test_client()
+    payload = {
+        "tracking_number": "1Z999AA10123456784",
+        "carrier": "UPS"
+    }
+    response = client.post(
+        "/OrderStatusTracking",
+        data=json.dumps(payload),
+        content_type="application/json"
+    )
+    assert response.status_code == 200
+    assert response.get_json()["carrier"] == "UPS"
+
+
+def test_tracking_wrong_carrier():
+    client = api.test_client()
+    payload = {
+        "tracking_number": "1Z999AA10123456784",
+        "carrier": "fedex"
+    }
+    response = client.post(
+        "/OrderStatusTracking",
+        data=json.dumps(payload),
+        content_type="application/json"
+    )
+    assert response.status_code == 404
+
+
+def test_tracking_unknown_carrier():
+    client = api.test_client()
+    payload = {
+        "tracking_number": "1Z999AA10123456784",
+        "carrier": "Pony Express"
+    }
+    response = client.post(
+        "/OrderStatusTracking",
+        data=json.dumps(payload),
+        content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
 # def test_tracking_found():
 #     client = api.test_client()
 #     payload = {
@@ -0,0 +1,476 @@
+import pickle
+import random
+import string
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tracking_numbers
+from tracking_numbers import DEFINITIONS
+from tracking_numbers import find_tracking_numbers
+from tracking_numbers import find_tracking_numbers_in_file
+from tracking_numbers import get_definition
+from tracking_numbers import get_definitions_for_courier
+from tracking_numbers import get_tracking_number
+from tracking_numbers import get_tracking_numbers
+from tracking_numbers import identify_tracking_number
+from tracking_numbers import is_valid_tracking_number
+from tracking_numbers import iter_tracking_numbers
+from tracking_numbers import precompiled
+from tracking_numbers.cache import LookupCache
+from tracking_numbers.dispatch import DispatchIndex
+from tracking_numbers.helpers.corpus import VALID_NUMBERS
+from tracking_numbers.helpers.corpus import generate_corpus
+from tracking_numbers.helpers.corpus import generate_valid
+from tracking_numbers.precompiled import LazyTrackingNumberDefinition
+from tracking_numbers.precompiled import load_definitions
+from tracking_numbers.serial_number import UPSSerialNumberParser
+from tracking_numbers.types import Courier
+from tracking_numbers.types import NO_VALIDATION_ERRORS
+from tracking_numbers.types import Product
+from tracking_numbers.types import TrackingNumber
+
+
+def linear_scan(number):
+    for tn_definition in DEFINITIONS:
+        tracking_number = tn_definition.test(number)
+        if tracking_number and tracking_number.valid:
+            return tracking_number
+
+    return None
+
+
+def mixed_numbers(count=2000, seed=7):
+    rng = random.Random(seed)
+    alphabet = string.digits * 4 + string.ascii_uppercase + "abcdef "
+    numbers = list(VALID_NUMBERS)
+    numbers += [
+        " ".join(number[i : i + 4] for i in range(0, len(number), 4))
+        for number in VALID_NUMBERS
+    ]
+    numbers += [
+        number[:-1] + str((int(number[-1]) + 1) % 10)
+        for number in VALID_NUMBERS
+        if number[-1].isdigit()
+    ]
+    numbers += ["", " ", "1Z", "TBA", "NONEXISTENT123"]
+    for _ in range(count):
+        length = rng.randint(8, 36)
+        prefix = rng.choice(["", "", "1Z", "TBA", "C", "96", "420", "80", "100"])
+        numbers.append(prefix + "".join(rng.choice(alphabet) for _ in range(length)))
+
+    return numbers
+
+
+def outcome(lookup, number):
+    # Some malformed numbers make a definition raise (e.g. a UPS letter check
+    # digit); both lookups must then raise the same way
+    try:
+        return lookup(number)
+    except ValueError as e:
+        return repr(e)
+
+
+def test_valid_numbers_are_recognized():
+    for number in VALID_NUMBERS:
+        tracking_number = get_tracking_number(number)
+        assert tracking_number is not None, number
+        assert tracking_number.valid
+
+
+def test_dispatch_matches_linear_scan():
+    for number in mixed_numbers():
+        assert outcome(get_tracking_number, number) == outcome(
+            linear_scan, number
+        ), number
+
+
+def test_bulk_matches_single_lookups():
+    numbers = VALID_NUMBERS + ["NONEXISTENT123", "1Z5R89390357567128", ""]
+    batch = get_tracking_numbers(numbers, with_urls=True)
+
+    assert len(batch) == len(numbers)
+    for row, number in enumerate(numbers):
+        tracking_number = get_tracking_number(number)
+        assert batch.valid[row] == bool(tracking_number)
+        if tracking_number:
+            assert batch.courier_code(row) == tracking_number.courier.code
+            assert batch.product(row) == tracking_number.product
+            assert batch.tracking_urls[row] == tracking_number.tracking_url
+
+    assert batch.courier_code(len(numbers) - 3) is None
+    assert batch.courier_code(len(numbers) - 2) == "ups"
+    assert batch.tracking_urls[len(numbers) - 2] is None
+
+
+def test_check_digits_that_arent_digits_fail_the_checksum():
+    # Matches the UPS format, with a "G" where the check digit goes
+    malformed = "1Z09KP92PZE71GF92G"
+    result = get_definition("UPS").test(malformed)
+    assert result.validation_errors[0] == ("checksum", "Checksum validation failed")
+    assert get_tracking_number(malformed) is None
+    assert is_valid_tracking_number(malformed) is False
+
+    numbers = ["1Z999AA10123456784", malformed, "1Z5R89390357567127"]
+    batch = get_tracking_numbers(numbers)
+    assert list(batch.valid) == [1, 0, 1]
+    assert batch.courier_code(1) == "ups"
+    assert list(find_tracking_numbers(f"Was it {malformed}?")) == []
+
+
+def test_bulk_streams_in_chunks():
+    numbers = (number for number in VALID_NUMBERS * 5)
+    batches = list(iter_tracking_numbers(numbers, chunk_size=7))
+
+    assert [len(batch) for batch in batches] == [7] * 7 + [1]
+    assert all(all(batch.valid) for batch in batches)
+    assert batches[0].tracking_urls is None
+
+
+def test_cache_counts_hits_misses_and_evictions():
+    cache = LookupCache(capacity=2)
+    assert cache.get_or_compute("a", str.upper) == "A"
+    assert cache.get_or_compute("a", str.upper) == "A"
+    cache.get_or_compute("b", str.upper)
+    cache.get_or_compute("c", str.upper)  # evicts "a", the least recently used
+    cache.get_or_compute("x" * 100, str.upper)  # too long to be cached
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 4, 1, 2)
+    assert stats.hit_rate == 0.2
+
+
+def test_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tracking_numbers.cache.time, "monotonic", lambda: now[0])
+    cache = LookupCache(capacity=10, ttl=30)
+
+    cache.get_or_compute("a", str.upper)
+    now[0] += 29
+    cache.get_or_compute("a", str.upper)
+    now[0] += 2
+    cache.get_or_compute("a", str.upper)
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.expirations) == (1, 2, 1)
+
+
+def test_get_tracking_number_cache_is_thread_safe():
+    tracking_numbers.enable_cache(capacity=4)
+    try:
+        numbers = VALID_NUMBERS * 50
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(get_tracking_number, numbers))
+
+        assert results == [linear_scan(number) for number in numbers]
+        stats = tracking_numbers.cache_stats()
+        assert stats.size <= 4
+        assert stats.hits + stats.misses == len(numbers)
+    finally:
+        tracking_numbers.disable_cache()
+
+
+def checksum_cases(count=300, seed=11):
+    rng = random.Random(seed)
+    for tn_definition in DEFINITIONS:
+        validator = tn_definition.checksum_validator
+        if not validator:
+            continue
+
+        parser = tn_definition.serial_number_parser
+        alphabet = string.digits + string.ascii_uppercase
+        if not isinstance(parser, UPSSerialNumberParser):
+            alphabet = string.digits
+
+        for length in (8, 11, 15, 22):
+            serials = [
+                "".join(rng.choice(alphabet) for _ in range(length))
+                for _ in range(count)
+            ]
+
+            check_digits = [rng.randint(0, 9) for _ in range(count)]
+            yield validator, parser, serials, check_digits
+
+
+def test_checksum_kernels_match_validators():
+    for validator, parser, serials, check_digits in checksum_cases():
+        for serial, check_digit in zip(serials, check_digits):
+            expected = validator.passes(parser.parse(serial), check_digit)
+            values = parser.parse_values(serial)
+            assert validator.passes_values(values, check_digit) == expected, (
+                validator,
+                serial,
+            )
+
+
+def test_vectorized_checksums_match_validators():
+    pytest.importorskip("numpy")
+    from tracking_numbers.vectorized import checksums_pass
+
+    for validator, parser, serials, check_digits in checksum_cases():
+        # A prepend_if rule can change the parsed length of some serials only
+        by_length = {}
+        for serial, check_digit in zip(serials, check_digits):
+            by_length.setdefault(len(parser.parse(serial)), []).append(
+                (serial, check_digit)
+            )
+
+        for cases in by_length.values():
+            expected = [
+                validator.passes(parser.parse(serial), check_digit)
+                for serial, check_digit in cases
+            ]
+            group_serials = [serial for serial, _ in cases]
+            group_digits = [check_digit for _, check_digit in cases]
+            result = checksums_pass(validator, parser, group_serials, group_digits)
+            assert result.tolist() == expected
+
+
+def test_fast_validity_matches_lookup():
+    for number in mixed_numbers():
+        tracking_number = outcome(get_tracking_number, number)
+        if isinstance(tracking_number, str):  # the lookup raised
+            assert outcome(is_valid_tracking_number, number) == tracking_number
+            continue
+
+        assert is_valid_tracking_number(number) == (tracking_number is not None)
+        assert identify_tracking_number(number) == (
+            (tracking_number.courier.code, tracking_number.product.name)
+            if tracking_number
+            else None
+        )
+
+
+EMAIL = (
+    "Hi, your parcel 1Z 999 AA1 0123 4567 84 has shipped.\n"
+    "Other boxes: TBA000000000000, RB123456785GB and 3318810025.\n"
+    "Not a number: 1Z999AA10123456785 or ABC123.\n"
+)
+
+
+def test_find_tracking_numbers_in_text():
+    found = list(find_tracking_numbers(EMAIL))
+
+    assert [EMAIL[match.start : match.end] for match in found] == [
+        "1Z 999 AA1 0123 4567 84",
+        "TBA000000000000",
+        "RB123456785GB",
+        "3318810025",
+    ]
+    assert found[0].tracking_number.number == "1Z999AA10123456784"
+    assert [match.tracking_number.courier.code for match in found] == [
+        "ups",
+        "amazon",
+        "s10",
+        "dhl",
+    ]
+
+
+def test_find_tracking_numbers_in_bytes_and_files(tmp_path):
+    data = EMAIL.encode() * 200
+    path = tmp_path / "manifest.txt"
+    path.write_bytes(data)
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+
+    from_bytes = [(match.start, match.end) for match in find_tracking_numbers(data)]
+    from_file = [
+        (match.start, match.end) for match in find_tracking_numbers_in_file(str(path))
+    ]
+
+    assert len(from_bytes) == 800
+    assert from_file == from_bytes
+    assert data[from_bytes[-1][0] : from_bytes[-1][1]] == b"3318810025"
+    assert list(find_tracking_numbers_in_file(str(empty))) == []
+
+
+def test_precompiled_definitions_load_lazily(tmp_path, monkeypatch):
+    monkeypatch.setenv(
+        "TRACKING_NUMBERS_DEFINITIONS_CACHE", str(tmp_path / "defs.pickle")
+    )
+    eager, _ = load_definitions()  # no cache yet: loads _generated.py, writes it
+    lazy, signatures = load_definitions()
+
+    assert (tmp_path / "defs.pickle").exists()
+    assert all(
+        isinstance(definition, LazyTrackingNumberDefinition) for definition in lazy
+    )
+    assert [definition.product for definition in lazy] == [
+        definition.product for definition in eager
+    ]
+
+    index = DispatchIndex(lazy, signatures=signatures)
+    assert not any(definition.materialized for definition in lazy)
+
+    candidates = index.candidates("1Z999AA10123456784")
+    assert any(definition.check("1Z999AA10123456784") for definition in candidates)
+    materialized = [definition for definition in lazy if definition.materialized]
+    assert materialized == list(candidates)
+    assert len(materialized) < len(lazy)
+
+    for number in mixed_numbers(count=300):
+        expected = [outcome(definition.check, number) for definition in eager]
+        assert [outcome(definition.check, number) for definition in lazy] == expected
+
+
+def test_lazy_definition_materialized_by_another_thread(tmp_path, monkeypatch):
+    monkeypatch.setenv(
+        "TRACKING_NUMBERS_DEFINITIONS_CACHE", str(tmp_path / "defs.pickle")
+    )
+    load_definitions()
+    definition = load_definitions()[0][0]
+    regex = definition.number_regex
+
+    # A lookup that missed just before another thread materialized it
+    assert definition.__getattr__("number_regex") is regex
+    with pytest.raises(AttributeError):
+        definition.__getattr__("no_such_attribute")
+
+
+def test_importing_never_writes_into_the_package(tmp_path, monkeypatch):
+    monkeypatch.delenv("TRACKING_NUMBERS_DEFINITIONS_CACHE", raising=False)
+    monkeypatch.setattr(
+        precompiled, "DEFAULT_CACHE_PATH", str(tmp_path / "defs.pickle")
+    )
+    definitions, _ = load_definitions()
+
+    assert definitions and not (tmp_path / "defs.pickle").exists()
+
+
+def test_shipped_definitions_cache_is_up_to_date():
+    # Rebuild with `python -m tracking_numbers.precompiled` after editing
+    # _generated.py
+    cached = precompiled._read_cache(
+        precompiled.DEFAULT_CACHE_PATH, precompiled.source_digest()
+    )
+
+    assert cached is not None
+    assert [definition.product for definition in cached[0]] == [
+        definition.product for definition in DEFINITIONS
+    ]
+
+
+def test_definition_indexes():
+    assert get_definition("fedex ground") is next(
+        definition
+        for definition in DEFINITIONS
+        if definition.product.name == "FedEx Ground"
+    )
+    assert get_definition("Pony Express") is None
+
+    ups = get_definitions_for_courier("UPS")
+    assert ups == get_definitions_for_courier("ups")
+    assert ups == [
+        definition for definition in DEFINITIONS if definition.courier.code == "ups"
+    ]
+    assert get_definitions_for_courier("United States Postal Service")
+    assert get_definitions_for_courier("pony") == []
+
+
+def test_courier_scoped_lookups():
+    for number in mixed_numbers(count=500):
+        for courier in ("ups", "FedEx", "usps", "s10"):
+            definitions = get_definitions_for_courier(courier)
+            expected = outcome(
+                lambda value: next(
+                    (
+                        definition.test(value)
+                        for definition in definitions
+                        if definition.check(value)
+                    ),
+                    None,
+                ),
+                number,
+            )
+            scoped = outcome(
+                lambda value: get_tracking_number(value, courier=courier), number
+            )
+            assert scoped == expected, (number, courier)
+
+    assert get_tracking_number("1Z999AA10123456784", courier="pony") is None
+    assert not is_valid_tracking_number("1Z999AA10123456784", courier="fedex")
+    assert identify_tracking_number("1Z999AA10123456784", courier="ups") == (
+        "ups",
+        "UPS",
+    )
+
+
+def test_corpus_generates_valid_numbers_for_every_definition():
+    rng = random.Random(7)
+    for definition in DEFINITIONS:
+        for _ in range(20):
+            number = generate_valid(definition, rng)
+            assert definition.test(number).valid, (definition.product.name, number)
+            assert is_valid_tracking_number(number), number
+
+    corpus = generate_corpus(2000, valid=0.4, near_miss=0.3, invalid=0.2, seed=1)
+    assert {entry.kind for entry in corpus} == {
+        "valid",
+        "near_miss",
+        "invalid",
+        "noise",
+    }
+    for entry in corpus:
+        valid = outcome(is_valid_tracking_number, entry.number) is True
+        assert valid == (entry.kind == "valid"), entry
+
+
+def test_results_are_compact_and_share_interned_types():
+    tracking_number = get_tracking_number("1Z999AA10123456784")
+    assert not hasattr(tracking_number, "__dict__")
+    assert tracking_number.validation_errors is NO_VALIDATION_ERRORS
+    assert tracking_number.tracking_url.endswith("1Z999AA10123456784")
+    with pytest.raises(AttributeError):
+        tracking_number.number = "1Z999AA10123456785"
+
+    assert Courier(code="ups", name="UPS") is tracking_number.courier
+    assert Product(name="UPS") is tracking_number.product
+    assert (
+        pickle.loads(pickle.dumps(tracking_number.courier)) is tracking_number.courier
+    )
+    assert pickle.loads(pickle.dumps(tracking_number)) == tracking_number
+
+    invalid = get_definition("UPS").test("1Z999AA10123456785")
+    assert invalid.validation_errors == (("checksum", "Checksum validation failed"),)
+
+
+def test_cached_results_cant_be_mutated():
+    tracking_numbers.enable_cache(capacity=4)
+    try:
+        tracking_number = get_tracking_number("1Z999AA10123456784")
+        with pytest.raises(AttributeError):
+            tracking_number.serial_number.append(99)
+
+        assert get_tracking_number("1Z999AA10123456784") is tracking_number
+        assert tracking_numbers.cache_stats().hits == 1
+    finally:
+        tracking_numbers.disable_cache()
+
+    built = TrackingNumber(
+        "1Z999AA10123456784",
+        tracking_number.courier,
+        tracking_number.product,
+        [9, 9, 9],
+        validation_errors=[("checksum", "Checksum validation failed")],
+    )
+    assert built.serial_number == (9, 9, 9)
+    assert built.validation_errors == (("checksum", "Checksum validation failed"),)
+
+
+def test_tracking_numbers_can_still_be_built_with_a_tracking_url():
+    courier = Courier(code="ups", name="UPS")
+    url = "https://example.com/track?n=1Z999AA10123456784&ref=%25"
+    built = TrackingNumber(
+        "1Z999AA10123456784", courier, Product(name="UPS"), None, tracking_url=url
+    )
+    assert built.tracking_url == url and built.valid
+    assert pickle.loads(pickle.dumps(built)) == built
+
+    templated = TrackingNumber(
+        "1Z999AA10123456784",
+        courier,
+        Product(name="UPS"),
+        None,
+        tracking_url_template="https://example.com/track?n=%s&ref=%%25",
+    )
+    assert templated == built
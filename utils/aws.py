@@ -0,0 +1,101 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+
+def config_from_env():
+    """
+    The botocore Config shared by every client: AWS_MAX_POOL_CONNECTIONS
+    connections per client (default 50) and TCP keep-alive unless
+    AWS_TCP_KEEPALIVE is "false".
+    """
+    return Config(
+        max_pool_connections=int(os.environ.get("AWS_MAX_POOL_CONNECTIONS") or DEFAULT_MAX_POOL_CONNECTIONS),
+        tcp_keepalive=os.environ.get("AWS_TCP_KEEPALIVE", "true").lower() != "false",
+    )
+
+
+class AWSRegistry:
+    """
+    AWS clients and resources, created on first use and then reused for the
+    life of the process, so warm Lambda containers and gunicorn workers skip
+    session setup and endpoint resolution and keep their connections open.
+
+    Clients are thread-safe and shared by all threads. boto3 resources aren't,
+    so every thread gets its own resources and tables.
+
+    Args:
+        session_factory (callable): Creates the boto3 Session; tests can pass
+            one returning local stubs.
+        config (botocore.config.Config): The config of every client and
+            resource.
+    """
+
+    def __init__(self, session_factory=boto3.session.Session, config=None):
+        self.session_factory = session_factory
+        self.config = config if config is not None else config_from_env()
+        # Sessions aren't thread-safe, so everything made from one is made under the lock
+        self._lock = threading.RLock()
+        self._session = None
+        self._clients = {}
+        self._local = threading.local()
+        self._generation = 0
+
+    def client(self, service):
+        client = self._clients.get(service)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(service)
+                if client is None:
+                    client = self._clients[service] = self._get_session().client(service, config=self.config)
+
+        return client
+
+    def resource(self, service):
+        resources = self._thread_cache()
+        key = ("resource", service)
+        resource = resources.get(key)
+        if resource is None:
+            with self._lock:
+                resource = resources[key] = self._get_session().resource(service, config=self.config)
+
+        return resource
+
+    def table(self, name):
+        """The DynamoDB Table resource of the given name, for this thread."""
+        tables = self._thread_cache()
+        key = ("table", name)
+        table = tables.get(key)
+        if table is None:
+            table = tables[key] = self.resource("dynamodb").Table(name)
+
+        return table
+
+    def reset(self):
+        """Drops everything created so far (e.g. after credentials change); it's recreated on next use."""
+        with self._lock:
+            self._session = None
+            self._clients = {}
+            self._generation += 1
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = self.session_factory()
+            return self._session
+
+    def _thread_cache(self):
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            local.generation = self._generation
+            local.cache = {}
+
+        return local.cache
+
+
+# The process-wide registry
+AWS = AWSRegistry()
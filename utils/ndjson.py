@@ -0,0 +1,64 @@
+import json
+
+# Longer lines are reported as invalid instead of being read into memory
+MAX_LINE_BYTES = 64 * 1024
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def iter_ndjson(stream, max_line_bytes=MAX_LINE_BYTES):
+    """
+    Parses newline-delimited JSON from a binary stream, one line at a time.
+
+    Args:
+        stream: A file-like object with readline(limit), e.g. a request stream.
+        max_line_bytes (int): The longest line that is parsed.
+
+    Yields:
+        tuple: The 1-based line number and the parsed value, or None if the
+        line isn't valid JSON or is too long. Blank lines are skipped.
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+
+        line_number += 1
+        if len(line) > max_line_bytes and not line.endswith(b"\n"):
+            # Skip the rest of the line without holding on to it
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line_bytes + 1)
+            yield line_number, None
+            continue
+
+        if not line.strip():
+            continue
+
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def dump_ndjson(items, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encodes items as newline-delimited JSON.
+
+    Args:
+        items (iterable): JSON-serializable values, consumed lazily.
+        chunk_size (int): How many lines go into each yielded chunk.
+
+    Yields:
+        str: Chunks of up to chunk_size lines, so a streamed response is
+        written chunk by chunk rather than line by line or all at once.
+    """
+    lines = []
+    for item in items:
+        lines.append(json.dumps(item))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
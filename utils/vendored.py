@@ -0,0 +1,67 @@
+import importlib.util
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRACKING_NUMBERS_DIR = os.path.join(ROOT_DIR, "ShippingSuggestion", "tracking_numbers")
+ORDER_STATUS_TRACKING_DIR = os.path.join(ROOT_DIR, "OrderStatusTracking")
+
+# The easypost SDK and what it imports, in dependency order
+EASYPOST_PACKAGES = ("certifi", "charset_normalizer", "idna", "urllib3", "requests", "easypost")
+
+
+def load_vendored(name, directory):
+    """
+    Registers a package vendored in a Lambda directory under its top-level name.
+
+    The Lambda directories can't be put on sys.path here, because each one's
+    handler module would shadow the directory of the same name.
+
+    Args:
+        name (str): The package name.
+        directory (str): The package's directory.
+
+    Returns:
+        module: The vendored package.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.spec_from_file_location(
+        name,
+        os.path.join(directory, "__init__.py"),
+        submodule_search_locations=[directory],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def load_tracking_numbers():
+    """
+    Registers the tracking_numbers package vendored next to the ShippingSuggestion Lambda.
+
+    Returns:
+        module: The vendored tracking_numbers package.
+    """
+    return load_vendored("tracking_numbers", TRACKING_NUMBERS_DIR)
+
+
+def load_easypost():
+    """
+    Registers the easypost SDK vendored next to the OrderStatusTracking Lambda,
+    with whichever of its dependencies aren't installed.
+
+    Returns:
+        module: The easypost package.
+    """
+    for name in EASYPOST_PACKAGES:
+        if name not in sys.modules and importlib.util.find_spec(name) is None:
+            load_vendored(name, os.path.join(ORDER_STATUS_TRACKING_DIR, name))
+
+    return importlib.import_module("easypost")
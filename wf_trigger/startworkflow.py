@@ -1,10 +1,12 @@
-import boto3 
 import json
 import os
 
+from utils.aws import AWS
+
 def lambda_handler(event, context):
     try:
-        client = boto3.client('stepfunctions')
+        # Reused across warm invocations
+        client = AWS.client('stepfunctions')
         response = client.start_execution(
             stateMachineArn=os.environ['STATE_MACHINE_ARN'],
             input=json.dumps(event)